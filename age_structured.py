@@ -0,0 +1,205 @@
+# this python file consists of the age-structured SEIR model, the SEIR(MITIGATION) model split into age bands which meet each other as given by a contact matrix
+
+# the population is split into K age bands(default are the 16 bands of 5 years from 0-4 to 75+) and every band has its own S, E, I and R compartments(Refer 'Model_Kernels.age_seir_model'). The force of infection of age band i is beta * sum over j of C[i, j] * I[j] / N[j], therefore the model functions of all age bands are evaluated with a single matrix-vector product and K = 16 costs about as much as the SEIR model of the SEIR page
+# the contact matrix C is the sum of the matrices of the settings where people meet(home, school, work and other), C[i, j] is the number of people of age band j a person of age band i meets per day. The matrices are scaled so the largest eigenvalue of the unmitigated matrix is 1, therefore 'beta' keeps the meaning of the contact rate of the SEIR page and a single age band with C = [[1]] is the SEIR model
+# the matrices given by this file are ILLUSTRATIVE, they have the shapes known from contact surveys(people meet their own age, parents meet their children, pupils meet at school and adults at work) but they are not survey data. Survey matrices of a country can be loaded from CSV files - Refer https://doi.org/10.1371/journal.pmed.0050074
+
+# the mitigation control 'u' can be given as:
+# a single value - every contact is reduced, the same as the SEIR(MITIGATION) model
+# one value per age band - the infections of every age band are reduced by its own value
+# a dictionary of settings - the contacts of every setting are reduced by its own value(a single value or one value per age band), for example {'school': 1.0, 'work': 0.5}
+
+# using command prompt or terminal run "python age_structured.py --N 1000000 --u 0.3" from the same directory, "python age_structured.py --help" lists all options
+
+###### NECESSARY IMPORTS ######
+import time
+import hashlib
+import threading
+import argparse
+from collections import namedtuple, OrderedDict
+import numpy as np
+from scipy.integrate import odeint
+from model_kernels import Model_Kernels
+
+AGE_BANDS = ('0-4', '5-9', '10-14', '15-19', '20-24', '25-29', '30-34', '35-39',
+             '40-44', '45-49', '50-54', '55-59', '60-64', '65-69', '70-74', '75+')
+
+# share of the population in every age band, an illustrative population pyramid close to the world population
+AGE_SHARES = np.array([8.5, 8.3, 8.1, 7.8, 7.6, 7.7, 7.9, 7.0, 6.4, 6.1, 5.7, 5.1, 4.3, 3.7, 2.8, 5.0]) / 100
+
+SETTINGS = ('home', 'school', 'work', 'other')
+
+# bands - names of the age bands
+# trajectory - compartments S, E, I and R of every age band (days x compartments x age bands)
+# attack_rate - share of every age band infected by the last day
+# peak_infected, peak_day - largest number of infected people of every age band and the day it is reached
+Age_Result = namedtuple('Age_Result', ['bands', 'population', 'days', 'trajectory', 'attack_rate', 'peak_infected', 'peak_day'])
+
+# the most recent solves are kept so reruns with the same controls do not solve again, the cache is shared by the sessions of the process and only used under its lock(the model is solved outside of the lock)
+AGE_CACHE_SIZE = 16
+age_cache = OrderedDict()
+age_cache_lock = threading.Lock()
+
+
+class Age_Structured_SEIR:
+
+    # function defined to make a contact matrix reciprocal, the contacts of age band i with age band j have to be the contacts of age band j with age band i - Refer https://doi.org/10.1371/journal.pcbi.1005697
+    @staticmethod
+    def reciprocal(matrix, population):
+        matrix = np.asarray(matrix, dtype = float)
+        population = np.asarray(population, dtype = float)
+        total = matrix * population[:, None]
+
+        return (total + total.T) / (2 * population[:, None])
+
+    # function defined to build the illustrative contact matrices of every setting for the 16 default age bands, 'shares' is the share of the population in every age band
+    @staticmethod
+    def contact_matrices(shares = AGE_SHARES):
+        shares = np.asarray(shares, dtype = float)
+        K = len(AGE_BANDS)
+        if len(shares) != K:
+            raise ValueError('The illustrative contact matrices have {} age bands, got {} shares'.format(K, len(shares)))
+
+        age = np.arange(K)
+        gap = age[None, :] - age[:, None]
+        # people meet people of their own age more often than people of other ages
+        near = lambda width: np.exp(-(gap / width) ** 2)
+
+        # people live with people of their own age, their parents and their children(about 6 bands or 30 years apart)
+        home = 1.2 * near(1.0) + 0.7 * np.exp(-((np.abs(gap) - 6) / 1.5) ** 2)
+        # pupils of 5 to 19 meet each other and their teachers
+        pupils = (age >= 1) & (age <= 3)
+        teachers = (age >= 5) & (age <= 12)
+        school = 6.0 * near(0.6) * pupils[:, None] * pupils[None, :] + 0.3 * (pupils[:, None] * teachers[None, :] + teachers[:, None] * pupils[None, :])
+        # adults of 20 to 64 meet each other at work
+        adults = (age >= 4) & (age <= 12)
+        work = 0.8 * adults[:, None] * adults[None, :] * (0.5 + 0.5 * near(4.0))
+        # everybody meets everybody else in shops, transport and leisure
+        other = 0.3 + 1.2 * near(2.0)
+
+        return OrderedDict((setting, Age_Structured_SEIR.reciprocal(matrix, shares))
+                           for setting, matrix in zip(SETTINGS, (home, school, work, other)))
+
+    # function defined to load a contact matrix from a CSV file holding K rows and K columns of numbers(a header row is skipped)
+    @staticmethod
+    def load_contact_matrix(path, population = None):
+        try:
+            matrix = np.loadtxt(path, delimiter = ',', ndmin = 2)
+        except ValueError:
+            matrix = np.loadtxt(path, delimiter = ',', ndmin = 2, skiprows = 1)
+        if matrix.shape[0] != matrix.shape[1]:
+            raise ValueError('A contact matrix has to be square, got {} rows and {} columns'.format(*matrix.shape))
+
+        return matrix if population is None else Age_Structured_SEIR.reciprocal(matrix, population)
+
+    # function defined to return the mitigated contact matrix, 'u' is a single value, one value per age band or a dictionary of settings(Refer the top of this file)
+    @staticmethod
+    def mitigated_contacts(matrices, u = 0.0):
+        if isinstance(u, dict):
+            unknown = [setting for setting in u if setting not in matrices]
+            if unknown:
+                raise ValueError('Unknown settings {}, expected some of {}'.format(', '.join(map(repr, unknown)), ', '.join(matrices)))
+            controls = {setting: u.get(setting, 0.0) for setting in matrices}
+        else:
+            controls = {setting: u for setting in matrices}
+
+        # the rows of the contact matrix hold the contacts which infect an age band, therefore a control per age band scales the rows
+        return sum((1 - np.asarray(controls[setting], dtype = float)).reshape(-1, 1) * matrix for setting, matrix in matrices.items())
+
+    # function defined to solve the age-structured SEIR model over 'day_value' days(the same days as range(0, day_value) used by the pages)
+    # 'population' and 'infected' are the population and the initial infected people of every age band or totals split between the age bands by their shares
+    # 'matrices' maps the settings to their contact matrices, default are the illustrative matrices of the 16 default age bands
+    @staticmethod
+    def solve(population, infected, day_value, alpha, beta, gamma, u = 0.0, matrices = None, bands = AGE_BANDS):
+        if matrices is None:
+            matrices = Age_Structured_SEIR.contact_matrices()
+        K = len(next(iter(matrices.values())))
+
+        shares = AGE_SHARES if K == len(AGE_SHARES) else np.full(K, 1.0 / K)
+        population = np.asarray(population, dtype = float)
+        population = population * shares if population.ndim == 0 else population
+        infected = np.asarray(infected, dtype = float)
+        infected = infected * population / population.sum() if infected.ndim == 0 else infected
+        infected = np.minimum(infected, population)
+
+        digest = hashlib.sha1()
+        for values in [population, infected] + list(matrices.values()):
+            digest.update(np.ascontiguousarray(values, dtype = float).tobytes())
+        controls = sorted((setting, tuple(np.ravel(value))) for setting, value in u.items()) if isinstance(u, dict) else tuple(np.ravel(u))
+        key = (digest.hexdigest(), tuple(matrices), repr(controls), int(day_value), float(alpha), float(beta), float(gamma))
+        with age_cache_lock:
+            cached = age_cache.get(key)
+            if cached is not None:
+                age_cache.move_to_end(key)
+                return cached
+
+        # the matrices are scaled by the largest eigenvalue of the unmitigated matrix so mitigation lowers the reproduction number the same way as in the SEIR(MITIGATION) model
+        scale = np.abs(np.linalg.eigvals(sum(matrices.values()))).max()
+        contacts = Age_Structured_SEIR.mitigated_contacts(matrices, u) / scale
+
+        y0 = np.concatenate((population - infected, np.zeros(K), infected, np.zeros(K)))
+        ret = odeint(Model_Kernels.age_seir_model, y0, range(0, int(day_value)), args = (population, alpha, beta, gamma, contacts),
+                     Dfun = Model_Kernels.age_seir_jacobian)
+        trajectory = ret.reshape(len(ret), 4, K)
+
+        I = trajectory[:, 2]
+        result = Age_Result(bands = tuple(bands) if len(bands) == K else tuple(str(i) for i in range(K)),
+                            population = population,
+                            days = np.arange(day_value),
+                            trajectory = trajectory,
+                            attack_rate = 1 - trajectory[-1, 0] / population,
+                            peak_infected = I.max(axis = 0),
+                            peak_day = I.argmax(axis = 0))
+
+        with age_cache_lock:
+            age_cache[key] = result
+            age_cache.move_to_end(key)
+            if len(age_cache) > AGE_CACHE_SIZE:
+                age_cache.popitem(last = False)
+
+        return result
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Solve the age-structured SEIR model and report the attack rate and the peak of every age band.')
+    parser.add_argument('--N', type = float, default = 1000000, help = 'total population, default is 1000000')
+    parser.add_argument('--I', type = float, default = 10, help = 'initial infected people split between the age bands, default is 10')
+    parser.add_argument('--beta', type = float, default = 0.4, help = 'contact rate, default is 0.4')
+    parser.add_argument('--alpha', type = float, default = 0.2, help = 'expose rate, default is 0.2')
+    parser.add_argument('--gamma', type = float, default = 0.1, help = 'recovery rate, default is 0.1')
+    parser.add_argument('--u', type = float, default = 0.0, help = 'mitigation control of every contact, default is 0')
+    for setting in SETTINGS:
+        parser.add_argument('--u-' + setting, type = float, default = None, help = 'mitigation control of the {} contacts, replaces --u'.format(setting))
+    parser.add_argument('--days', type = int, default = 365, help = 'number of days, default is 365')
+    parser.add_argument('--matrix', help = 'CSV file of a contact matrix with one row and column per age band, replaces the illustrative matrices')
+    args = parser.parse_args(argv)
+
+    if args.matrix:
+        matrices = OrderedDict([('all', Age_Structured_SEIR.load_contact_matrix(args.matrix))])
+    else:
+        matrices = Age_Structured_SEIR.contact_matrices()
+
+    u = {setting: getattr(args, 'u_' + setting) for setting in SETTINGS if getattr(args, 'u_' + setting) is not None}
+    if u and args.matrix:
+        parser.error('The mitigation of a setting needs the illustrative matrices of every setting')
+    u = {setting: u.get(setting, args.u) for setting in matrices} if u else args.u
+
+    start = time.perf_counter()
+    result = Age_Structured_SEIR.solve(args.N, args.I, args.days, args.alpha, args.beta, args.gamma, u, matrices)
+    seconds = time.perf_counter() - start
+
+    # the SEIR model of the SEIR page with the same parameters for comparison
+    start = time.perf_counter()
+    odeint(Model_Kernels.seir_model, (args.N - args.I, 0, args.I, 0), range(0, args.days), args = (args.N, args.alpha, (1 - args.u) * args.beta, args.gamma),
+           Dfun = Model_Kernels.seir_jacobian)
+    scalar_seconds = time.perf_counter() - start
+
+    print('{:>8} {:>12} {:>12} {:>14} {:>9}'.format('Age', 'Population', 'Attack rate', 'Peak infected', 'Peak day'))
+    for band, population, attack_rate, peak, day in zip(result.bands, result.population, result.attack_rate, result.peak_infected, result.peak_day):
+        print('{:>8} {:>12.0f} {:>12.1%} {:>14.0f} {:>9}'.format(band, population, attack_rate, peak, day))
+    print('Total attack rate: {:.1%}'.format(1 - result.trajectory[-1, 0].sum() / result.population.sum()))
+    print('{} age bands solved in {:.1f}ms, the SEIR model in {:.1f}ms'.format(len(result.bands), seconds * 1000, scalar_seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
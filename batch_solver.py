@@ -0,0 +1,78 @@
+# this python file consists of the batch solver used to integrate many scenarios of a model in a single vectorized pass
+
+# the models are the same as the model functions in 'modelling.py'(SIR, SIRD, SEIR and SEIR with mitigation). The states of all scenarios are stacked into a single system which is passed to odeint once, the model functions and jacobians of 'model_kernels.py' are evaluated for every scenario at the same time using numpy arrays and the jacobian is passed as banded(every scenario only depends on its own compartments) so its cost does not grow with the number of scenarios - Refer https://docs.scipy.org/doc/scipy/reference/generated/scipy.integrate.odeint.html
+
+###### NECESSARY IMPORTS ######
+import numpy as np
+from scipy.integrate import odeint
+from model_kernels import KERNELS
+
+# compartments and parameters of every model, parameters are listed in the same order as the 'args' of the model functions in 'modelling.py'
+MODELS = {
+    'sir': {'compartments': ('S', 'I', 'R'), 'parameters': ('N', 'beta', 'gamma')},
+    'sird': {'compartments': ('S', 'I', 'R', 'D'), 'parameters': ('N', 'beta', 'gamma', 'sigma')},
+    'seir': {'compartments': ('S', 'E', 'I', 'R'), 'parameters': ('N', 'alpha', 'beta', 'gamma')},
+    'seirm': {'compartments': ('S', 'E', 'I', 'R'), 'parameters': ('u', 'N', 'alpha', 'beta', 'gamma')},
+    }
+
+
+class Batch_Solver:
+
+    # function defined to integrate a batch of scenarios of a model
+    # 'y0' has one row per scenario(a single row is used for every scenario) and every parameter is given as a scalar or as an array with one value per scenario
+    # the result has the shape (scenarios x days x compartments), 'chunk_size' splits very large batches so that a single fast scenario does not force small steps on all others
+    @staticmethod
+    def solve(model, y0, days, chunk_size = None, rtol = None, atol = None, **params):
+        if model not in MODELS:
+            raise ValueError('Unknown model {!r}, expected one of {}'.format(model, ', '.join(MODELS)))
+
+        names = MODELS[model]['parameters']
+        missing = [name for name in names if name not in params]
+        unknown = [name for name in params if name not in names]
+        if missing or unknown:
+            raise TypeError('Model {!r} takes the parameters {}'.format(model, ', '.join(names)))
+
+        k = len(MODELS[model]['compartments'])
+        y0 = np.atleast_2d(np.asarray(y0, dtype = float))
+        if y0.shape[1] != k:
+            raise ValueError('Model {!r} has {} compartments, got initial states with {}'.format(model, k, y0.shape[1]))
+
+        # every parameter and the initial states are broadcast to the number of scenarios
+        n = max([y0.shape[0]] + [np.size(params[name]) for name in names])
+        y0 = np.broadcast_to(y0, (n, k))
+        args = [np.broadcast_to(np.asarray(params[name], dtype = float), (n,)) for name in names]
+
+        days = np.asarray(days, dtype = float)
+        model_function, jacobian_function = KERNELS[model]
+        chunk_size = chunk_size or n
+        result = np.empty((n, len(days), k))
+
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            chunk_args = [arg[start:stop] for arg in args]
+            m = stop - start
+
+            # the compartments of a scenario are stored next to each other, the model functions receive one array per compartment
+            def flat_rhs(y, t):
+                return np.stack(model_function(y.reshape(m, k).T, t, *chunk_args), axis = 1).ravel()
+
+            # the jacobian of the stacked system is block diagonal, odeint expects its bands as rows where band[i - j + k - 1, j] holds the derivative of equation i with respect to state j
+            def flat_jacobian(y, t):
+                jacobian = jacobian_function(y.reshape(m, k).T, t, *chunk_args)
+                band = np.zeros((2 * k - 1, m * k))
+                for i in range(k):
+                    for j in range(k):
+                        band[i - j + k - 1, j::k] = jacobian[i][j]
+
+                return band
+
+            options = {}
+            if rtol is not None:
+                options['rtol'] = rtol
+            if atol is not None:
+                options['atol'] = atol
+
+            ret = odeint(flat_rhs, y0[start:stop].ravel(), days, Dfun = flat_jacobian, ml = k - 1, mu = k - 1, **options)
+            result[start:stop] = ret.reshape(len(days), m, k).transpose(1, 0, 2)
+
+        return result
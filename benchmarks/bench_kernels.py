@@ -0,0 +1,55 @@
+# this python file benchmarks a single odeint solve of every model with the model functions as they were before('@st.cache' wrapped) and with the plain model functions of 'model_kernels.py'(with and without the analytic jacobian)
+
+# using command prompt or terminal run "python benchmarks/bench_kernels.py" from the main directory
+
+###### NECESSARY IMPORTS ######
+import os
+import sys
+import timeit
+import logging
+import numpy as np
+from scipy.integrate import odeint
+import streamlit as st
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_kernels import KERNELS
+
+# streamlit logs a warning for every cached call made outside of 'streamlit run'
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+# default page settings of every model(population 1000 with a single infected or exposed person)
+N = 1000
+SCENARIOS = {
+    'sir': ([N - 1, 1, 0], (N, 0.05 * 4, 1 / 10)),
+    'sird': ([N - 1, 1, 0, 0], (N, 0.05 * 10, 1 / 6, 1 / 10)),
+    'seir': ([N - 1, 1, 0, 0], (N, 1 / 3, 0.05 * 10, 1 / 5)),
+    'seirm': ([N - 1, 1, 0, 0], (0.0, N, 1 / 3, 0.05 * 10, 1 / 5)),
+    }
+
+
+# function defined to return the mean time of a solve in milliseconds
+def time_solve(model_function, y0, days, args, jacobian = None, repeat = 5):
+    def solve():
+        odeint(model_function, y0, days, args = args, Dfun = jacobian)
+
+    number = 3
+    return min(timeit.repeat(solve, number = number, repeat = repeat)) / number * 1000
+
+
+def main():
+    print('{:<6} {:>5} {:>12} {:>12} {:>14} {:>9}'.format('model', 'days', 'st.cache ms', 'kernel ms', 'kernel+jac ms', 'speed-up'))
+
+    for model, (y0, args) in SCENARIOS.items():
+        model_function, jacobian = KERNELS[model]
+        cached_function = st.cache(model_function) if hasattr(st, 'cache') else None
+
+        for day_value in (150, 730):
+            days = np.arange(day_value)
+            before = time_solve(cached_function, y0, days, args) if cached_function else float('nan')
+            plain = time_solve(model_function, y0, days, args)
+            after = time_solve(model_function, y0, days, args, jacobian)
+            print('{:<6} {:>5} {:>12.2f} {:>12.2f} {:>14.2f} {:>8.1f}x'.format(model, day_value, before, plain, after, before / after))
+
+
+if __name__ == '__main__':
+    main()
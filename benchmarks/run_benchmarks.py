@@ -0,0 +1,394 @@
+# this python file consists of the benchmark suite of the application, every stage of a page rerun is timed separately so a change can be checked for making EPIDEMOS faster or slower
+
+# using command prompt or terminal run "python benchmarks/run_benchmarks.py" from the main directory, "python benchmarks/run_benchmarks.py --help" lists all options
+
+# the benchmarks run offline against the fixtures in 'benchmarks/fixtures':
+# cases_country.csv - dataset in the layout of the JHU CSSE web-data dataset
+# population.html - population table in the layout of the worldometers page(Refer 'population.py')
+# locations.csv - provinces and countries of the JHU CSSE time series datasets, the confirmed, recovered and deceased time series are synthesized from it with a fixed seed(about 1100 days like the upstream datasets, too large to be bundled)
+
+# the following stages are timed:
+# ingest - reading the raw datasets from the snapshot cache one by one and all at the same time(Refer 'snapshot_cache.py')
+# clean - the loading of the country dataset and of the time series cube done by the background refresher(Refer 'data_refresher.py', the cube is built, opened from the store and updated with one new date), the bundled population table and the parsing of the worldometers page(Refer 'population.py') the read of the ready datasets by a page and the allocations of a comparison page taking a series from the shared dataset
+# solve - a solve of every model at 150 and 730 days(without the solve cache and the trajectory tables) a stochastic ensemble of every model(Refer 'stochastic.py') the metapopulation SEIR model of all countries(Refer 'metapopulation.py') the age-structured SEIR model of 16 age bands(Refer 'age_structured.py') and 64 mitigation schedules of the SEIR(MITIGATION) model solved at once(Refer 'mitigation_schedule.py')
+# render - the matplotlib figure of the SIR page(built, built and drawn to PNG under 'RendererAgg.lock', and taken from the cache of 'plot_render.py') and the plotly bar charts of the dashboard(built, and built and serialized as 'st.plotly_chart' does)
+
+# the results are written as JSON(default is 'benchmark_results.json') with the minimum, median, mean and maximum time in milliseconds of every benchmark, a previous result file can be passed with --baseline to print the change of every benchmark and exit with status 1 when one of them got slower than --max-slowdown
+
+###### NECESSARY IMPORTS ######
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# streamlit logs a warning for every cached call made outside of 'streamlit run'
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+
+import matplotlib
+matplotlib.use('Agg')
+import plotly
+import plotly.express as px
+import scipy
+
+import modelling
+from modelling import Modelling
+from population import Population_Data
+from snapshot_cache import Snapshot_Cache, Snapshot
+from data_store import Data_Store
+from data_refresher import Data_Refresher
+from solve_cache import Solve_Cache
+from plot_render import Plot_Renderer
+from stochastic import Stochastic_Ensemble
+import metapopulation
+import age_structured
+from age_structured import Age_Structured_SEIR
+import mitigation_schedule
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# first day and number of days of the synthesized time series, the recovered cases are not reported anymore after the same day as upstream(4 August 2021)
+FIRST_DAY = '2020-01-22'
+SERIES_DAYS = 1143
+RECOVERED_DAYS = 561
+SEED = 2021
+
+STAGES = ('ingest', 'clean', 'solve', 'render')
+
+STOCHASTIC_REALIZATIONS = 1000
+
+# default page settings of every model(population 1000 with a single infected or exposed person)
+N = 1000
+SCENARIOS = {
+    'sir': ([N - 1, 1, 0], (N, 0.05 * 4, 1 / 10)),
+    'sird': ([N - 1, 1, 0, 0], (N, 0.05 * 10, 1 / 6, 1 / 10)),
+    'seir': ([N - 1, 1, 0, 0], (N, 1 / 3, 0.05 * 10, 1 / 5)),
+    'seirm': ([N - 1, 1, 0, 0], (0.0, N, 1 / 3, 0.05 * 10, 1 / 5)),
+    }
+
+
+# function defined to synthesize the time series datasets(confirmed, recovered and deaths) in the layout of the JHU CSSE datasets
+# 'drop_days' leaves out the most recent days(the datasets of an earlier day)
+def synthesize_time_series(drop_days = 0):
+    locations = pd.read_csv(os.path.join(FIXTURE_DIR, 'locations.csv'), keep_default_na = False)
+    rng = np.random.default_rng(SEED)
+    n = len(locations)
+    days = np.arange(SERIES_DAYS)
+
+    # every location has three waves of new cases, the cumulative cases are the sum of three logistic curves
+    size = 10 ** rng.uniform(2, 6.5, (n, 1))
+    centres = np.sort(rng.uniform(40, SERIES_DAYS - 100, (n, 3)), axis = 1)
+    widths = rng.uniform(8, 40, (n, 3))
+    shares = rng.dirichlet(np.ones(3), n)
+    waves = shares[:, :, None] / (1 + np.exp(-(days[None, None, :] - centres[:, :, None]) / widths[:, :, None]))
+    confirmed = np.floor(size * waves.sum(axis = 1)).astype(np.int64)
+
+    deaths = np.floor(confirmed * rng.uniform(0.002, 0.03, (n, 1))).astype(np.int64)
+    recovered = np.zeros_like(confirmed)
+    recovered[:, 14:] = np.floor((confirmed[:, :-14] - deaths[:, :-14]) * rng.uniform(0.6, 0.98, (n, 1)))
+    recovered[:, RECOVERED_DAYS:] = 0
+
+    columns = ['{}/{}/{:%y}'.format(day.month, day.day, day) for day in pd.date_range(FIRST_DAY, periods = SERIES_DAYS)]
+    datasets = {}
+    for metric, values in (('confirmed', confirmed), ('recovered', recovered), ('deaths', deaths)):
+        frame = pd.concat([locations, pd.DataFrame(values, columns = columns).iloc[:, :SERIES_DAYS - drop_days]], axis = 1)
+        datasets[metric] = frame.to_csv(index = False).encode('utf-8')
+
+    return datasets
+
+
+# function defined to store every raw dataset in a snapshot cache which never revalidates
+def fixture_snapshot_cache(directory, drop_days = 0):
+    cache = Snapshot_Cache(directory = directory, ttl = float('inf'), mirror = '')
+
+    with open(os.path.join(FIXTURE_DIR, 'cases_country.csv'), 'rb') as f:
+        contents = {'cases_country.csv': f.read()}
+    for metric, content in synthesize_time_series(drop_days).items():
+        contents[modelling.TIME_SERIES_SOURCES[metric][0]] = content
+
+    for name, content in contents.items():
+        cache._write(Snapshot(name = name,
+                              content = content,
+                              etag = None,
+                              last_modified = None,
+                              checked_at = time.time(),
+                              version = hashlib.sha1(content).hexdigest(),
+                              status = 'downloaded'))
+
+    return cache
+
+
+# function defined to return the peak number of bytes allocated by a call of a function
+def allocated(function):
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+# function defined to time a function, 'setup' is called before every run and is not timed
+def measure(function, repeat, setup = None):
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append((time.perf_counter() - start) * 1000)
+
+    return {'repeat': repeat,
+            'min_ms': min(times),
+            'median_ms': float(np.median(times)),
+            'mean_ms': float(np.mean(times)),
+            'max_ms': max(times)}
+
+
+# lines of the SIR page plot, the same lines as the SIR page of 'epidemicModelling.py'
+def sir_lines(S, I, R):
+    return [(S/1000, 'k', 2, '-', 'Susceptible'),
+            (I/1000, '#FF0000', 2, ':', 'Infected'),
+            (R/1000, 'c', 2, '--', 'Recovered')]
+
+
+# function defined to build the three bar charts of the dashboard, the same steps as the dashboard of 'epidemicModelling.py'
+def dashboard_bars(country_data, count = 10):
+    figures = []
+    for column, label in (('Confirmed', 'Infected Count'), ('Recovered', 'Recovered Count'), ('Deaths', 'Deceased Count')):
+        sorted_country = country_data.sort_values(column, ascending = False)
+        figures.append(px.bar(sorted_country.head(count),
+                            x = 'Country', y = column,
+                            hover_data = ['Country', column],
+                            color = column,
+                            labels = {column: label},
+                            height = 500))
+
+    return figures
+
+
+# function defined to run all benchmarks of the selected stages
+def run(stages, repeat, work_dir):
+    results = []
+
+    def record(stage, name, timing, **extra):
+        results.append(dict(stage = stage, name = name, **timing, **extra))
+        print('{:<8} {:<32} {:>10.2f} {:>10.2f} {:>10.2f}'.format(stage, name, timing['min_ms'], timing['median_ms'], timing['max_ms']))
+
+    print('{:<8} {:<32} {:>10} {:>10} {:>10}'.format('stage', 'benchmark', 'min ms', 'median ms', 'max ms'))
+
+    cache = fixture_snapshot_cache(os.path.join(work_dir, 'snapshots'))
+    modelling.snapshot_cache = cache
+    # the datasets are loaded in the benchmark process instead of a background thread
+    modelling.data_refresher = Data_Refresher(Modelling.load_datasets, interval = 0)
+
+    # every cleaning run starts with an empty store so the datasets are cleaned instead of opened from the store
+    store_dir = os.path.join(work_dir, 'store')
+
+    def empty_store():
+        shutil.rmtree(store_dir, ignore_errors = True)
+        modelling.data_store = Data_Store(store_dir)
+        modelling.cube_cache.clear()
+
+    empty_store()
+
+    if 'ingest' in stages:
+        for name in ['cases_country.csv'] + [modelling.TIME_SERIES_SOURCES[metric][0] for metric in ('confirmed', 'recovered', 'deaths')]:
+            record('ingest', name, measure(lambda: cache.fetch(name, ''), repeat), bytes = len(cache.fetch(name, '').content))
+        # all datasets fetched at the same time as the background refresher does(Refer 'Snapshot_Cache.fetch_all')
+        sources = [('cases_country.csv', '')] + [(modelling.TIME_SERIES_SOURCES[metric][0], '') for metric in ('confirmed', 'recovered', 'deaths')]
+        record('ingest', 'fetch_all', measure(lambda: cache.fetch_all(sources), repeat), sources = len(sources))
+
+    if 'clean' in stages:
+        with open(os.path.join(FIXTURE_DIR, 'population.html'), 'r', encoding = 'utf-8') as f:
+            page_text = f.read()
+        record('clean', 'population_table(bundled)', measure(Population_Data.load_population_table, repeat))
+        record('clean', 'parse_population_table', measure(lambda: Population_Data.parse_population_table(page_text), repeat))
+        record('clean', 'country_clean', measure(Modelling.load_country_data, repeat, setup = empty_store))
+        record('clean', 'country_clean(store)', measure(Modelling.load_country_data, repeat),
+               bytes = int(Modelling.load_country_data()[0].memory_usage(index = True, deep = True).sum()))
+        # the cube is built before the runs therefore only the extraction of the frame is timed
+        warm_cube = Modelling.load_time_series_cube()[0]
+        for metric in ('confirmed', 'recovered', 'deaths'):
+            record('clean', '{}_frame'.format(metric), measure(lambda: warm_cube.frame(metric), repeat))
+        record('clean', 'time_series_cube', measure(Modelling.load_time_series_cube, repeat, setup = empty_store),
+               bytes = Modelling.load_time_series_cube()[0].memory_usage()['data'])
+
+        def clear_cube_cache():
+            modelling.cube_cache.clear()
+
+        record('clean', 'time_series_cube(store)', measure(Modelling.load_time_series_cube, repeat, setup = clear_cube_cache))
+
+        # the cube of the previous day is built before every run therefore the run only cleans the revision window and the new date
+        previous_cache = fixture_snapshot_cache(os.path.join(work_dir, 'previous_snapshots'), drop_days = 1)
+
+        def previous_day_cube():
+            empty_store()
+            modelling.snapshot_cache = previous_cache
+            Modelling.load_time_series_cube()
+            modelling.snapshot_cache = cache
+
+        record('clean', 'time_series_cube(+1 day)', measure(Modelling.load_time_series_cube, repeat, setup = previous_day_cube))
+        modelling.snapshot_cache = cache
+
+        # a page reading the version swapped in by the last refresh
+        refresher = Data_Refresher(Modelling.load_datasets)
+        refresher.refresh()
+        record('clean', 'country_clean(ready)', measure(lambda: refresher.dataset().country, repeat))
+
+        # a rerun of a comparison page taking the countries, the population and the series of a country from the read-only shared dataset(Refer 'shared_dataset.py')
+        shared = refresher.dataset().shared
+
+        def interaction():
+            return shared.countries, shared.population('Germany'), shared.series('Germany', 'confirmed'), shared.series('Germany', 'recovered')
+
+        record('clean', 'shared_dataset(interaction)', measure(interaction, repeat), allocated_bytes = allocated(interaction))
+
+    if 'solve' in stages:
+        # a cache holding nothing integrates the model on every call
+        uncached = Solve_Cache(max_bytes = 0)
+        for model, (initial_state, args) in SCENARIOS.items():
+            for day_value in (150, 730):
+                record('solve', '{}/{}'.format(model, day_value), measure(lambda: uncached.solve(model, initial_state, day_value, args), repeat), days = day_value)
+
+        # metapopulation SEIR of all countries of the fixtures, the network and the solve caches are cleared before every run
+        def clear_metapopulation():
+            metapopulation.network_cache.clear()
+            metapopulation.metapopulation_cache.clear()
+
+        for day_value in (150, 730):
+            record('solve', 'metapopulation/{}'.format(day_value), measure(lambda: Modelling.metapopulation('China', 100, day_value, 1/3, 0.05 * 6, 1/5, 0.01), repeat, setup = clear_metapopulation),
+                   days = day_value, countries = len(Modelling.metapopulation_data()))
+
+        # age-structured SEIR of the 16 default age bands with a mitigation control per setting, the solve cache is cleared before every run
+        for day_value in (150, 730):
+            record('solve', 'age_seir/16/{}'.format(day_value), measure(lambda: Age_Structured_SEIR.solve(1000000, 10, day_value, 1/3, 0.05 * 6, 1/5, {'school': 1.0, 'work': 0.5}), repeat, setup = age_structured.age_cache.clear),
+                   days = day_value, age_bands = len(age_structured.AGE_BANDS))
+
+        # lockdowns starting on 8 days with 8 controls and released over 14 days, every schedule also has a lockdown trigger, the solve cache is cleared before every run
+        schedules = [Modelling.mitigation_schedule(0.0, [(day, u), (day + 60, 0.1, 14)], [(20000, 0.8)]) for day in range(10, 90, 10) for u in np.linspace(0.2, 0.9, 8)]
+        initial_state, args = SCENARIOS['seirm']
+        record('solve', 'schedules/{}/730'.format(len(schedules)), measure(lambda: Modelling.mitigation_schedules(initial_state, 730, args[1:], schedules), repeat, setup = mitigation_schedule.schedule_cache.clear),
+               days = 730, schedules = len(schedules))
+
+        # stochastic ensembles of 1000 realizations in the benchmark process, the throughput is recorded to size larger runs
+        for model, (initial_state, args) in SCENARIOS.items():
+            timing = measure(lambda: Stochastic_Ensemble.run(model, initial_state, 150, args, realizations = STOCHASTIC_REALIZATIONS, seed = SEED), repeat)
+            record('solve', 'stochastic/{}/150'.format(model), timing, days = 150, realizations = STOCHASTIC_REALIZATIONS,
+                   realizations_per_second = STOCHASTIC_REALIZATIONS / timing['median_ms'] * 1000)
+
+    if 'render' in stages:
+        for day_value in (150, 730):
+            t = np.arange(day_value)
+            S, I, R = uncached_solve('sir', day_value).T
+            # the same value as 'Modelling.pop_value', which is not called as '@st.cache' warns outside of 'streamlit run'
+            value = (N/1000) + 0.2
+
+            lines = sir_lines(S, I, R)
+
+            # drawn in the benchmark process under RendererAgg.lock, the same as the application process without worker processes
+            renderer = Plot_Renderer(workers = 0)
+
+            def clear_renderer():
+                renderer.clear()
+
+            record('render', 'sir_figure/{}'.format(day_value), measure(lambda: Plot_Renderer.figure('SIR PLOT', t, value, lines), repeat), days = day_value)
+            record('render', 'sir_figure+png/{}'.format(day_value), measure(lambda: renderer.render('SIR PLOT', t, value, lines), repeat, setup = clear_renderer), days = day_value)
+            record('render', 'sir_figure+png(cache)/{}'.format(day_value), measure(lambda: renderer.render('SIR PLOT', t, value, lines), repeat), days = day_value)
+
+        country_data = Modelling.country_clean()
+        record('render', 'dashboard_bars', measure(lambda: dashboard_bars(country_data), repeat))
+        record('render', 'dashboard_bars+json', measure(lambda: [figure.to_json() for figure in dashboard_bars(country_data)], repeat))
+
+    return results
+
+
+# function defined to solve a model without any cache
+def uncached_solve(model, day_value):
+    initial_state, args = SCENARIOS[model]
+    return Solve_Cache(max_bytes = 0).solve(model, initial_state, day_value, args)
+
+
+# function defined to describe the environment of a run so results of different machines and releases can be told apart
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd = ROOT, capture_output = True, text = True, timeout = 10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {'commit': commit,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+            'cpus': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scipy': scipy.__version__,
+            'matplotlib': matplotlib.__version__,
+            'plotly': plotly.__version__}
+
+
+# function defined to compare the results with a previous result file, the benchmarks slower than 'max_slowdown' times the baseline median are returned
+def compare(results, baseline_path, max_slowdown):
+    with open(baseline_path, 'r') as f:
+        baseline = {(result['stage'], result['name']): result for result in json.load(f)['results']}
+
+    print('\n{:<8} {:<32} {:>12} {:>12} {:>8}'.format('stage', 'benchmark', 'baseline ms', 'median ms', 'change'))
+    slower = []
+    for result in results:
+        previous = baseline.get((result['stage'], result['name']))
+        if previous is None:
+            continue
+        ratio = result['median_ms'] / previous['median_ms'] if previous['median_ms'] else float('inf')
+        print('{:<8} {:<32} {:>12.2f} {:>12.2f} {:>7.2f}x'.format(result['stage'], result['name'], previous['median_ms'], result['median_ms'], ratio))
+        if ratio > max_slowdown:
+            slower.append(result)
+
+    return slower
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Time the data ingest, cleaning, model solves and figure rendering of EPIDEMOS against the bundled fixtures.')
+    parser.add_argument('stages', nargs = '*', help = 'stages to run(ingest, clean, solve and render), default is all stages')
+    parser.add_argument('-o', '--output', default = 'benchmark_results.json', help = 'result file, default is benchmark_results.json')
+    parser.add_argument('-r', '--repeat', type = int, default = 5, help = 'number of runs of every benchmark, default is 5')
+    parser.add_argument('--baseline', help = 'result file of a previous run to compare with')
+    parser.add_argument('--max-slowdown', type = float, default = 1.25, help = 'largest accepted ratio of the median time to the baseline median, default is 1.25')
+    args = parser.parse_args(argv)
+
+    stages = args.stages or list(STAGES)
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error('Unknown stages {}, expected one of {}'.format(', '.join(unknown), ', '.join(STAGES)))
+    work_dir = tempfile.mkdtemp(prefix = 'epidemos-bench-')
+    try:
+        results = run(stages, args.repeat, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors = True)
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent = 2)
+    print('\nResults written to {}'.format(args.output))
+
+    if args.baseline:
+        slower = compare(results, args.baseline, args.max_slowdown)
+        if slower:
+            print('\n{} benchmarks are more than {:.2f}x slower than the baseline: {}'.format(len(slower), args.max_slowdown, ', '.join(result['name'] for result in slower)))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
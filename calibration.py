@@ -0,0 +1,140 @@
+# this python file consists of the calibration used by the "COVID-19 STATISTICS COMPARISON" of the SIR and SIR-D pages to fit the model parameters to the data of a country
+
+# the parameters are fitted using least squares - Refer https://docs.scipy.org/doc/scipy/reference/generated/scipy.optimize.least_squares.html
+# the gradients of the residuals are calculated using forward sensitivities, that is, the derivatives of the model compartments with respect to the parameters are integrated together with the model itself, therefore a single solve provides both the residuals and their jacobian
+
+# the observed series are compared with the model as follows:
+# confirmed cases - all people that have been infected so far(N - S)
+# recovered cases - recovered compartment(R)
+# deceased cases - deceased compartment(D, SIR-D model only)
+
+###### NECESSARY IMPORTS ######
+import hashlib
+import threading
+from collections import namedtuple, OrderedDict
+import numpy as np
+from scipy.integrate import odeint
+from scipy.optimize import least_squares
+from model_kernels import KERNELS
+
+# parameters fitted for every model(in the same order as the 'args' of the model functions after N), the observed metrics used and the bounds of the parameters
+FIT_MODELS = {
+    'sir': {'parameters': ('beta', 'gamma'), 'metrics': ('confirmed', 'recovered'), 'bounds': ((1e-3, 1e-3), (5.0, 1.0))},
+    'sird': {'parameters': ('beta', 'gamma', 'sigma'), 'metrics': ('confirmed', 'recovered', 'deaths'), 'bounds': ((1e-3, 1e-3, 1e-6), (5.0, 1.0, 1.0))},
+    }
+
+Calibration_Result = namedtuple('Calibration_Result', ['parameters', 'trajectory', 'cost', 'evaluations', 'success', 'message'])
+
+# the most recent fits are kept so reruns of a page with the same country do not fit again, the cache is shared by the sessions of the process and only used under its lock(the fit itself runs outside of the lock)
+FIT_CACHE_SIZE = 32
+fit_cache = OrderedDict()
+fit_cache_lock = threading.Lock()
+
+
+class Model_Calibration:
+
+    # functions defined for the derivatives of the model equations with respect to the fitted parameters, one row per parameter
+    @staticmethod
+    def sir_parameter_derivatives(state, N, beta, gamma):
+        S, I, R = state
+        contact = S * I / N
+        return ((-contact, contact, 0.0),
+                (0.0, -I, I))
+
+    @staticmethod
+    def sird_parameter_derivatives(state, N, beta, gamma, sigma):
+        S, I, R, D = state
+        contact = S * I / N
+        return ((-contact, contact, 0.0, 0.0),
+                (0.0, -I, I, 0.0),
+                (0.0, -I, 0.0, I))
+
+    # function defined to solve a model together with its forward sensitivities with respect to the logarithm of the parameters
+    # the result is the trajectory (days x compartments) and the sensitivities (days x compartments x parameters)
+    @staticmethod
+    def solve_with_sensitivities(model, initial_state, days, N, parameters):
+        model_function, jacobian_function = KERNELS[model]
+        derivative_function = getattr(Model_Calibration, model + '_parameter_derivatives')
+        k = len(initial_state)
+        p = len(parameters)
+        scale = np.asarray(parameters, dtype = float)
+
+        def augmented(y, t):
+            state = y[:k]
+            sensitivities = y[k:].reshape(k, p)
+            jacobian = np.array(jacobian_function(state, t, N, *parameters))
+            # d(dy/dt)/dlog(p) = p * d(dy/dt)/dp
+            derivatives = np.array(derivative_function(state, N, *parameters)).T * scale
+            return np.concatenate((model_function(state, t, N, *parameters), (jacobian @ sensitivities + derivatives).ravel()))
+
+        y0 = np.concatenate((np.asarray(initial_state, dtype = float), np.zeros(k * p)))
+        ret = odeint(augmented, y0, days)
+
+        return ret[:, :k], ret[:, k:].reshape(len(days), k, p)
+
+    # function defined to fit a model to the observed series of a country
+    # 'observed' maps the metrics of the model('confirmed', 'recovered' and 'deaths' for SIR-D) to cumulative series starting at the same day as 'initial_state'
+    # 'initial_guess' holds the starting values of the fitted parameters, for example the current slider values of the page
+    @staticmethod
+    def fit(model, observed, N, initial_state, initial_guess):
+        settings = FIT_MODELS[model]
+        metrics = settings['metrics']
+        series = np.stack([np.asarray(observed[metric], dtype = float) for metric in metrics])
+        days = np.arange(series.shape[1])
+
+        key = (model, float(N), tuple(float(v) for v in initial_state), hashlib.sha1(series.tobytes()).hexdigest())
+        with fit_cache_lock:
+            cached = fit_cache.get(key)
+            if cached is not None:
+                fit_cache.move_to_end(key)
+                return cached
+
+        # cumulative series are not reported anymore once they drop back to zero(for example the recovered cases), these days are left out of the fit
+        valid = ~((series == 0) & (np.maximum.accumulate(series, axis = 1) > 0))
+        # every metric is scaled by its largest value so the smaller series(deaths) are fitted as well as the confirmed cases
+        weights = valid / np.maximum(series.max(axis = 1, keepdims = True), 1.0)
+
+        # the model compartments compared with every metric, 'confirmed' is the sum of all compartments except S
+        def observe(trajectory):
+            columns = {'confirmed': N - trajectory[..., 0], 'recovered': trajectory[..., 2], 'deaths': trajectory[..., -1]}
+            return np.stack([columns[metric] for metric in metrics])
+
+        last = {}
+
+        def solve(x):
+            if last.get('x') is None or not np.array_equal(last['x'], x):
+                trajectory, sensitivities = Model_Calibration.solve_with_sensitivities(model, initial_state, days, N, np.exp(x))
+                last.update(x = x.copy(), trajectory = trajectory, sensitivities = sensitivities)
+
+            return last['trajectory'], last['sensitivities']
+
+        def residuals(x):
+            trajectory, _ = solve(x)
+            return ((observe(trajectory) - series) * weights).ravel()
+
+        def jacobian(x):
+            _, sensitivities = solve(x)
+            # the sensitivity of N - S is the negative sensitivity of S
+            rows = observe(np.moveaxis(sensitivities, 2, 0))
+            rows[list(metrics).index('confirmed')] = -sensitivities[:, 0, :].T
+            return (np.moveaxis(rows, 1, 2) * weights[:, :, None]).reshape(-1, len(settings['parameters']))
+
+        lower, upper = np.log(settings['bounds'][0]), np.log(settings['bounds'][1])
+        x0 = np.clip(np.log(np.asarray(initial_guess, dtype = float)), lower, upper)
+        solution = least_squares(residuals, x0, jac = jacobian, bounds = (lower, upper), method = 'trf', x_scale = 1.0)
+
+        trajectory, _ = solve(solution.x)
+        result = Calibration_Result(parameters = dict(zip(settings['parameters'], np.exp(solution.x))),
+                                    trajectory = trajectory,
+                                    cost = float(solution.cost),
+                                    evaluations = int(solution.nfev),
+                                    success = bool(solution.success),
+                                    message = solution.message)
+
+        with fit_cache_lock:
+            fit_cache[key] = result
+            fit_cache.move_to_end(key)
+            if len(fit_cache) > FIT_CACHE_SIZE:
+                fit_cache.popitem(last = False)
+
+        return result
@@ -0,0 +1,144 @@
+# this python file consists of the registry of the countries used by every loader of the application(the cleaning functions in 'modelling.py' and the population table in 'population.py')
+
+# the datasets name the countries differently, for example the JHU CSSE datasets use 'Taiwan*', 'Korea, South' and 'US' and worldometers uses 'South Korea' and 'Czech Republic (Czechia)'. The registry holds the name used by the application, the ISO3 code and an integer key of every country('data/countries.csv'), the aliases of the names used by the datasets and the names which are not countries(cruise ships, the Summer Olympics and the territories of worldometers)
+# a dataset is normalized in a single pass, the country column is converted to a categorical column therefore the aliases and exclusions are only looked up once for every distinct name instead of once for every row - Refer https://pandas.pydata.org/pandas-docs/stable/user_guide/categorical.html
+# names which are neither countries of the registry, aliases or exclusions are kept as they are and reported, "python country_registry.py FILE ..." lists the unmatched names of CSV files or worldometers pages
+
+###### NECESSARY IMPORTS ######
+import os
+import sys
+import threading
+import numpy as np
+import pandas as pd
+
+COUNTRIES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'countries.csv')
+
+# names used by the datasets for the countries of the registry
+ALIASES = {
+    # JHU CSSE datasets
+    'Taiwan*': 'Taiwan',
+    'Korea, South': 'Korea (South)',
+    'US': 'United States',
+    # worldometers
+    'Myanmar': 'Burma',
+    'Congo': 'Congo (Brazzaville)',
+    'DR Congo': 'Congo (Kinshasa)',
+    "Côte d'Ivoire": "Cote d'Ivoire",
+    'Czech Republic (Czechia)': 'Czechia',
+    'North Korea': 'Korea, North',
+    'South Korea': 'Korea (South)',
+    'Saint Kitts & Nevis': 'Saint Kitts and Nevis',
+    'St. Vincent & Grenadines': 'Saint Vincent and the Grenadines',
+    'Sao Tome & Principe': 'Sao Tome and Principe',
+    'State of Palestine': 'West Bank and Gaza',
+    }
+
+# names which are not countries of the application
+EXCLUSIONS = frozenset([
+    # JHU CSSE datasets
+    'Diamond Princess', 'MS Zaandam', 'Summer Olympics 2020',
+    # territories listed by worldometers
+    'American Samoa', 'Anguilla', 'Aruba', 'Bermuda', 'British Virgin Islands', 'Caribbean Netherlands', 'Cayman Islands', 'Channel Islands',
+    'Cook Islands', 'Curaçao', 'Faeroe Islands', 'Falkland Islands', 'French Guiana', 'French Polynesia', 'Gibraltar', 'Greenland', 'Guadeloupe',
+    'Guam', 'Hong Kong', 'Isle of Man', 'Macao', 'Martinique', 'Mayotte', 'Montserrat', 'New Caledonia', 'Niue', 'Northern Mariana Islands',
+    'Puerto Rico', 'Réunion', 'Saint Barthelemy', 'Saint Helena', 'Saint Martin', 'Saint Pierre & Miquelon', 'Sint Maarten', 'Tokelau',
+    'Turkmenistan', 'Turks and Caicos', 'U.S. Virgin Islands', 'Wallis & Futuna', 'Western Sahara',
+    ])
+
+
+class Country_Registry:
+
+    def __init__(self, path = COUNTRIES_FILE):
+        self.countries = pd.read_csv(path, comment = '#', keep_default_na = False, dtype = {'Key': 'int64', 'ISO3': str, 'Country': str})
+        # every name(the names of the application and the aliases) is looked up to the position of its country in the registry
+        position = pd.Series(np.arange(len(self.countries)), index = self.countries['Country'])
+        self.lookup = dict(position)
+        self.lookup.update({alias: self.lookup[name] for alias, name in ALIASES.items()})
+        # unmatched names of every source with their number of rows
+        self.unmatched = {}
+        self._lock = threading.Lock()
+
+    # function defined to return the positions of the names in the registry(-1 for unknown names) and the mask of the excluded names, 'names' is converted to a categorical column so every distinct name is only looked up once
+    def match(self, names, source = None):
+        names = pd.Categorical(names)
+        categories = names.categories
+        positions = np.fromiter((self.lookup.get(name, -1) for name in categories), dtype = np.int64, count = len(categories))
+        excluded = categories.isin(EXCLUSIONS)
+
+        unknown = (positions < 0) & ~excluded
+        if source is not None and unknown.any():
+            counts = np.bincount(names.codes[names.codes >= 0], minlength = len(categories))
+            with self._lock:
+                report = self.unmatched.setdefault(source, {})
+                report.update(zip(categories[unknown], counts[unknown].tolist()))
+
+        codes = names.codes
+        return np.where(codes >= 0, positions[codes], -1), np.where(codes >= 0, excluded[codes], False)
+
+    # function defined to normalize the country column of a dataset, excluded rows are removed and the aliases are replaced by the names of the application(unmatched names are kept and reported under 'source')
+    def normalize(self, frame, column = 'Country', source = None):
+        positions, excluded = self.match(frame[column], source)
+        frame = frame[~excluded]
+        positions = positions[~excluded]
+
+        names = np.where(positions >= 0, self.countries['Country'].to_numpy()[positions], frame[column].to_numpy())
+        frame = frame.assign(**{column: names})
+
+        return frame
+
+    # function defined to return the integer keys of the names(-1 for names which are not countries of the registry)
+    def key(self, names, source = None):
+        positions, _ = self.match(names, source)
+        return np.where(positions >= 0, self.countries['Key'].to_numpy()[positions], -1)
+
+    # function defined to return the ISO3 codes of the names(None for names which are not countries of the registry)
+    def iso3(self, names, source = None):
+        positions, _ = self.match(names, source)
+        codes = self.countries['ISO3'].to_numpy(dtype = object)[positions]
+
+        return np.where(positions >= 0, codes, None)
+
+    # function defined to return the unmatched names of every source as a table sorted by source and name
+    def report(self):
+        with self._lock:
+            rows = [(source, name, count) for source, names in self.unmatched.items() for name, count in names.items()]
+
+        return pd.DataFrame(sorted(rows), columns = ['Source', 'Name', 'Rows'])
+
+
+# the registry shared by every loader
+country_registry = Country_Registry()
+
+
+# the country column of the datasets used by the application
+COUNTRY_COLUMNS = ('Country_Region', 'Country/Region', 'Country (or dependency)', 'Country')
+
+
+def main(argv = None):
+    paths = sys.argv[1:] if argv is None else argv
+    if not paths:
+        print('usage: python country_registry.py FILE ...(CSV files of the JHU CSSE datasets or worldometers pages)')
+        return 2
+
+    for path in paths:
+        if path.endswith(('.html', '.htm')):
+            frame = pd.read_html(path)[0]
+        else:
+            frame = pd.read_csv(path, keep_default_na = False)
+        column = next((column for column in COUNTRY_COLUMNS if column in frame.columns), None)
+        if column is None:
+            print('{}: no country column, expected one of {}'.format(path, ', '.join(COUNTRY_COLUMNS)))
+            continue
+        country_registry.match(frame[column], os.path.basename(path))
+
+    report = country_registry.report()
+    if report.empty:
+        print('Every name is a country, an alias or an exclusion of the registry')
+        return 0
+
+    print(report.to_string(index = False))
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
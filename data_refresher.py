@@ -0,0 +1,133 @@
+# this python file consists of the background refresher of the datasets used by the pages(the country dataset, the time series cube and the population values)
+
+# the datasets are fetched and cleaned by a background thread on a schedule and the pages only read the latest ready version, therefore a rerun of a page never waits on the network(stale-while-revalidate - Refer https://datatracker.ietf.org/doc/html/rfc5861)
+# a refresh builds a complete new version of the datasets before it is swapped in as a whole by replacing a single reference, a page holding the previous version keeps using it until its next rerun and never sees a mix of two versions
+# the first refresh of a process only reads the snapshots stored on disk(Refer 'snapshot_cache.py') so the first page is ready without waiting on the network, the datasets are only downloaded in the request when no snapshot has ever been stored
+# a failed refresh keeps the previous version, its outcome is shown next to the age of the data in the sidebar
+
+# the refresher can be configured using the following environment variables:
+# EPIDEMOS_REFRESH_INTERVAL - number of seconds between two refreshes(default is 600), 0 disables the background thread and the datasets are loaded in the request as the snapshot cache allows
+# EPIDEMOS_REFRESH_RETRY - number of seconds to wait before a failed first refresh is tried again(default is 30)
+
+###### NECESSARY IMPORTS ######
+import os
+import time
+import threading
+from collections import namedtuple
+from instrumentation import metrics
+
+REFRESH_INTERVAL = float(os.environ.get('EPIDEMOS_REFRESH_INTERVAL', 600))
+REFRESH_RETRY = float(os.environ.get('EPIDEMOS_REFRESH_RETRY', 30))
+
+# version - combined version of all datasets
+# country - cleaned country dataset, cube - time series cube
+# checked_at - time at which the oldest snapshot of the datasets was last checked with the upstream site
+# sources - status of every source('cached', 'revalidated', 'downloaded' or 'stale' - Refer 'snapshot_cache.py')
+# shared - read-only handle of the country dataset and the cube used by the pages(Refer 'shared_dataset.py')
+Dataset = namedtuple('Dataset', ['version', 'country', 'cube', 'checked_at', 'sources', 'shared'])
+
+# outcome - 'pending'(no refresh finished yet), 'updated'(a new version was swapped in), 'unchanged'(the datasets did not change), 'stale'(a source could not be reached and its last good snapshot was used) or 'failed'(the previous version is kept)
+# finished_at - time at which the last refresh finished, seconds - duration of the last refresh, error - error of a failed refresh
+Refresh_Status = namedtuple('Refresh_Status', ['outcome', 'finished_at', 'seconds', 'error'])
+
+
+class Data_Refresher:
+
+    # 'load' is the function which fetches and cleans all datasets, it is given the 'max_age' of the snapshots(Refer 'Snapshot_Cache.fetch') and returns a Dataset
+    def __init__(self, load, interval = REFRESH_INTERVAL, retry = REFRESH_RETRY):
+        self.load = load
+        self.interval = interval
+        self.retry = retry
+        self.current = None
+        self.status = Refresh_Status(outcome = 'pending', finished_at = None, seconds = None, error = None)
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        self._wake = threading.Event()
+        self._thread = None
+        self._refreshes = 0
+
+    # function defined to start the background thread, it is started once per process
+    def start(self):
+        if self.interval <= 0:
+            return
+
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target = self._run, name = 'data-refresher', daemon = True)
+                self._thread.start()
+
+    # function defined to return the latest ready version of the datasets, the request only waits when no version is ready yet(the first page of a process)
+    def dataset(self):
+        if self.interval <= 0:
+            return self.refresh(raise_errors = True)
+
+        dataset = self.current
+        if dataset is not None:
+            return dataset
+
+        self.start()
+        with self._finished:
+            refreshes = self._refreshes
+            # a failed first refresh is tried again at once instead of after the retry delay
+            if self.status.outcome == 'failed':
+                self._wake.set()
+            while self.current is None:
+                if self._refreshes > refreshes and self.status.outcome == 'failed':
+                    raise ConnectionError('The datasets could not be loaded: {}'.format(self.status.error))
+                self._finished.wait()
+
+            return self.current
+
+    # function defined to fetch and clean all datasets and swap in the new version, the previous version is kept when the refresh fails
+    def refresh(self, max_age = None, raise_errors = False):
+        started = time.time()
+        previous = self.current
+        try:
+            dataset = self.load(max_age)
+            error = None
+        except Exception as e:
+            if raise_errors:
+                raise
+            dataset = None
+            error = '{}: {}'.format(type(e).__name__, e)
+
+        unchanged = dataset is not None and previous is not None and previous.version == dataset.version
+        # an unchanged version keeps the datasets already used by the pages(also when a source was stale), only the check time and the status of the sources are updated
+        if unchanged:
+            dataset = previous._replace(checked_at = dataset.checked_at, sources = dataset.sources)
+
+        if dataset is None:
+            outcome = 'failed'
+        elif 'stale' in dataset.sources.values():
+            outcome = 'stale'
+        elif unchanged:
+            outcome = 'unchanged'
+        else:
+            outcome = 'updated'
+
+        finished = time.time()
+        metrics.observe('refresh', finished - started, outcome)
+        with self._finished:
+            if dataset is not None:
+                self.current = dataset
+            self.status = Refresh_Status(outcome = outcome, finished_at = finished, seconds = finished - started, error = error)
+            self._refreshes += 1
+            self._finished.notify_all()
+
+        return dataset
+
+    # function defined to return the age of the ready version in seconds(None when no version is ready)
+    def age(self):
+        dataset = self.current
+
+        return None if dataset is None else max(0.0, time.time() - dataset.checked_at)
+
+    def _run(self):
+        # the first refresh only reads the stored snapshots, the snapshots older than the interval are revalidated by the next refresh straight after it
+        self.refresh(max_age = float('inf'))
+        while True:
+            age = self.age()
+            delay = self.retry if age is None else self.interval - age
+            if self._wake.wait(max(0.0, delay)):
+                self._wake.clear()
+            self.refresh(max_age = 0)
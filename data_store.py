@@ -0,0 +1,147 @@
+# this python file consists of the columnar on-disk store used to share the cleaned datasets between several processes running the application
+
+# every cleaned dataset is written once per data version as numpy '.npy' files(one file per column, the time series cube as a single file) and every process opens them memory-mapped read-only, therefore the operating system keeps a single copy of the data in its page cache no matter how many processes are running - Refer https://numpy.org/doc/stable/reference/generated/numpy.load.html
+
+# the directory of the store can be changed using the environment variable EPIDEMOS_STORE_DIR(default is '.store' next to this file)
+
+###### NECESSARY IMPORTS ######
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from time_series_cube import Time_Series_Cube
+
+STORE_DIR = os.environ.get('EPIDEMOS_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.store'))
+
+
+class Data_Store:
+
+    def __init__(self, directory = STORE_DIR):
+        self.directory = directory
+
+    # function defined to write the time series cube of a data version
+    def write_cube(self, cube):
+        meta = {'countries': cube.countries,
+                'dates': [d.strftime('%Y-%m-%d') for d in cube.dates],
+                'version': cube.version,
+                'update': cube.update,
+                'history': cube.history}
+
+        def write(path):
+            np.save(os.path.join(path, 'cube.npy'), np.ascontiguousarray(cube.data))
+            with open(os.path.join(path, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+
+        self._publish('cube', cube.version, write)
+
+    # function defined to open the time series cube of a data version memory-mapped, None is returned when the version is not stored
+    def open_cube(self, version):
+        path = self._path('cube', version)
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r') as f:
+                meta = json.load(f)
+            data = np.load(os.path.join(path, 'cube.npy'), mmap_mode = 'r')
+        except (OSError, ValueError):
+            return None
+
+        return Time_Series_Cube(meta['countries'], pd.to_datetime(meta['dates']), data, meta['version'], meta.get('update'), meta.get('history'))
+
+    # function defined to open the most recently written time series cube whatever its version, used as the previous version of an incremental update(None when no cube is stored)
+    def latest_cube(self):
+        if not os.path.isdir(self.directory):
+            return None
+
+        paths = [d for d in os.listdir(self.directory) if d.startswith('cube-')]
+        paths.sort(key = lambda d: os.path.getmtime(os.path.join(self.directory, d)), reverse = True)
+        for d in paths:
+            cube = self.open_cube(d[len('cube-'):])
+            if cube is not None:
+                return cube
+
+        return None
+
+    # function defined to write a cleaned dataset of a data version, every column is stored in its own file
+    def write_table(self, name, frame, version):
+        columns = []
+        for i, column in enumerate(frame.columns):
+            meta = {'name': str(column), 'file': 'col_{}.npy'.format(i)}
+            # categorical columns are stored as their integer codes and the categories are kept in the meta data
+            if isinstance(frame[column].dtype, pd.CategoricalDtype):
+                meta.update(kind = 'category', categories = [str(category) for category in frame[column].cat.categories])
+            else:
+                # text columns are stored as fixed width unicode arrays as object arrays cannot be memory-mapped
+                meta['kind'] = 'text' if frame[column].to_numpy().dtype == object else 'numeric'
+            columns.append(meta)
+
+        def write(path):
+            for column, meta in zip(frame.columns, columns):
+                if meta['kind'] == 'category':
+                    values = frame[column].cat.codes.to_numpy()
+                else:
+                    values = frame[column].to_numpy()
+                if meta['kind'] == 'text':
+                    values = values.astype(str)
+                np.save(os.path.join(path, meta['file']), values)
+            with open(os.path.join(path, 'meta.json'), 'w') as f:
+                json.dump({'columns': columns, 'version': version}, f)
+
+        self._publish(name, version, write)
+
+    # function defined to open a cleaned dataset of a data version, None is returned when the version is not stored
+    # the columns are memory-mapped, pandas copies them into the returned data frame which is cheap as the tables(one row per country) are small
+    def open_table(self, name, version):
+        path = self._path(name, version)
+        try:
+            with open(os.path.join(path, 'meta.json'), 'r') as f:
+                meta = json.load(f)
+            data = {}
+            for column in meta['columns']:
+                values = np.load(os.path.join(path, column['file']), mmap_mode = 'r')
+                if column['kind'] == 'category':
+                    data[column['name']] = pd.Categorical.from_codes(np.asarray(values), column['categories'])
+                else:
+                    data[column['name']] = values.astype(object) if column['kind'] == 'text' else values
+        except (OSError, ValueError):
+            return None
+
+        return pd.DataFrame(data)
+
+    # function defined to remove all but the most recent 'keep' versions of a dataset, processes which still have an older version open keep reading it as the files are only unlinked
+    def prune(self, name, keep = 2):
+        if not os.path.isdir(self.directory):
+            return
+
+        prefix = name + '-'
+        paths = [os.path.join(self.directory, d) for d in os.listdir(self.directory) if d.startswith(prefix)]
+        paths.sort(key = os.path.getmtime, reverse = True)
+        for path in paths[keep:]:
+            shutil.rmtree(path, ignore_errors = True)
+
+    def _path(self, name, version):
+        return os.path.join(self.directory, '{}-{}'.format(name, version))
+
+    # a version is written into a temporary directory which is then renamed in place, therefore readers only ever see complete versions and concurrent writers of the same version do not interfere
+    def _publish(self, name, version, write):
+        path = self._path(name, version)
+        if os.path.isdir(path):
+            return
+
+        os.makedirs(self.directory, exist_ok = True)
+        tmp_path = tempfile.mkdtemp(dir = self.directory, prefix = '.tmp-')
+        try:
+            write(tmp_path)
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors = True)
+            raise
+
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # another process has published the same version in the meantime
+            shutil.rmtree(tmp_path, ignore_errors = True)
+            if not os.path.isdir(path):
+                raise
+
+        self.prune(name)
@@ -14,28 +14,34 @@ import pandas as pd
 #pd.options.mode.chained_assignment = None # see below
 import numpy as np
 import time
-from scipy.integrate import odeint
 from streamlit_lottie import st_lottie # see below
 import plotly.express as px # see below
 import pydeck as pdk
 import matplotlib
 matplotlib.use("agg") # see below
 import matplotlib.pyplot as plt
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_agg import RendererAgg 
-_lock = RendererAgg.lock # see below
 from modelling import Modelling # importing all functions
 
 # assigning class to a variable
 model_func = Modelling
 
+# start of the rerun, the duration of every rerun is recorded per page - Refer 'instrumentation.py'
+rerun_started = time.perf_counter()
+
+# the rerun is profiled when the url holds '?profile=1' or EPIDEMOS_PROFILE is set, the profile is written at the end of the rerun - Refer 'profiler.py'(no query parameters are returned outside of 'streamlit run')
+# the 'profile' parameter is removed from the url once it has been read, so only the rerun which was asked for is profiled and not every later interaction with the page
+query_params = st.experimental_get_query_params() or {}
+model_func.start_profile(query_params)
+if 'profile' in query_params:
+    st.experimental_set_query_params(**{name: values for name, values in query_params.items() if name != 'profile'})
+
 ###### IMPORTANT INFORMATION ######
 
 # lottie animations are taken from https://lottiefiles.com/ - Refer https://pypi.org/project/streamlit-lottie/
 
 # https://matplotlib.org/stable/tutorials/introductory/usage.html - the documentation recommends to use a non-interactive "Agg" backend which is a thread-safe backend - Refer https://matplotlib.org/3.3.2/faq/howto_faq.html#working-with-threads 
 
-# https://docs.streamlit.io/en/stable/deploy_streamlit_app.html - according to the documentation, it is recommended to use the class-level lock in the backend "Agg" due to the limited multi-threading support in matplotlib, this is also useful deploying the application. Refer https://matplotlib.org/3.3.2/faq/howto_faq.html#how-to-use-matplotlib-in-a-web-application-server (old documentation), Also Refer - https://matplotlib.org/stable/faq/howto_faq.html (new documentation)
+# https://docs.streamlit.io/en/stable/deploy_streamlit_app.html - according to the documentation, it is recommended to use the class-level lock in the backend "Agg" due to the limited multi-threading support in matplotlib, this is also useful deploying the application. Refer https://matplotlib.org/3.3.2/faq/howto_faq.html#how-to-use-matplotlib-in-a-web-application-server (old documentation), Also Refer - https://matplotlib.org/stable/faq/howto_faq.html (new documentation). The model plots are therefore drawn by 'plot_render.py' in worker processes(the lock is only used when the plots are drawn in the application process) and the drawn plots are cached and shown as images
 
 # there are sections in this source code where "unsafe_allow_html = True" has been used. By default, HTML tags will be treated as pure text in streamlit but this can be unlocked by introducing the command stated above therefore allowing custom HTML and CSS scripts. Refer https://docs.streamlit.io/en/stable/api.html#display-text
 
@@ -77,10 +83,26 @@ st.sidebar.title("NAVIGATION")
 # defining various pages in the application
 main_menu = ['INTRO', 'SIR MODEL', 'SIR-D MODEL', 'SEIR MODEL', 'SEIR MODEL(MITIGATION)', 'COVID-19 DASHBOARD']
 
+# the performance page is hidden, it is only listed when the url holds '?performance=1'
+if query_params.get('performance', ['0'])[0] == '1':
+    main_menu.append('PERFORMANCE')
+
 with st.container():
 
     menu = st.sidebar.selectbox('Go to', main_menu) 
 
+# age of the datasets and outcome of the last refresh, the datasets are refreshed in the background and the pages read the latest ready version - Refer 'data_refresher.py'
+data_age, data_refresh = model_func.data_status()
+if data_age is None:
+    data_message = '🗂️ Data is loading' if data_refresh.outcome != 'failed' else '🗂️ Data could not be loaded'
+else:
+    data_message = '🗂️ Data checked {} ago'.format('{:.0f} min'.format(data_age // 60) if data_age < 3600 else '{:.1f} h'.format(data_age / 3600))
+if data_refresh.finished_at is not None:
+    data_message += ' · last refresh {} {:.0f} min ago'.format(data_refresh.outcome, (time.time() - data_refresh.finished_at) // 60)
+st.sidebar.caption(data_message)
+if data_refresh.outcome == 'failed' and data_refresh.error:
+    st.sidebar.caption('⚠️ ' + data_refresh.error)
+
 
 
 
@@ -264,6 +286,16 @@ elif menu == "SIR MODEL":
         # gamma
         recovery_rate = 1/rec
 
+        # interactive plot mode, every value of the explored parameter is solved at once and shown as the frames of a plotly figure
+        interactive = st.checkbox('Interactive Plot 🎞️', 
+                                help = 'Explore a parameter in the plot without rerunning the application',
+                                key = 'sir_frames')
+
+        if interactive:
+            explore = st.selectbox('Parameter to explore', 
+                                ['Contact Rate(beta)', 'Recovery Rate(gamma)'],
+                                key = 'sir_explore')
+
 
         # total population
         total_pop = pop
@@ -297,37 +329,32 @@ elif menu == "SIR MODEL":
 
     
         # calculation of differential equations
-        ret = odeint(model_func.sir_model,
-                    [susceptible, infected, recovered], days,
-                    args = (total_pop, contact_rate, recovery_rate))
+        ret = model_func.solve('sir',
+                    [susceptible, infected, recovered], day_value,
+                    (total_pop, contact_rate, recovery_rate))
         S, I, R = ret.T
 
         # plotting the results 
         value = model_func.pop_value(pop)
 
-        with _lock:
-            sir_fig = Figure()
-            ax = sir_fig.add_subplot(1,1,1, facecolor='w', axisbelow=True)
-            ax.plot(t, S/1000, 'k', alpha=1, lw=2, ls='-', label='Susceptible')
-            ax.plot(t, I/1000, '#FF0000', alpha=1, lw=2, ls=':', label='Infected')
-            ax.plot(t, R/1000, 'c', alpha=1, lw=2, ls='--', label='Recovered')
-            ax.set_title(label='SIR PLOT', loc='center', pad=15.0, fontsize=25)
-            ax.set_xlabel('Time in days')
-            ax.set_ylabel('Population in 1000s')
-            ax.set_ylim(0,value)
-            ax.minorticks_on()
-            ax.tick_params(axis='x', which='minor')
-            ax.grid(b=True, which='major', c='k', lw=0.2, ls='-')
-            sir_fig.patch.set_facecolor('w')
-            sir_fig.patch.set_alpha(0.7)
-            ax.patch.set_edgecolor('black')
-            ax.patch.set_linewidth(0.7) 
-            legend = ax.legend()
-            legend.get_frame().set_alpha(1.0)
+        if interactive:
+            sir_fig = model_func.model_frames('sir', 'SIR PLOT',
+                        [susceptible, infected, recovered], day_value,
+                        (total_pop, contact_rate, recovery_rate), explore, value)
+
+        else:
+            sir_fig = model_func.model_plot('SIR PLOT', t, value,
+                        [(S/1000, 'k', 2, '-', 'Susceptible'),
+                        (I/1000, '#FF0000', 2, ':', 'Infected'),
+                        (R/1000, 'c', 2, '--', 'Recovered')])
 
     if infec < pop and recov < pop and infec + recov < pop:
         
-        st.pyplot(sir_fig, clear_figure = True)
+        with model_func.span('display', 'model plot'):
+            if interactive:
+                st.plotly_chart(sir_fig, use_container_width = True)
+            else:
+                st.image(sir_fig, use_column_width = True)
 
     else:
 
@@ -352,53 +379,48 @@ elif menu == "SIR MODEL":
 
             st.markdown("<p style = 'text-align: justify'>The plot shown below consists of model generated Infected data and its corresponding covid-19 data and a similar approach is done for the Recovered data.</p>", unsafe_allow_html = True)
 
-        # calling the respective functions containing the final datasets and storing the returned data to respective variables  
-        country_clean = model_func.country_clean()
-        infected_clean = model_func.infected_clean()
-        recovered_clean = model_func.recovered_clean()
+        # calling the respective functions containing the final datasets and storing the returned data to respective variables
+        # the read-only dataset is shared by every session, the countries, the population and the series are taken from it without copying - Refer 'shared_dataset.py'
+        shared_dataset = model_func.shared_dataset()
         
         # creating a selectbox to choose the desired country
-        country_options = country_clean['Country'].unique().tolist()
+        country_options = shared_dataset.countries
         country_list = container.selectbox('Choose country', country_options, index = 180)
-        population = int(country_clean["Population"].loc[country_clean["Country"] == country_list])
+        population = shared_dataset.population(country_list)
         st.sidebar.write('▶ The population of',country_list,'= {:,}'.format(population))
 
+        # the series of the chosen country are taken from the time series cube(read-only views of the cube, no copies are made)
+        infected_tr = shared_dataset.series(country_list, 'confirmed')
+        recovered_tr = shared_dataset.series(country_list, 'recovered')
+
         # initial infected value for the SIR model
-        infected_df = infected_clean.loc[infected_clean["Country"] == country_list]
-        initial_infected = int(infected_clean["1/22/20"].loc[infected_clean["Country"] == country_list])
+        initial_infected = int(infected_tr[0])
         initial_infected += 1 #SIR model must have infected value initialised to atleast 1
-        infected_df.drop(['Country'], axis = 1, inplace = True)
 
         # initial recovered value for the SIR model
-        recovered_df = recovered_clean.loc[recovered_clean["Country"] == country_list]
-        initial_recovered = int(recovered_clean["1/22/20"].loc[recovered_clean["Country"] == country_list])
-        recovered_df.drop(['Country'], axis = 1, inplace = True)
+        initial_recovered = int(recovered_tr[0])
 
-        # the number of columns are taken as day values as the datasets consists of automated daily data starting from 1/22/2020 till today as columns(automated update)
-        if (len(infected_df.columns) >= len(recovered_df.columns)):
-            
-            day_value = len(infected_df.columns)
+        # the number of dates are taken as day values as the datasets consists of automated daily data starting from 1/22/2020 till today as columns(automated update)
+        day_value = len(shared_dataset.dates)
 
         st.sidebar.write('▶ The total number of days(based on actual data) = ',day_value)
-        
-        # the respective dataframes are transposed followed by the conversion to numpy data to be plotted later
-        infected_tr = infected_df.transpose()
-        recovered_tr = recovered_df.transpose()
-
-        infected_tr = infected_tr.to_numpy()
-        recovered_tr = recovered_tr.to_numpy()
     
         # setting up necessary controls
         with st.sidebar.container():
 
             st.subheader('CONTROLS')
 
+            auto_fit = st.checkbox('Auto-fit 🎯',
+                                    help = 'Fit the contact rate and the recovery rate to the Covid-19 data of the chosen country',
+                                    key = 'sir_fit')
+
             eff_con = st.slider('Contact Rate(beta)', 
                                     min_value = 1, 
                                     max_value = 20,
                                     value = 5, 
                                     step = 1,
                                     help='Select the number of contacts(per day)',
+                                    disabled = auto_fit,
                                     key = 'sir_rw1')
 
             # beta
@@ -410,6 +432,7 @@ elif menu == "SIR MODEL":
                                     value = 5, 
                                     step = 1,
                                     help='Select the number of days(mean recovery rate = 1/number of days',
+                                    disabled = auto_fit,
                                     key = 'sir_rw2')
 
             # gamma
@@ -423,51 +446,55 @@ elif menu == "SIR MODEL":
             days = range(0, day_value)
 
         
-            # calculation of differential equations
-            ret = odeint(model_func.sir_model,
-                        [susceptible, initial_infected, initial_recovered], days,
-                        args = (population, contact_rate, recovery_rate))
-            S, I, R = ret.T
+            if auto_fit:
+
+                # least squares calibration of beta and gamma against the data of the chosen country, the slider values are used as the initial guess
+                sir_fit = model_func.auto_fit('sir',
+                                    {'confirmed': infected_tr, 'recovered': recovered_tr},
+                                    population, [susceptible, initial_infected, initial_recovered],
+                                    (contact_rate, recovery_rate))
+                contact_rate = sir_fit.parameters['beta']
+                recovery_rate = sir_fit.parameters['gamma']
+                S, I, R = sir_fit.trajectory.T
+
+                st.write('▶ Fitted contact rate(beta) = {:.4f}'.format(contact_rate))
+                st.write('▶ Fitted recovery rate(gamma) = {:.4f}'.format(recovery_rate))
+                r_sir_fit = model_func.brr(contact_rate, recovery_rate)
+                st.info(u"The R\u2080 value of the fitted SIR Model is, {:.2f}".format(r_sir_fit))
+
+            else:
+
+                # calculation of differential equations
+                ret = model_func.solve('sir',
+                            [susceptible, initial_infected, initial_recovered], day_value,
+                            (population, contact_rate, recovery_rate))
+                S, I, R = ret.T
         
             
             # plotting the results
             value = model_func.pop_value(population)
 
-            with _lock:
-                sir_rw_fig = Figure()
-                ax = sir_rw_fig.add_subplot(1,1,1, facecolor='w', axisbelow=True)
-                ax.plot(t, I/1000, '#FF0000', alpha=1, lw=2, ls='--', label='Infected(Model)')
-                ax.plot(t, infected_tr/1000, 'm', alpha=1, lw=3, ls='-', label='Infected(Covid-19 Data)')
-
-                ax.plot(t, R/1000, 'c', alpha=1, lw=2, ls='--', label='Recovered(Model)')
-                ax.plot(t, recovered_tr/1000, 'g', alpha=1, lw=3, ls='-', label='Recovered(Covid-19 Data)')
-
-                ax.set_title(label='COMPARISON PLOT', loc='center', pad=15.0, fontsize=25)
-                ax.set_xlabel('Time in days')
-                ax.set_ylabel('Population in 1000s')
-                ax.set_ylim(0,value)
-                ax.minorticks_on()
-                ax.tick_params(axis='x', which='minor')
-                ax.grid(b=True, which='major', c='k', lw=0.2, ls='-')
-                sir_rw_fig.patch.set_facecolor('w')
-                sir_rw_fig.patch.set_alpha(0.7)
-                legend = ax.legend()
-                legend.get_frame().set_alpha(1.0)
-                ax.spines['bottom'].set_visible(False)
+            sir_rw_fig = model_func.model_plot('COMPARISON PLOT', t, value,
+                        [(I/1000, '#FF0000', 2, '--', 'Infected(Model)'),
+                        (infected_tr/1000, 'm', 3, '-', 'Infected(Covid-19 Data)'),
+                        (R/1000, 'c', 2, '--', 'Recovered(Model)'),
+                        (recovered_tr/1000, 'g', 3, '-', 'Recovered(Covid-19 Data)')],
+                        comparison = True)
 
         with st.container():
 
-            st.pyplot(sir_rw_fig, clear_figure = True)
+            with model_func.span('display', 'comparison plot'):
+                st.image(sir_rw_fig, use_column_width = True)
 
         data_frame_sir = st.expander('View Covid-19 Statistical Data 📊')
 
         with data_frame_sir:
             st.subheader('Country Population Data')
-            st.write(country_clean)
+            st.write(shared_dataset.frame('country'))
             st.subheader('Infected Population Data')
-            st.write(infected_clean)
+            st.write(shared_dataset.frame('confirmed'))
             st.subheader('Recovered Population Data')
-            st.write(recovered_clean)            
+            st.write(shared_dataset.frame('recovered'))            
 
 
 
@@ -641,6 +668,16 @@ elif menu == "SIR-D MODEL":
         # sigma
         deceased_rate = 1/dec
 
+        # interactive plot mode, every value of the explored parameter is solved at once and shown as the frames of a plotly figure
+        interactive = st.checkbox('Interactive Plot 🎞️', 
+                                help = 'Explore a parameter in the plot without rerunning the application',
+                                key = 'sird_frames')
+
+        if interactive:
+            explore = st.selectbox('Parameter to explore', 
+                                ['Contact Rate(beta)', 'Recovery Rate(gamma)', 'Deceased Rate(sigma)'],
+                                key = 'sird_explore')
+
 
         # notal population
         total_pop = pop
@@ -675,38 +712,33 @@ elif menu == "SIR-D MODEL":
             st.info(u"The R\u2080 value of the current SIR-D Model is, {:.2f}".format(r_sird))
     
         # calculation of differential equations
-        ret = odeint(model_func.sird_model,
-                    [susceptible, infected, recovered, deceased], days,
-                    args = (total_pop, contact_rate, recovery_rate, deceased_rate))
+        ret = model_func.solve('sird',
+                    [susceptible, infected, recovered, deceased], day_value,
+                    (total_pop, contact_rate, recovery_rate, deceased_rate))
         S, I, R, D = ret.T
 
         # plotting the results  
         value = model_func.pop_value(pop)
 
-        with _lock:
-            sird_fig = Figure()
-            ax = sird_fig.add_subplot(1,1,1, facecolor='w', axisbelow=True)
-            ax.plot(t, S/1000, 'k', alpha=1, lw=2, ls='-', label='Susceptible')
-            ax.plot(t, I/1000, '#FF0000', alpha=1, lw=2, ls=':', label='Infected')
-            ax.plot(t, R/1000, 'c', alpha=1, lw=2, ls='--', label='Recovered')
-            ax.plot(t, D/1000, '#9A7B4F', alpha=1, lw=2, ls='-.', label='Deceased')
-            ax.set_title(label='SIR-D PLOT', loc='center', pad=15.0, fontsize=25)
-            ax.set_xlabel('Time in days')
-            ax.set_ylabel('Population in 1000s')
-            ax.set_ylim(0,value)
-            ax.minorticks_on()
-            ax.tick_params(axis='x', which='minor')
-            ax.grid(b=True, which='major', c='k', lw=0.2, ls='-')
-            sird_fig.patch.set_facecolor('w')
-            sird_fig.patch.set_alpha(0.7)
-            ax.patch.set_edgecolor('black')
-            ax.patch.set_linewidth(0.7) 
-            legend = ax.legend()
-            legend.get_frame().set_alpha(1.0)
+        if interactive:
+            sird_fig = model_func.model_frames('sird', 'SIR-D PLOT',
+                        [susceptible, infected, recovered, deceased], day_value,
+                        (total_pop, contact_rate, recovery_rate, deceased_rate), explore, value)
+
+        else:
+            sird_fig = model_func.model_plot('SIR-D PLOT', t, value,
+                        [(S/1000, 'k', 2, '-', 'Susceptible'),
+                        (I/1000, '#FF0000', 2, ':', 'Infected'),
+                        (R/1000, 'c', 2, '--', 'Recovered'),
+                        (D/1000, '#9A7B4F', 2, '-.', 'Deceased')])
 
     if infec < pop and recov < pop and deceas < pop and infec + recov + deceas < pop:
         
-        st.pyplot(sird_fig, clear_figure = True)
+        with model_func.span('display', 'model plot'):
+            if interactive:
+                st.plotly_chart(sird_fig, use_container_width = True)
+            else:
+                st.image(sird_fig, use_column_width = True)
 
     else:
 
@@ -731,61 +763,52 @@ elif menu == "SIR-D MODEL":
 
             st.markdown("<p style = 'text-align: justify'>The plot shown below consists of model generated Infected data and its corresponding covid-19 data and a similar approach is done for the Recovered data and the Deceased data.</p>", unsafe_allow_html = True)
 
-        # calling the respective functions containing the final datasets and storing the returned data to respective variables  
-        country_clean = model_func.country_clean()
-        infected_clean = model_func.infected_clean()
-        recovered_clean = model_func.recovered_clean()
-        deceased_clean = model_func.deceased_clean()
+        # calling the respective functions containing the final datasets and storing the returned data to respective variables
+        # the read-only dataset is shared by every session, the countries, the population and the series are taken from it without copying - Refer 'shared_dataset.py'
+        shared_dataset = model_func.shared_dataset()
         
         # creating a selectbox to choose the desired country
-        country_options = country_clean['Country'].unique().tolist()
+        country_options = shared_dataset.countries
         country_list = container.selectbox('Choose country', country_options, index = 180)
-        population = int(country_clean["Population"].loc[country_clean["Country"] == country_list])
+        population = shared_dataset.population(country_list)
         st.sidebar.write('▶ The population of',country_list,'= {:,}'.format(population))
 
+        # the series of the chosen country are taken from the time series cube(read-only views of the cube, no copies are made)
+        infected_tr = shared_dataset.series(country_list, 'confirmed')
+        recovered_tr = shared_dataset.series(country_list, 'recovered')
+        deceased_tr = shared_dataset.series(country_list, 'deaths')
+
         # initial infected value for the SIR-D model
-        infected_df = infected_clean.loc[infected_clean["Country"] == country_list]
-        initial_infected = int(infected_clean["1/22/20"].loc[infected_clean["Country"] == country_list])
+        initial_infected = int(infected_tr[0])
         initial_infected += 1 #SIR-D model must have infected value initialised to atleast 1
-        infected_df.drop(['Country'], axis = 1, inplace = True)
 
         # initial recovered value for the SIR-D model
-        recovered_df = recovered_clean.loc[recovered_clean["Country"] == country_list]
-        initial_recovered = int(recovered_clean["1/22/20"].loc[recovered_clean["Country"] == country_list])
-        recovered_df.drop(['Country'], axis = 1, inplace = True)
+        initial_recovered = int(recovered_tr[0])
 
         #initial deceased value for the SIR-D model
-        deceased_df = deceased_clean.loc[deceased_clean["Country"] == country_list]
-        initial_deceased = int(deceased_clean["1/22/20"].loc[deceased_clean["Country"] == country_list])
-        deceased_df.drop(['Country'], axis = 1, inplace = True)
+        initial_deceased = int(deceased_tr[0])
 
-        # the number of columns are taken as day values as the datasets consists of automated daily data starting from 1/22/2020 till today as columns(automated update)
-        if (len(infected_df.columns) >= len(deceased_df.columns)):
-            
-            day_value = len(infected_df.columns)
+        # the number of dates are taken as day values as the datasets consists of automated daily data starting from 1/22/2020 till today as columns(automated update)
+        day_value = len(shared_dataset.dates)
 
         st.sidebar.write('▶ The total number of days(based on actual data) = ',day_value)
 
-        # the respective dataframes are transposed followed by the conversion to numpy data to be plotted later
-        infected_tr = infected_df.transpose()
-        recovered_tr = recovered_df.transpose()
-        deceased_tr = deceased_df.transpose()
-
-        infected_tr = infected_tr.to_numpy()
-        recovered_tr = recovered_tr.to_numpy()
-        deceased_tr = deceased_tr.to_numpy()
-
         # setting up necessary controls
         with st.sidebar.container():
 
             st.subheader('CONTROLS')
 
+            auto_fit = st.checkbox('Auto-fit 🎯',
+                                    help = 'Fit the contact rate, the recovery rate and the deceased rate to the Covid-19 data of the chosen country',
+                                    key = 'sird_fit')
+
             eff_con = st.slider('Contact Rate(beta)', 
                                     min_value = 1, 
                                     max_value = 20,
                                     value = 10, 
                                     step = 1,
                                     help='Select the number of contacts(per day)',
+                                    disabled = auto_fit,
                                     key = 'sird_rw1')
 
             # beta
@@ -797,6 +820,7 @@ elif menu == "SIR-D MODEL":
                                     value = 5, 
                                     step = 1,
                                     help = 'Select the number of days(mean recovery rate = 1/number of days',
+                                    disabled = auto_fit,
                                     key = 'sird_rw2')
 
             # gamma
@@ -808,6 +832,7 @@ elif menu == "SIR-D MODEL":
                                 value = 8, 
                                 step = 1,
                                 help = 'Select the number of days(mean deceased rate = 1/number of days',
+                                disabled = auto_fit,
                                 key = 'sird_rw3')
 
             # sigma
@@ -822,56 +847,61 @@ elif menu == "SIR-D MODEL":
             days = range(0, day_value)
 
         
-            # Use differential equations magic with our population
-            ret = odeint(model_func.sird_model,
-                        [susceptible, initial_infected, initial_recovered, initial_deceased], days,
-                        args = (population, contact_rate, recovery_rate, deceased_rate))
-            S, I, R, D = ret.T
+            if auto_fit:
+
+                # least squares calibration of beta, gamma and sigma against the data of the chosen country, the slider values are used as the initial guess
+                sird_fit = model_func.auto_fit('sird',
+                                    {'confirmed': infected_tr, 'recovered': recovered_tr, 'deaths': deceased_tr},
+                                    population, [susceptible, initial_infected, initial_recovered, initial_deceased],
+                                    (contact_rate, recovery_rate, deceased_rate))
+                contact_rate = sird_fit.parameters['beta']
+                recovery_rate = sird_fit.parameters['gamma']
+                deceased_rate = sird_fit.parameters['sigma']
+                S, I, R, D = sird_fit.trajectory.T
+
+                st.write('▶ Fitted contact rate(beta) = {:.4f}'.format(contact_rate))
+                st.write('▶ Fitted recovery rate(gamma) = {:.4f}'.format(recovery_rate))
+                st.write('▶ Fitted deceased rate(sigma) = {:.4f}'.format(deceased_rate))
+                r_sird_fit = model_func.brr(contact_rate, recovery_rate)
+                st.info(u"The R\u2080 value of the fitted SIR-D Model is, {:.2f}".format(r_sird_fit))
+
+            else:
+
+                # Use differential equations magic with our population
+                ret = model_func.solve('sird',
+                            [susceptible, initial_infected, initial_recovered, initial_deceased], day_value,
+                            (population, contact_rate, recovery_rate, deceased_rate))
+                S, I, R, D = ret.T
         
             
             # plotting the results
             value = model_func.pop_value(population)
 
-            with _lock:
-                sird_rw_fig = Figure()
-                ax = sird_rw_fig.add_subplot(1,1,1, facecolor='w', axisbelow=True)
-                ax.plot(t, I/1000, '#FF0000', alpha=1, lw=2, ls='--', label='Infected(Model)')
-                ax.plot(t, infected_tr/1000, 'm', alpha=1, lw=3, ls='-', label='Infected(Covid-19 Data)')
-
-                ax.plot(t, R/1000, 'c', alpha=1, lw=2, ls='--', label='Recovered(Model)')
-                ax.plot(t, recovered_tr/1000, 'g', alpha=1, lw=3, ls='-', label='Recovered(Covid-19 Data)')
-
-                ax.plot(t, D/1000, '#9A7B4F', alpha=1, lw=2, ls='--', label='Deceased(Model)')
-                ax.plot(t, deceased_tr/1000, 'b', alpha=1, lw=3, ls='-', label='Deceased(Covid-19 Data)')
-
-                ax.set_title(label='COMPARISON PLOT', loc='center', pad=15.0, fontsize=25)
-                ax.set_xlabel('Time in days')
-                ax.set_ylabel('Population in 1000s')
-                ax.set_ylim(0,value)
-                ax.minorticks_on()
-                ax.tick_params(axis='x', which='minor')
-                ax.grid(b=True, which='major', c='k', lw=0.2, ls='-')
-                sird_rw_fig.patch.set_facecolor('w')
-                sird_rw_fig.patch.set_alpha(0.7)
-                legend = ax.legend()
-                legend.get_frame().set_alpha(1.0)
-                ax.spines['bottom'].set_visible(False)
+            sird_rw_fig = model_func.model_plot('COMPARISON PLOT', t, value,
+                        [(I/1000, '#FF0000', 2, '--', 'Infected(Model)'),
+                        (infected_tr/1000, 'm', 3, '-', 'Infected(Covid-19 Data)'),
+                        (R/1000, 'c', 2, '--', 'Recovered(Model)'),
+                        (recovered_tr/1000, 'g', 3, '-', 'Recovered(Covid-19 Data)'),
+                        (D/1000, '#9A7B4F', 2, '--', 'Deceased(Model)'),
+                        (deceased_tr/1000, 'b', 3, '-', 'Deceased(Covid-19 Data)')],
+                        comparison = True)
 
         with st.container():
 
-            st.pyplot(sird_rw_fig, clear_figure = True)
+            with model_func.span('display', 'comparison plot'):
+                st.image(sird_rw_fig, use_column_width = True)
 
         data_frame_sird = st.expander('View Covid-19 Statistical Data 📊')
 
         with data_frame_sird:
             st.subheader('Country Population Data')
-            st.write(country_clean)
+            st.write(shared_dataset.frame('country'))
             st.subheader('Infected Population Data')
-            st.write(infected_clean)
+            st.write(shared_dataset.frame('confirmed'))
             st.subheader('Recovered Population Data')
-            st.write(recovered_clean)
+            st.write(shared_dataset.frame('recovered'))
             st.subheader('Deceased Population Data')
-            st.write(deceased_clean)          
+            st.write(shared_dataset.frame('deaths'))          
 
 
 
@@ -1042,6 +1072,16 @@ elif menu == "SEIR MODEL":
         # gammma 
         recovery_rate = 1/rec_infect
 
+        # interactive plot mode, every value of the explored parameter is solved at once and shown as the frames of a plotly figure
+        interactive = st.checkbox('Interactive Plot 🎞️', 
+                                help = 'Explore a parameter in the plot without rerunning the application',
+                                key = 'seir_frames')
+
+        if interactive:
+            explore = st.selectbox('Parameter to explore', 
+                                ['Contact Rate(beta)', 'Expose Rate(alpha)', 'Recovery Rate(gamma)'],
+                                key = 'seir_explore')
+
 
         # total population
         total_pop = pop
@@ -1075,39 +1115,34 @@ elif menu == "SEIR MODEL":
             st.info(u"The R\u2080 value of the current SEIR Model is, {:.2f}".format(r_seir))
 
         # calculation of differertial equations
-        ret = odeint(model_func.seir_model,
-                    [susceptible, exposed, infected, recovered], days,
-                    args = (total_pop, expose_rate, contact_rate, recovery_rate))
+        ret = model_func.solve('seir',
+                    [susceptible, exposed, infected, recovered], day_value,
+                    (total_pop, expose_rate, contact_rate, recovery_rate))
         S, E, I, R = ret.T
 
         # plotting the results
         value = model_func.pop_value(pop)
 
-        with _lock:
-            seir_fig = Figure()
-            ax = seir_fig.add_subplot(1,1,1, facecolor='w', axisbelow=True)
-            ax.plot(t, S/1000, 'k', alpha=1, lw=2, ls='-', label='Susceptible')
-            ax.plot(t, E/1000, '#FFCC00', alpha=1, lw=2, ls='-.', label='Exposed')
-            ax.plot(t, I/1000, '#FF0000', alpha=1, lw=2, ls=':', label='Infected')
-            ax.plot(t, R/1000, 'c', alpha=1, lw=2, ls='--', label='Recovered')
-            ax.set_title(label='SEIR PLOT', loc='center', pad=15.0, fontsize=25)
-            ax.set_xlabel('Time in days')
-            ax.set_ylabel('Population in 1000s')
-            ax.set_ylim(0,value)
-            ax.minorticks_on()
-            ax.tick_params(axis='x', which='minor')
-            ax.grid(b=True, which='major', c='k', lw=0.2, ls='-')
-            seir_fig.patch.set_facecolor('w')
-            seir_fig.patch.set_alpha(0.7)
-            ax.patch.set_edgecolor('black')
-            ax.patch.set_linewidth(0.7) 
-            legend = ax.legend()
-            legend.get_frame().set_alpha(1.0)
+        if interactive:
+            seir_fig = model_func.model_frames('seir', 'SEIR PLOT',
+                        [susceptible, exposed, infected, recovered], day_value,
+                        (total_pop, expose_rate, contact_rate, recovery_rate), explore, value)
+
+        else:
+            seir_fig = model_func.model_plot('SEIR PLOT', t, value,
+                        [(S/1000, 'k', 2, '-', 'Susceptible'),
+                        (E/1000, '#FFCC00', 2, '-.', 'Exposed'),
+                        (I/1000, '#FF0000', 2, ':', 'Infected'),
+                        (R/1000, 'c', 2, '--', 'Recovered')])
 
 
     if expos < pop and infec < pop and recov < pop and expos + infec + recov < pop:
 
-        st.pyplot(seir_fig, clear_figure = True)
+        with model_func.span('display', 'model plot'):
+            if interactive:
+                st.plotly_chart(seir_fig, use_container_width = True)
+            else:
+                st.image(seir_fig, use_column_width = True)
 
     else:
 
@@ -1293,6 +1328,62 @@ elif menu == "SEIR MODEL(MITIGATION)":
         # gammma 
         recovery_rate = 1/rec_infect
 
+        # mitigation schedule, the mitigation control changes to a lockdown on a given day(or when the infected population exceeds a threshold) and returns to the mitigation control above on the release day
+        scheduled = st.checkbox('Mitigation Schedule 📅', 
+                                help = 'Change the mitigation control over time',
+                                key = 'seirm_schedule')
+
+        if scheduled:
+            lockdown_day = st.slider('Lockdown Day', 
+                                min_value = 0, 
+                                max_value = 730,
+                                value = 30, 
+                                step = 5,
+                                help = 'Select the day the lockdown starts',
+                                key = 'seirm_lockdown_day')
+
+            lockdown_control = st.slider('Lockdown Control', 
+                                min_value = 0.0, 
+                                max_value = 1.0,
+                                value = 0.7, 
+                                step = 0.1,
+                                help = 'Select the effectiveness of the lockdown',
+                                key = 'seirm_lockdown_control')
+
+            release_day = st.slider('Release Day', 
+                                min_value = 0, 
+                                max_value = 730,
+                                value = 90, 
+                                step = 5,
+                                help = 'Select the day the lockdown is released',
+                                key = 'seirm_release_day')
+
+            release_ramp = st.slider('Release Period', 
+                                min_value = 0, 
+                                max_value = 60,
+                                value = 14, 
+                                step = 1,
+                                help = 'Select the number of days over which the lockdown is released(0 releases the lockdown at once)',
+                                key = 'seirm_release_ramp')
+
+            lockdown_trigger = st.number_input('Lockdown Trigger(infected population)',
+                                min_value = 0,
+                                value = 0, 
+                                step = 1,
+                                help = 'The lockdown starts when the infected population exceeds this value instead of on the lockdown day(0 uses the lockdown day)',
+                                key = 'seirm_lockdown_trigger')
+
+        # interactive plot mode, every value of the explored parameter is solved at once and shown as the frames of a plotly figure
+        interactive = st.checkbox('Interactive Plot 🎞️', 
+                                help = 'Explore a parameter in the plot without rerunning the application',
+                                disabled = scheduled,
+                                key = 'seirm_frames') and not scheduled
+
+        if interactive:
+            explore = st.selectbox('Parameter to explore', 
+                                ['Mitigation Control', 'Contact Rate(beta)', 'Expose Rate(alpha)', 'Recovery Rate(gamma)'],
+                                key = 'seirm_explore')
+
 
         # total population
         total_pop = pop
@@ -1326,39 +1417,65 @@ elif menu == "SEIR MODEL(MITIGATION)":
             st.info(u"The R\u2080 value of the current SEIR Model(Mitigation) is, {:.2f}".format(r_seirm))
 
         # Use differential equations magic with our population
-        ret = odeint(model_func.seirm_model,
-                    [susceptible, exposed, infected, recovered], days,
-                    args = (m_control, total_pop, expose_rate, contact_rate, recovery_rate))
+        ret = model_func.solve('seirm',
+                    [susceptible, exposed, infected, recovered], day_value,
+                    (m_control, total_pop, expose_rate, contact_rate, recovery_rate))
         S, E, I, R = ret.T
 
+        if scheduled:
+            if lockdown_trigger > 0:
+                schedule = model_func.mitigation_schedule(m_control,
+                            [(release_day, m_control, release_ramp)],
+                            [(lockdown_trigger, lockdown_control)])
+            else:
+                schedule = model_func.mitigation_schedule(m_control,
+                            [(lockdown_day, lockdown_control), (max(release_day, lockdown_day), m_control, release_ramp)])
+
+            # the schedule is solved together with the constant mitigation control for comparison
+            schedule_ret = model_func.mitigation_schedules([susceptible, exposed, infected, recovered], day_value,
+                            (total_pop, expose_rate, contact_rate, recovery_rate), [schedule])
+            S, E, I, R = schedule_ret.trajectory[0].T
+            I_constant = ret.T[2]
+
         # plotting the results   
         value = model_func.pop_value(pop)
 
-        with _lock:
-            seirm_fig = Figure()
-            ax = seirm_fig.add_subplot(1,1,1, facecolor='w', axisbelow=True)
-            ax.plot(t, S/1000, 'k', alpha=1, lw=2, ls='-', label='Susceptible')
-            ax.plot(t, E/1000, '#FFCC00', alpha=1, lw=2, ls='-.', label='Exposed')
-            ax.plot(t, I/1000, '#FF0000', alpha=1, lw=2, ls=':', label='Infected')
-            ax.plot(t, R/1000, 'c', alpha=1, lw=2, ls='--', label='Recovered')
-            ax.set_title(label='SEIR(MITIGATION) PLOT', loc='center', pad=15.0, fontsize=25)
-            ax.set_xlabel('Time in days')
-            ax.set_ylabel('Population in 1000s')
-            ax.set_ylim(0,value)
-            ax.minorticks_on()
-            ax.tick_params(axis='x', which='minor')
-            ax.grid(b=True, which='major', c='k', lw=0.2, ls='-')
-            seirm_fig.patch.set_facecolor('w')
-            seirm_fig.patch.set_alpha(0.7)
-            ax.patch.set_edgecolor('black')
-            ax.patch.set_linewidth(0.7) 
-            legend = ax.legend()
-            legend.get_frame().set_alpha(1.0)
+        if interactive:
+            seirm_fig = model_func.model_frames('seirm', 'SEIR(MITIGATION) PLOT',
+                        [susceptible, exposed, infected, recovered], day_value,
+                        (m_control, total_pop, expose_rate, contact_rate, recovery_rate), explore, value)
+
+        elif scheduled:
+            seirm_fig = model_func.model_plot('SEIR(MITIGATION) PLOT', t, value,
+                        [(S/1000, 'k', 2, '-', 'Susceptible'),
+                        (E/1000, '#FFCC00', 2, '-.', 'Exposed'),
+                        (I/1000, '#FF0000', 2, ':', 'Infected'),
+                        (R/1000, 'c', 2, '--', 'Recovered'),
+                        (I_constant/1000, 'grey', 1, ':', 'Infected(without schedule)')])
+
+        else:
+            seirm_fig = model_func.model_plot('SEIR(MITIGATION) PLOT', t, value,
+                        [(S/1000, 'k', 2, '-', 'Susceptible'),
+                        (E/1000, '#FFCC00', 2, '-.', 'Exposed'),
+                        (I/1000, '#FF0000', 2, ':', 'Infected'),
+                        (R/1000, 'c', 2, '--', 'Recovered')])
 
 
     if expos < pop and infec < pop and recov < pop and expos + infec + recov < pop:
 
-        st.pyplot(seirm_fig, clear_figure = True)
+        with model_func.span('display', 'model plot'):
+            if interactive:
+                st.plotly_chart(seirm_fig, use_container_width = True)
+            else:
+                st.image(seirm_fig, use_column_width = True)
+
+        if scheduled:
+            trigger_day = schedule_ret.trigger_days[0][0] if lockdown_trigger > 0 else lockdown_day
+            if trigger_day is None:
+                st.info('The infected population never exceeds the lockdown trigger, the mitigation control stays at {:.1f}'.format(m_control))
+            else:
+                st.info('Lockdown from day {:.0f}, the infected population peaks at {:,.0f} on day {} against {:,.0f} on day {} without the schedule'.format(
+                        trigger_day, I.max(), int(I.argmax()), I_constant.max(), int(I_constant.argmax())))
 
     else:
 
@@ -1374,6 +1491,9 @@ if menu == 'COVID-19 DASHBOARD':
 
     container.title('CONTROLS')
 
+    # controls of the metapopulation simulation are shown below the controls of the dashboard
+    meta_container = st.sidebar.container()
+
     with st.container():
 
         st.title('COVID-19 DASHBOARD')
@@ -1383,7 +1503,104 @@ if menu == 'COVID-19 DASHBOARD':
         st.header('Covid-19 Map View')
         
         map_data = model_func.country_clean()
-        st.map(map_data, zoom = 1)
+
+        meta_container.markdown("<p></p>", unsafe_allow_html = True)
+        meta = meta_container.checkbox('Metapopulation SEIR 🌐', 
+                            help = 'Simulate the spread of a disease between all countries at once and view it on the map',
+                            key = 'meta_cb')
+
+        if meta:
+
+            # setting up controls for the metapopulation simulation
+            countries = list(model_func.metapopulation_data()['Country'])
+            seed_country = meta_container.selectbox('Country of the first infections', 
+                                countries,
+                                index = countries.index('China') if 'China' in countries else 0,
+                                key = 'meta_country')
+
+            seed_infected = meta_container.number_input('Infected Population Value', 
+                                min_value = 1,
+                                value = 100, 
+                                step = 1,
+                                key = 'meta_i')
+
+            meta_days = meta_container.slider('Number of days', 
+                                min_value = 100,
+                                max_value = 730,
+                                value = 365,
+                                step = 10,
+                                help = '2 years in total',
+                                key = 'meta_days')
+
+            meta_con = meta_container.slider('Contact Rate(beta)', 
+                                min_value = 1, 
+                                max_value = 20,
+                                value = 6, 
+                                step = 1,
+                                help = 'Select the number of contacts(per day)',
+                                key = 'meta_con')
+
+            meta_incu = meta_container.slider('Expose Rate(alpha)', 
+                                min_value = 1, 
+                                max_value = 10,
+                                value = 3, 
+                                step = 1,
+                                help = 'Select the number of days(mean exposed rate = 1/number of days',
+                                key = 'meta_incu')
+
+            meta_rec = meta_container.slider('Recovery Rate(gamma)', 
+                                min_value = 1, 
+                                max_value = 10,
+                                value = 5, 
+                                step = 1,
+                                help = 'Select the number of days(mean recovery rate = 1/number of days',
+                                key = 'meta_rec')
+
+            mobility = meta_container.slider('Mobility', 
+                                min_value = 0.0, 
+                                max_value = 0.1,
+                                value = 0.01, 
+                                step = 0.005,
+                                format = '%.3f',
+                                help = 'Select the share of contacts made with people of other countries',
+                                key = 'meta_mobility')
+
+            meta_day = meta_container.slider('Day shown on the map', 
+                                min_value = 0, 
+                                max_value = meta_days - 1,
+                                value = min(120, meta_days - 1), 
+                                step = 1,
+                                key = 'meta_day')
+
+            # every country is solved at once, moving the day slider only selects a day of the cached solve
+            meta_result = model_func.metapopulation(seed_country, seed_infected, meta_days,
+                                1/meta_incu, model_func.eff_contact(meta_con), 1/meta_rec, mobility)
+            S, E, I, R = meta_result.trajectory[meta_day]
+
+            meta_data = pd.DataFrame({'Country': meta_result.countries, 
+                                'lat': meta_result.lat, 
+                                'lon': meta_result.lon, 
+                                'Infected': np.rint(I).astype(int),
+                                'Infected(%)': np.round(100 * I / meta_result.population, 2),
+                                # the radius of every country grows with the share of its population infected
+                                'radius': 30000 + 1500000 * np.sqrt(I / meta_result.population)})
+
+            st.pydeck_chart(pdk.Deck(
+                                layers = [pdk.Layer('ScatterplotLayer', 
+                                            data = meta_data, 
+                                            get_position = '[lon, lat]', 
+                                            get_radius = 'radius', 
+                                            get_fill_color = '[255, 0, 0, 140]', 
+                                            pickable = True)],
+                                initial_view_state = pdk.ViewState(latitude = 20, longitude = 0, zoom = 0.5),
+                                tooltip = {'text': '{Country}\nInfected: {Infected}({Infected(%)}%)'}))
+
+            reached = int((meta_result.population - S >= 1).sum())
+            st.info('Day {}: {:,} infected people worldwide, the disease has reached {} of {} countries'.format(meta_day, int(I.sum()), reached, len(meta_result.countries)))
+
+        else:
+
+            st.map(map_data, zoom = 1)
         
         # calling the respective functions containing the final datasets and storing the returned data to respective variables  
         country_data = model_func.country_clean()
@@ -1433,7 +1650,8 @@ if menu == 'COVID-19 DASHBOARD':
                             labels = {'Confirmed':'Infected Count'}, 
                             height = 500)
     
-        st.plotly_chart(infected_fig, use_container_width = True)
+        with model_func.span('display', 'dashboard chart'):
+            st.plotly_chart(infected_fig, use_container_width = True)
 
         st.header('TOP COUNTRIES - RECOVERED POPULATION')
         recovered_fig = px.bar(sorted_recovered_country.head(recovered_count), 
@@ -1443,7 +1661,8 @@ if menu == 'COVID-19 DASHBOARD':
                             labels = {'Recovered':'Recovered Count'},
                             height = 500)
     
-        st.plotly_chart(recovered_fig, use_container_width = True)
+        with model_func.span('display', 'dashboard chart'):
+            st.plotly_chart(recovered_fig, use_container_width = True)
 
         st.header('TOP COUNTRIES - DECEASED POPULATION')
         deceased_fig = px.bar(sorted_deceased_country.head(deceased_count), 
@@ -1453,4 +1672,49 @@ if menu == 'COVID-19 DASHBOARD':
                             labels = {'Deaths':'Deceased Count'},
                             height = 500)
     
-        st.plotly_chart(deceased_fig, use_container_width = True)
\ No newline at end of file
+        with model_func.span('display', 'dashboard chart'):
+            st.plotly_chart(deceased_fig, use_container_width = True)
+
+
+
+#### PERFORMANCE ####
+# timings of the stages of the reruns, hit rates of the caches and memory of the datasets of this process - Refer 'instrumentation.py'
+if menu == 'PERFORMANCE':
+
+    with st.container():
+
+        st.title('PERFORMANCE')
+
+        st.markdown('Timings of the stages of the reruns and hit rates of the caches since the process started(or the metrics were cleared). The same metrics are exported in the Prometheus text format.')
+
+        stages, caches, prometheus = model_func.performance_report()
+
+        st.header('Stages')
+        if stages.empty:
+            st.info('No stage has been timed yet')
+        else:
+            st.dataframe(stages.style.format({column: '{:.2f}' for column in ('total_ms', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms')}))
+
+        st.header('Caches')
+        if caches.empty:
+            st.info('No cache has been used yet')
+        else:
+            st.dataframe(caches.style.format({'hit_rate': '{:.1%}'}))
+
+        st.header('Memory')
+        st.dataframe(model_func.memory_report())
+
+        data_age, data_refresh = model_func.data_status()
+        st.markdown('▶ Last data refresh: {}{}'.format(data_refresh.outcome, '' if data_refresh.seconds is None else ' in {:.2f}s'.format(data_refresh.seconds)))
+
+        st.download_button('Download Prometheus metrics', prometheus, file_name = 'epidemos_metrics.txt', mime = 'text/plain')
+
+        with st.expander('Prometheus text'):
+            st.code(prometheus, language = 'text')
+
+        if st.button('Clear metrics'):
+            model_func.clear_metrics()
+
+# the duration of the rerun is recorded and the metrics are exported(when a file or an endpoint is configured)
+model_func.rerun_finished(menu, time.perf_counter() - rerun_started)
+model_func.finish_profile(menu)
@@ -0,0 +1,282 @@
+# this python file consists of the timing instrumentation of the application, the stages of a page rerun(network fetch, CSV parse, cleaning, model solves, plot drawing and display) are timed as spans and the hits and misses of the caches are counted
+
+# every span adds its duration to the latency histogram of its stage(and name, for example the dataset being fetched or the model being solved), the histograms have fixed buckets therefore recording a span costs a few additions whatever the number of spans - Refer https://prometheus.io/docs/practices/histograms/
+# the histograms and the cache counters are exported in the Prometheus text format and shown on the hidden "PERFORMANCE" page of the application(opened with '?performance=1' in the url) - Refer https://prometheus.io/docs/instrumenting/exposition_formats/
+
+# the instrumentation can be configured using the following environment variables:
+# EPIDEMOS_METRICS - 0 disables the spans and the counters(default is 1)
+# EPIDEMOS_METRICS_FILE - file the Prometheus text is written to at the end of a rerun, at most once every EPIDEMOS_METRICS_FILE_INTERVAL seconds(default is 15), by default no file is written
+# EPIDEMOS_METRICS_PORT - port of an HTTP endpoint serving the Prometheus text at '/metrics'(default is 0, no endpoint)
+
+###### NECESSARY IMPORTS ######
+import os
+import time
+import bisect
+import tempfile
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ENABLED = os.environ.get('EPIDEMOS_METRICS', '1') != '0'
+METRICS_FILE = os.environ.get('EPIDEMOS_METRICS_FILE', '')
+METRICS_FILE_INTERVAL = float(os.environ.get('EPIDEMOS_METRICS_FILE_INTERVAL', 15))
+METRICS_PORT = int(os.environ.get('EPIDEMOS_METRICS_PORT', 0))
+
+# upper bounds of the histogram buckets in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+
+
+class Span:
+    __slots__ = ('metrics', 'stage', 'name', 'started')
+
+    def __init__(self, metrics, stage, name):
+        self.metrics = metrics
+        self.stage = stage
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self.started, self.name)
+        return False
+
+
+# the span returned when the instrumentation is disabled, it does nothing
+class Null_Span:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = Null_Span()
+
+
+class Metrics:
+
+    def __init__(self, enabled = METRICS_ENABLED, buckets = BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.started_at = time.time()
+        # (stage, name) is mapped to the counts of the buckets, the sum and the number of the observed durations
+        self._histograms = OrderedDict()
+        # (cache, 'hit' or 'miss') is mapped to the number of lookups
+        self._counters = OrderedDict()
+        # caches keeping their own counters(the solve cache and the plot renderer) are asked for them when the metrics are exported, the counters at the last clear are kept as baselines and subtracted
+        self._collectors = OrderedDict()
+        self._baselines = {}
+        self._lock = threading.Lock()
+        self._written_at = 0.0
+        self._server = None
+
+    # function defined to time a block of code as a span of 'stage', for example "with metrics.span('fetch', name):"
+    def span(self, stage, name = ''):
+        if not self.enabled:
+            return NULL_SPAN
+
+        return Span(self, stage, name)
+
+    # function defined to add a duration in seconds to the histogram of a stage
+    def observe(self, stage, seconds, name = ''):
+        if not self.enabled:
+            return
+
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        key = (stage, name)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0]
+            histogram[0][bucket] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    # function defined to count a lookup of a cache
+    def count(self, cache, hit):
+        if not self.enabled:
+            return
+
+        key = (cache, 'hit' if hit else 'miss')
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+
+    # function defined to register a cache keeping its own counters, 'stats' returns a dictionary holding at least 'hits' and 'misses'
+    def collect(self, cache, stats):
+        with self._lock:
+            self._collectors[cache] = stats
+
+    # function defined to remove all observed durations and counts, the counters of the caches registered by 'collect' start again from zero
+    def clear(self):
+        with self._lock:
+            collectors = list(self._collectors.items())
+
+        baselines = {}
+        for cache, stats in collectors:
+            values = stats()
+            baselines[cache] = {'hit': values['hits'], 'miss': values['misses']}
+
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._baselines = baselines
+            self.started_at = time.time()
+
+    # function defined to estimate a quantile of a histogram by linear interpolation inside its bucket
+    def quantile(self, counts, q):
+        total = sum(counts)
+        if not total:
+            return None
+
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i]
+                # the last bucket has no upper bound, its lower bound is returned
+                if upper == float('inf'):
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+
+        return self.buckets[-2]
+
+    # function defined to return one row per stage and name with the number of spans, the total, the mean and the estimated quantiles of the durations in milliseconds
+    def stages(self):
+        with self._lock:
+            histograms = [(key, list(counts), total, count) for key, (counts, total, count) in self._histograms.items()]
+
+        rows = []
+        for (stage, name), counts, total, count in sorted(histograms):
+            rows.append({'stage': stage, 'name': name, 'count': count,
+                         'total_ms': total * 1000, 'mean_ms': total / count * 1000,
+                         'p50_ms': self.quantile(counts, 0.5) * 1000,
+                         'p95_ms': self.quantile(counts, 0.95) * 1000,
+                         'p99_ms': self.quantile(counts, 0.99) * 1000})
+
+        return rows
+
+    # function defined to return one row per cache with its hits, misses and hit rate
+    def caches(self):
+        with self._lock:
+            counters = dict(self._counters)
+            collectors = list(self._collectors.items())
+            baselines = dict(self._baselines)
+
+        totals = OrderedDict()
+        for (cache, result), value in counters.items():
+            totals.setdefault(cache, {'hit': 0, 'miss': 0})[result] += value
+        for cache, stats in collectors:
+            values = stats()
+            baseline = baselines.get(cache, {'hit': 0, 'miss': 0})
+            totals[cache] = {'hit': values['hits'] - baseline['hit'], 'miss': values['misses'] - baseline['miss']}
+
+        rows = []
+        for cache, values in sorted(totals.items()):
+            lookups = values['hit'] + values['miss']
+            rows.append({'cache': cache, 'hits': values['hit'], 'misses': values['miss'],
+                         'hit_rate': values['hit'] / lookups if lookups else 0.0})
+
+        return rows
+
+    # function defined to return the histograms and the cache counters in the Prometheus text format
+    def prometheus(self):
+        with self._lock:
+            histograms = [(key, list(counts), total, count) for key, (counts, total, count) in self._histograms.items()]
+
+        lines = ['# HELP epidemos_stage_seconds Duration of the stages of a page rerun.',
+                 '# TYPE epidemos_stage_seconds histogram']
+        for (stage, name), counts, total, count in sorted(histograms):
+            labels = 'stage="{}",name="{}"'.format(escape(stage), escape(name))
+            cumulative = 0
+            for bound, value in zip(self.buckets, counts):
+                cumulative += value
+                lines.append('epidemos_stage_seconds_bucket{{{},le="{}"}} {}'.format(labels, '+Inf' if bound == float('inf') else repr(bound), cumulative))
+            lines.append('epidemos_stage_seconds_sum{{{}}} {!r}'.format(labels, total))
+            lines.append('epidemos_stage_seconds_count{{{}}} {}'.format(labels, count))
+
+        lines += ['# HELP epidemos_cache_lookups_total Lookups of the caches of the application.',
+                  '# TYPE epidemos_cache_lookups_total counter']
+        for row in self.caches():
+            for result, column in (('hit', 'hits'), ('miss', 'misses')):
+                lines.append('epidemos_cache_lookups_total{{cache="{}",result="{}"}} {}'.format(escape(row['cache']), result, row[column]))
+
+        lines += ['# HELP epidemos_metrics_start_time_seconds Time at which the metrics were last cleared.',
+                  '# TYPE epidemos_metrics_start_time_seconds gauge',
+                  'epidemos_metrics_start_time_seconds {!r}'.format(self.started_at)]
+
+        return '\n'.join(lines) + '\n'
+
+    # function defined to write the Prometheus text to a file, the file is replaced at once so a scraper never reads a partial file
+    def write(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok = True)
+        fd, tmp_path = tempfile.mkstemp(dir = directory, prefix = '.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.prometheus())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    # function defined to export the metrics as configured by the environment variables, called at the end of every rerun
+    def export(self, path = METRICS_FILE, interval = METRICS_FILE_INTERVAL, port = METRICS_PORT):
+        if not self.enabled:
+            return
+
+        if port and self._server is None:
+            self.serve(port)
+
+        now = time.time()
+        if path and now - self._written_at >= interval:
+            self._written_at = now
+            self.write(path)
+
+    # function defined to serve the Prometheus text at '/metrics' from a background thread, the endpoint is started once per process
+    def serve(self, port, host = '0.0.0.0'):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        with self._lock:
+            if self._server is not None:
+                return self._server
+            try:
+                self._server = ThreadingHTTPServer((host, port), Handler)
+            except OSError:
+                # another process of the application already serves the endpoint on this port
+                self._server = False
+                return None
+
+        threading.Thread(target = self._server.serve_forever, name = 'metrics-endpoint', daemon = True).start()
+
+        return self._server
+
+
+# function defined to escape a label value of the Prometheus text format
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# the metrics shared by every session in the process
+metrics = Metrics()
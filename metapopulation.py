@@ -0,0 +1,125 @@
+# this python file consists of the metapopulation SEIR model used by the "COVID-19 DASHBOARD" to simulate the spread of a disease between all countries at once
+
+# every country is a separate SEIR population(Refer 'model_kernels.py') and the countries are coupled by a mobility network, that is, a share of the contacts of every country(the mobility) is made with the people of other countries. The network is a gravity model built from the coordinates and the populations of the countries(Refer 'Modelling.country_clean'), the flow between two countries grows with both populations and falls with the square of their distance - Refer https://en.wikipedia.org/wiki/Gravity_model_of_migration
+# only the strongest links of every country are kept therefore the network is a sparse matrix and the model functions are evaluated for all countries with a single sparse matrix product
+
+# the force of infection in country i is beta * sum over j of C[i, j] * I[j] / N[j] where C = (1 - mobility) * identity + mobility * M and every row of the gravity network M sums to 1, therefore with a mobility of 0 every country is the SEIR model of the SEIR page
+
+###### NECESSARY IMPORTS ######
+import hashlib
+import threading
+from collections import namedtuple, OrderedDict
+import numpy as np
+import scipy.sparse as sparse
+from scipy.integrate import odeint
+
+EARTH_RADIUS = 6371.0
+# distances below this value(in km) are treated as this value so neighbouring countries with close coordinates do not dominate the network
+MIN_DISTANCE = 50.0
+
+# countries - names of the countries in the order of the trajectory columns
+# trajectory - compartments S, E, I and R of every country (days x compartments x countries)
+Metapopulation_Result = namedtuple('Metapopulation_Result', ['countries', 'lat', 'lon', 'population', 'days', 'trajectory'])
+
+# the networks and the most recent solves are kept so reruns of the dashboard do not build or solve them again, the caches are shared by the sessions of the process and only used under their lock(the networks are built and the models solved outside of the lock)
+network_cache = {}
+METAPOPULATION_CACHE_SIZE = 8
+metapopulation_cache = OrderedDict()
+metapopulation_cache_lock = threading.Lock()
+
+
+class Metapopulation:
+
+    # function defined to build the gravity network of the countries, every country keeps the links to the 'neighbours' countries with the largest flow(links are kept in both directions) and every row is scaled to sum to 1
+    @staticmethod
+    def gravity_matrix(lat, lon, population, neighbours = 10, distance_exponent = 2.0):
+        lat = np.radians(np.asarray(lat, dtype = float))
+        lon = np.radians(np.asarray(lon, dtype = float))
+        population = np.asarray(population, dtype = float)
+        n = len(population)
+        neighbours = min(neighbours, n - 1)
+        if neighbours < 1:
+            return sparse.csr_matrix((n, n))
+
+        # haversine distance between every pair of countries
+        a = np.sin((lat[:, None] - lat[None, :]) / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2
+        distance = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+        flow = population[:, None] * population[None, :] / np.maximum(distance, MIN_DISTANCE) ** distance_exponent
+        np.fill_diagonal(flow, 0.0)
+
+        rows = np.repeat(np.arange(n), neighbours)
+        columns = np.argpartition(-flow, neighbours - 1, axis = 1)[:, :neighbours].ravel()
+        network = sparse.csr_matrix((flow[rows, columns], (rows, columns)), shape = (n, n))
+        network = network.maximum(network.T)
+
+        totals = np.asarray(network.sum(axis = 1)).ravel()
+        return sparse.diags(np.divide(1.0, totals, out = np.zeros(n), where = totals > 0)) @ network
+
+    # function defined to return the gravity network of the countries, built once for every set of countries
+    @staticmethod
+    def network(lat, lon, population, neighbours = 10):
+        digest = hashlib.sha1()
+        for values in (lat, lon, population):
+            digest.update(np.ascontiguousarray(values, dtype = float).tobytes())
+        key = (digest.hexdigest(), neighbours)
+
+        with metapopulation_cache_lock:
+            network = network_cache.get(key)
+        if network is None:
+            network = Metapopulation.gravity_matrix(lat, lon, population, neighbours).tocsr()
+            with metapopulation_cache_lock:
+                network_cache.clear()
+                network_cache[key] = network
+
+        return network
+
+    # function defined for the metapopulation SEIR model differential equations, the state holds S, E, I and R of all countries one compartment after the other
+    @staticmethod
+    def seir_model(state, t, coupling, N, alpha, beta, gamma):
+        S, E, I, R = state.reshape(4, -1) # R is accessed during runtime
+        infection = beta * S * (coupling @ (I / N))
+        onset = alpha * E
+        recovery = gamma * I
+        # change in S, E, I and R population of every country over time
+        return np.concatenate((-infection, infection - onset, onset - recovery, recovery))
+
+    # function defined to solve the metapopulation SEIR model over 'day_value' days(the same days as range(0, day_value) used by the pages)
+    # 'initial_infected' maps the countries where the disease starts to their number of infected people, 'mobility' is the share of contacts made with other countries
+    @staticmethod
+    def solve(countries, lat, lon, population, initial_infected, day_value, alpha, beta, gamma, mobility):
+        countries = list(countries)
+        population = np.asarray(population, dtype = float)
+
+        key = (tuple(countries), hashlib.sha1(population.tobytes()).hexdigest(), tuple(sorted(initial_infected.items())),
+               int(day_value), float(alpha), float(beta), float(gamma), float(mobility))
+        with metapopulation_cache_lock:
+            cached = metapopulation_cache.get(key)
+            if cached is not None:
+                metapopulation_cache.move_to_end(key)
+                return cached
+
+        n = len(countries)
+        coupling = ((1 - mobility) * sparse.identity(n) + mobility * Metapopulation.network(lat, lon, population)).tocsr()
+
+        infected = np.zeros(n)
+        for country, value in initial_infected.items():
+            infected[countries.index(country)] = min(value, population[countries.index(country)])
+        y0 = np.concatenate((population - infected, np.zeros(n), infected, np.zeros(n)))
+
+        ret = odeint(Metapopulation.seir_model, y0, range(0, int(day_value)), args = (coupling, population, alpha, beta, gamma))
+
+        result = Metapopulation_Result(countries = countries,
+                                       lat = np.asarray(lat, dtype = float),
+                                       lon = np.asarray(lon, dtype = float),
+                                       population = population,
+                                       days = np.arange(day_value),
+                                       trajectory = ret.reshape(len(ret), 4, n))
+
+        with metapopulation_cache_lock:
+            metapopulation_cache[key] = result
+            metapopulation_cache.move_to_end(key)
+            if len(metapopulation_cache) > METAPOPULATION_CACHE_SIZE:
+                metapopulation_cache.popitem(last = False)
+
+        return result
@@ -0,0 +1,160 @@
+# this python file consists of the mitigation schedules of the SEIR(MITIGATION) model, the mitigation control 'u' changes over time instead of keeping the same value for every day
+
+# a schedule starts with a mitigation control and changes it on given days, a change is a step(the new control applies from that day) or a ramp(the control moves linearly to the new value over a number of days). A schedule can also hold triggers, a trigger changes the control on the day the infected population crosses a threshold(rising for a lockdown, falling for a release), therefore the day of a trigger is only known while solving
+# between two changes the control is a straight line, therefore the model is solved in segments which end at every change(step or ramp) and the solver never has to step over a jump of the control. The crossings of the triggers are found by the solver as events and the segment ends at the crossing - Refer https://docs.scipy.org/doc/scipy/reference/generated/scipy.integrate.solve_ivp.html
+# many schedules are solved in a single call, the states of all schedules are stacked into a single system as in 'batch_solver.py' and every schedule has its own control
+
+###### NECESSARY IMPORTS ######
+import hashlib
+import threading
+from collections import namedtuple, OrderedDict
+import numpy as np
+from scipy.integrate import solve_ivp
+from model_kernels import Model_Kernels
+
+# day - day of the change, u - new mitigation control, ramp - number of days to reach the new control(0 is a step)
+Change = namedtuple('Change', ['day', 'u', 'ramp'])
+Change.__new__.__defaults__ = (0,)
+
+# threshold - number of infected people, u - mitigation control applied when the threshold is crossed, rising - True when the infected population has to rise above the threshold and False when it has to fall below it
+Trigger = namedtuple('Trigger', ['threshold', 'u', 'rising'])
+Trigger.__new__.__defaults__ = (True,)
+
+# u - mitigation control of the first day, changes - changes on given days, triggers - changes on the day a threshold is crossed(every trigger applies once)
+Mitigation_Schedule = namedtuple('Mitigation_Schedule', ['u', 'changes', 'triggers'])
+Mitigation_Schedule.__new__.__defaults__ = ((), ())
+
+# days - the days of the trajectories(the same days as range(0, day_value) used by the pages)
+# trajectory - compartments S, E, I and R of every schedule (schedules x days x compartments)
+# u - mitigation control of every schedule on every day (schedules x days)
+# trigger_days - days on which the triggers of every schedule applied(None for triggers which never applied)
+Schedule_Result = namedtuple('Schedule_Result', ['days', 'trajectory', 'u', 'trigger_days'])
+
+# the same tolerances as odeint so a schedule without changes gives the trajectory of the SEIR(MITIGATION) page
+RTOL = ATOL = 1.49012e-8
+# relative distance to the threshold within which a trigger counts as crossed at the same time as another trigger
+TRIGGER_TOLERANCE = 1e-6
+
+# the most recent solves are kept so reruns of the page with the same controls do not solve again, the cache is shared by the sessions of the process and only used under its lock(the segmented solve runs outside of the lock)
+SCHEDULE_CACHE_SIZE = 16
+schedule_cache = OrderedDict()
+schedule_cache_lock = threading.Lock()
+
+
+class Mitigation_Schedules:
+
+    # function defined to return the mitigation control of a schedule at the times 't', 'changes' are the changes sorted by day(including the triggers which applied)
+    @staticmethod
+    def control(u, changes, t):
+        t = np.asarray(t, dtype = float)
+        value = np.full(t.shape, float(u))
+        for i, change in enumerate(changes):
+            if change.ramp > 0:
+                # a ramp starts from the control left by the previous changes(an earlier ramp may not have finished yet)
+                begin = Mitigation_Schedules.control(u, changes[:i], [change.day])[0]
+                ramp = np.clip((t - change.day) / change.ramp, 0.0, 1.0)
+                value = np.where(t >= change.day, begin + (change.u - begin) * ramp, value)
+            else:
+                value = np.where(t >= change.day, float(change.u), value)
+
+        return value
+
+    # function defined to return the days on which the control of a schedule stops being a straight line
+    @staticmethod
+    def breakpoints(changes):
+        return sorted({float(change.day) for change in changes} | {float(change.day + change.ramp) for change in changes})
+
+    # function defined to solve the SEIR(MITIGATION) model for every schedule, 'initial_state' and the parameters are the same as 'Modelling.solve' without the control 'u'
+    @staticmethod
+    def solve(initial_state, day_value, N, alpha, beta, gamma, schedules):
+        schedules = [schedule if isinstance(schedule, Mitigation_Schedule) else Mitigation_Schedule(schedule) for schedule in schedules]
+
+        key = (hashlib.sha1(np.ascontiguousarray(initial_state, dtype = float).tobytes()).hexdigest(), int(day_value),
+               float(N), float(alpha), float(beta), float(gamma), repr(schedules))
+        with schedule_cache_lock:
+            cached = schedule_cache.get(key)
+            if cached is not None:
+                schedule_cache.move_to_end(key)
+                return cached
+
+        n = len(schedules)
+        k = 4
+        days = np.arange(day_value, dtype = float)
+        end = days[-1]
+        y0 = np.tile(np.asarray(initial_state, dtype = float), n)
+
+        # the changes of every schedule, the triggers are added as steps when they apply
+        changes = [sorted(schedule.changes) for schedule in schedules]
+        trigger_days = [[None] * len(schedule.triggers) for schedule in schedules]
+
+        result = np.empty((n, len(days), k))
+        t = 0.0
+        while True:
+            # the segment ends at the next change of any schedule
+            stops = [day for schedule_changes in changes for day in Mitigation_Schedules.breakpoints(schedule_changes) if t < day < end]
+            stop = min(stops, default = end)
+
+            # the control of every schedule is a straight line on the segment, u = u_start + slope * (time - t), the slope is taken just before the end of the segment as a step at the end belongs to the next segment
+            u_start = np.array([Mitigation_Schedules.control(schedule.u, schedule_changes, [t])[0] for schedule, schedule_changes in zip(schedules, changes)])
+            u_before = np.array([Mitigation_Schedules.control(schedule.u, schedule_changes, [np.nextafter(stop, t)])[0] for schedule, schedule_changes in zip(schedules, changes)])
+            slope = (u_before - u_start) / (stop - t) if stop > t else np.zeros(n)
+
+            # the jacobian of the stacked system is block diagonal(every schedule only depends on its own compartments), the solver estimates its bands from a few calls of 'rhs' whatever the number of schedules
+            def rhs(time, y, u_start = u_start, slope = slope, t0 = t):
+                u = u_start + slope * (time - t0)
+                return np.stack(Model_Kernels.seirm_model(y.reshape(n, k).T, time, u, N, alpha, beta, gamma), axis = 1).ravel()
+
+            # every trigger which has not applied yet ends the segment when the infected population of its schedule crosses the threshold
+            events = []
+            for s, schedule in enumerate(schedules):
+                for j, trigger in enumerate(schedule.triggers):
+                    if trigger_days[s][j] is None:
+                        event = lambda time, y, s = s, threshold = trigger.threshold: y[s * k + 2] - threshold
+                        event.terminal = True
+                        event.direction = 1 if trigger.rising else -1
+                        event.trigger = (s, j)
+                        events.append(event)
+
+            starts = [event(t, y0) for event in events]
+
+            # the end of the segment is always evaluated as the next segment starts from it
+            t_eval = np.union1d(days[(days >= t) & (days <= stop)], [stop])
+            if stop > t:
+                solution = solve_ivp(rhs, (t, stop), y0, method = 'LSODA', t_eval = t_eval, events = events or None,
+                                     lband = k - 1, uband = k - 1, rtol = RTOL, atol = ATOL)
+                if not solution.success:
+                    raise RuntimeError('The mitigation schedules could not be solved: {}'.format(solution.message))
+                times, states = np.asarray(solution.t, dtype = float), np.reshape(solution.y, (len(y0), -1)).T
+            else:
+                solution = None
+                times, states = t_eval, y0[None, :]
+
+            on_day = np.isin(times, days)
+            result[:, np.searchsorted(days, times[on_day])] = states[on_day].reshape(-1, n, k).transpose(1, 0, 2)
+
+            if solution is not None and solution.status == 1:
+                # a trigger applied, its control is a step from the crossing onwards and the next segment starts at the crossing
+                # the solver only reports the first crossing, the triggers of other schedules crossing at the same time(for example schedules which are the same until a later change) apply as well
+                fired = [(t_events[0], y_events[0]) for t_events, y_events in zip(solution.t_events, solution.y_events) if len(t_events)]
+                t, y0 = min(fired, key = lambda item: item[0])
+                for event, start in zip(events, starts):
+                    s, j = event.trigger
+                    if event.direction * start < 0 and event.direction * event(t, y0) >= -TRIGGER_TOLERANCE * max(1.0, abs(schedules[s].triggers[j].threshold)):
+                        trigger_days[s][j] = float(t)
+                        changes[s] = sorted(changes[s] + [Change(float(t), schedules[s].triggers[j].u)])
+                continue
+
+            if stop >= end:
+                break
+            t, y0 = stop, states[-1]
+
+        control = np.array([Mitigation_Schedules.control(schedule.u, schedule_changes, days) for schedule, schedule_changes in zip(schedules, changes)])
+        result = Schedule_Result(days = days.astype(int), trajectory = result, u = control, trigger_days = trigger_days)
+
+        with schedule_cache_lock:
+            schedule_cache[key] = result
+            schedule_cache.move_to_end(key)
+            if len(schedule_cache) > SCHEDULE_CACHE_SIZE:
+                schedule_cache.popitem(last = False)
+
+        return result
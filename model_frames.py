@@ -0,0 +1,99 @@
+# this python file consists of the interactive plots of the model pages
+
+# moving a slider of a model page reruns the application, solves the model again and draws a new plot. The interactive plot solves the model for every value of one slider(the parameter to explore) in a single batch(Refer 'batch_solver.py') and ships all trajectories as the frames of one plotly figure with its own slider, therefore exploring that parameter happens in the browser without rerunning the application - Refer https://plotly.com/python/animations/
+# all other parameters keep the values of their sliders, the frame of the current slider value is shown first
+
+# the values of every parameter are the same values as the sliders of the model pages(Refer the grids of 'trajectory_tables.py')
+
+###### NECESSARY IMPORTS ######
+import threading
+from collections import OrderedDict
+import numpy as np
+import plotly.graph_objects as go
+from batch_solver import Batch_Solver, MODELS
+from trajectory_tables import TABLES
+from solve_cache import solve_cache
+
+# colours, line styles and labels of the compartments, the same as the matplotlib plots of the model pages
+COMPARTMENT_STYLES = {
+    'S': ('black', 'solid', 'Susceptible'),
+    'E': ('#FFCC00', 'dashdot', 'Exposed'),
+    'I': ('#FF0000', 'dot', 'Infected'),
+    'R': ('#00BFBF', 'dash', 'Recovered'),
+    'D': ('#9A7B4F', 'dashdot', 'Deceased'),
+    }
+
+# parameters that can be explored on every model page and the names of their sliders
+FRAME_PARAMETERS = {
+    'sir': OrderedDict([('beta', 'Contact Rate(beta)'), ('gamma', 'Recovery Rate(gamma)')]),
+    'sird': OrderedDict([('beta', 'Contact Rate(beta)'), ('gamma', 'Recovery Rate(gamma)'), ('sigma', 'Deceased Rate(sigma)')]),
+    'seir': OrderedDict([('beta', 'Contact Rate(beta)'), ('alpha', 'Expose Rate(alpha)'), ('gamma', 'Recovery Rate(gamma)')]),
+    'seirm': OrderedDict([('u', 'Mitigation Control'), ('beta', 'Contact Rate(beta)'), ('alpha', 'Expose Rate(alpha)'), ('gamma', 'Recovery Rate(gamma)')]),
+    }
+
+# the most recent figures are kept so reruns of a page with the same controls do not solve again, the cache is shared by the sessions of the process and only used under its lock(the frames are solved and built outside of the lock)
+FRAME_CACHE_SIZE = 16
+frame_cache = OrderedDict()
+frame_cache_lock = threading.Lock()
+
+
+class Model_Frames:
+
+    # function defined to return the interactive plot of a model(the same arguments as 'Modelling.solve'), 'parameter' is the explored parameter and 'value' is the upper limit of the y axis
+    @staticmethod
+    def figure(model, title, initial_state, day_value, args, parameter, value):
+        key = solve_cache.key(model, initial_state, day_value, args) + (parameter, float(value))
+        with frame_cache_lock:
+            cached = frame_cache.get(key)
+            if cached is not None:
+                frame_cache.move_to_end(key)
+                return cached
+
+        names = MODELS[model]['parameters']
+        params = dict(zip(names, args))
+        grid = np.asarray(TABLES[model]['grid'][parameter], dtype = float)
+        current = int(np.argmin(np.abs(grid - params[parameter])))
+        params[parameter] = grid
+
+        # all values of the explored parameter are solved in one batch
+        result = Batch_Solver.solve(model, initial_state, np.arange(day_value), **params)
+        # people are shown in 1000s, three decimals keep every person while keeping the figure small
+        result = np.round(result / 1000, 3)
+
+        t = np.linspace(0, day_value, day_value)
+        compartments = MODELS[model]['compartments']
+
+        def traces(trajectory):
+            return [go.Scatter(x = t, y = trajectory[:, i], mode = 'lines', name = COMPARTMENT_STYLES[compartment][2],
+                               line = dict(color = COMPARTMENT_STYLES[compartment][0], dash = COMPARTMENT_STYLES[compartment][1], width = 2))
+                    for i, compartment in enumerate(compartments)]
+
+        # the frames only hold the y values, plotly keeps the x values and styles of the figure's traces when it moves to a frame
+        labels = ['{:.3g}'.format(v) for v in grid]
+        frames = [go.Frame(data = [go.Scatter(y = trajectory[:, i]) for i in range(len(compartments))], name = label) for trajectory, label in zip(result, labels)]
+
+        steps = [dict(method = 'animate', label = label,
+                      args = [[label], dict(mode = 'immediate', frame = dict(duration = 0, redraw = False), transition = dict(duration = 0))])
+                 for label in labels]
+
+        fig = go.Figure(data = traces(result[current]), frames = frames)
+        fig.update_layout(title = dict(text = title, x = 0.5),
+                          xaxis = dict(title = 'Time in days', range = [0, day_value]),
+                          yaxis = dict(title = 'Population in 1000s', range = [0, value]),
+                          plot_bgcolor = 'white',
+                          height = 550,
+                          sliders = [dict(active = current, steps = steps, pad = dict(t = 50),
+                                          currentvalue = dict(prefix = FRAME_PARAMETERS[model][parameter] + ' = '))],
+                          updatemenus = [dict(type = 'buttons', showactive = False, x = 0, y = -0.25, xanchor = 'left',
+                                              buttons = [dict(label = '▶', method = 'animate',
+                                                              args = [None, dict(frame = dict(duration = 150, redraw = False), transition = dict(duration = 0), fromcurrent = True)])])])
+        fig.update_xaxes(showgrid = True, gridcolor = 'lightgrey', zeroline = False)
+        fig.update_yaxes(showgrid = True, gridcolor = 'lightgrey', zeroline = False)
+
+        with frame_cache_lock:
+            frame_cache[key] = fig
+            frame_cache.move_to_end(key)
+            if len(frame_cache) > FRAME_CACHE_SIZE:
+                frame_cache.popitem(last = False)
+
+        return fig
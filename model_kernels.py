@@ -0,0 +1,119 @@
+# this python file consists of the differential equations of every model and their jacobians, used by odeint on all pages of the application
+
+# the model functions are called by odeint hundreds of times during a single solve, therefore they are plain functions without @st.cache(hashing the arguments and looking up the cache on every call costs more than evaluating the equations) and they only build the returned tuple
+
+# the jacobians are passed to odeint as 'Dfun' so the solver does not have to estimate them using additional calls of the model functions - Refer https://docs.scipy.org/doc/scipy/reference/generated/scipy.integrate.odeint.html
+
+# every function only uses arithmetic on its arguments, therefore the same functions also work element-wise on numpy arrays holding many scenarios(used by 'batch_solver.py')
+
+# the sir model function is referred from the given site and has been modified for this application and three additional models were designed by keeping the defined sir model function as a foundational model - Refer https://scipython.com/book/chapter-8-scipy/additional-examples/the-sir-epidemic-model/
+
+
+###### NECESSARY IMPORTS ######
+import numpy as np
+
+
+class Model_Kernels:
+
+    # function defined for the SIR model differential equations
+    @staticmethod
+    def sir_model(state, t, N, beta, gamma):
+        S, I, R = state # R is accessed during runtime
+        infection = beta * S * I / N
+        recovery = gamma * I
+        # change in S, I and R population over time
+        return -infection, infection - recovery, recovery
+
+    # function defined for the jacobian of the SIR model, row i holds the derivatives of equation i with respect to S, I and R
+    @staticmethod
+    def sir_jacobian(state, t, N, beta, gamma):
+        S, I, R = state
+        dS = beta * I / N
+        dI = beta * S / N
+        return ((-dS, -dI, 0.0),
+                (dS, dI - gamma, 0.0),
+                (0.0, gamma, 0.0))
+
+    # function defined for the SIRD model differential equations
+    @staticmethod
+    def sird_model(state, t, N, beta, gamma, sigma):
+        S, I, R, D = state # R and D are accessed during runtime
+        infection = beta * S * I / N
+        # change in S, I, R and D population over time
+        return -infection, infection - (gamma + sigma) * I, gamma * I, sigma * I
+
+    # function defined for the jacobian of the SIRD model
+    @staticmethod
+    def sird_jacobian(state, t, N, beta, gamma, sigma):
+        S, I, R, D = state
+        dS = beta * I / N
+        dI = beta * S / N
+        return ((-dS, -dI, 0.0, 0.0),
+                (dS, dI - gamma - sigma, 0.0, 0.0),
+                (0.0, gamma, 0.0, 0.0),
+                (0.0, sigma, 0.0, 0.0))
+
+    # function defined for the SEIR model differential equations
+    @staticmethod
+    def seir_model(state, t, N, alpha, beta, gamma):
+        S, E, I, R = state # R is accessed during runtime
+        infection = beta * S * I / N
+        onset = alpha * E
+        recovery = gamma * I
+        # change in S, E, I and R population over time
+        return -infection, infection - onset, onset - recovery, recovery
+
+    # function defined for the jacobian of the SEIR model
+    @staticmethod
+    def seir_jacobian(state, t, N, alpha, beta, gamma):
+        S, E, I, R = state
+        dS = beta * I / N
+        dI = beta * S / N
+        return ((-dS, 0.0, -dI, 0.0),
+                (dS, -alpha, dI, 0.0),
+                (0.0, alpha, -gamma, 0.0),
+                (0.0, 0.0, gamma, 0.0))
+
+    # function defined for the SEIR model(mitigation) differential equations, the mitigation factor 'u' scales the contact rate
+    @staticmethod
+    def seirm_model(state, t, u, N, alpha, beta, gamma):
+        return Model_Kernels.seir_model(state, t, N, alpha, (1 - u) * beta, gamma)
+
+    # function defined for the jacobian of the SEIR model(mitigation)
+    @staticmethod
+    def seirm_jacobian(state, t, u, N, alpha, beta, gamma):
+        return Model_Kernels.seir_jacobian(state, t, N, alpha, (1 - u) * beta, gamma)
+
+    # function defined for the age-structured SEIR model differential equations, the state holds S, E, I and R of all K age bands one compartment after the other
+    # 'N' holds the population of every age band and 'contacts' is the K x K matrix of the daily contacts a person of age band i has with age band j(Refer 'age_structured.py')
+    @staticmethod
+    def age_seir_model(state, t, N, alpha, beta, gamma, contacts):
+        S, E, I, R = state.reshape(4, -1) # R is accessed during runtime
+        infection = beta * S * (contacts @ (I / N))
+        onset = alpha * E
+        recovery = gamma * I
+        # change in S, E, I and R population of every age band over time
+        return np.concatenate((-infection, infection - onset, onset - recovery, recovery))
+
+    # function defined for the jacobian of the age-structured SEIR model, the blocks hold the derivatives of every compartment with respect to S, E, I and R of all age bands
+    @staticmethod
+    def age_seir_jacobian(state, t, N, alpha, beta, gamma, contacts):
+        S, E, I, R = state.reshape(4, -1)
+        K = len(S)
+        zero = np.zeros((K, K))
+        identity = np.eye(K)
+        dS = np.diag(beta * (contacts @ (I / N)))
+        dI = beta * S[:, None] * contacts / N[None, :]
+        return np.block([[-dS, zero, -dI, zero],
+                        [dS, -alpha * identity, dI, zero],
+                        [zero, alpha * identity, -gamma * identity, zero],
+                        [zero, zero, gamma * identity, zero]])
+
+
+# model functions and jacobians by model name
+KERNELS = {
+    'sir': (Model_Kernels.sir_model, Model_Kernels.sir_jacobian),
+    'sird': (Model_Kernels.sird_model, Model_Kernels.sird_jacobian),
+    'seir': (Model_Kernels.seir_model, Model_Kernels.seir_jacobian),
+    'seirm': (Model_Kernels.seirm_model, Model_Kernels.seirm_jacobian),
+    }
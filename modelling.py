@@ -7,17 +7,79 @@
 ###### NECESSARY IMPORTS ######
 import streamlit as st
 import pandas as pd
-#import numpy as np
+import numpy as np
 import requests
 import io
+import os
+import csv
 import json
+import hashlib
+import contextlib
 #import time
-from population import Population_Data # importing population data
+from concurrent.futures import ThreadPoolExecutor
+from population import Population_Data, POPULATION_REFRESH # importing population data
+from country_registry import country_registry # importing the registry of the country names
+from snapshot_cache import Snapshot_Cache # importing the on-disk snapshot cache
+from time_series_cube import Time_Series_Cube # importing the time series cube
+from data_store import Data_Store # importing the columnar store shared by all processes
+from data_refresher import Data_Refresher, Dataset # importing the background refresher of the datasets
+from shared_dataset import Shared_Dataset # importing the read-only dataset shared by all sessions
+from model_kernels import Model_Kernels # importing the model differential equations
+from calibration import Model_Calibration # importing the model calibration
+from solve_cache import solve_cache # importing the cache of model solves shared by all sessions
+from trajectory_tables import trajectory_tables # importing the precomputed trajectories of the default initial conditions
+from plot_render import plot_renderer # importing the renderer of the model plots shared by all sessions
+from model_frames import Model_Frames, FRAME_PARAMETERS # importing the interactive plots of the model pages
+from metapopulation import Metapopulation # importing the metapopulation model of all countries
+from age_structured import Age_Structured_SEIR # importing the age-structured SEIR model
+from instrumentation import metrics # importing the timing instrumentation shared by all sessions
+from profiler import rerun_profiler # importing the opt-in profiler of the page reruns
+from mitigation_schedule import Mitigation_Schedules, Mitigation_Schedule, Change, Trigger # importing the mitigation schedules of the SEIR(MITIGATION) model
 
 # assigning class to a variable
 global population_data
 population_data = Population_Data
 
+# all raw datasets are read through the on-disk snapshot cache therefore a rerun of the application reads a local file instead of downloading the dataset again - Refer 'snapshot_cache.py'
+global snapshot_cache
+snapshot_cache = Snapshot_Cache()
+
+# cleaned datasets are written to the columnar store once per data version and opened memory-mapped by every process - Refer 'data_store.py'
+global data_store
+data_store = Data_Store()
+
+# the latest time series cube built by 'Modelling.time_series_cube', shared by every rerun in the process
+global cube_cache
+cube_cache = {}
+
+# file name and upstream url of the country dataset
+COUNTRY_SOURCE = ('cases_country.csv', 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/web-data/data/cases_country.csv')
+
+# columns of the country dataset read by the application and their types, the counts are read as nullable integers as the upstream dataset leaves some of them empty(the empty counts become 0 as before)
+# the remaining columns(UID, People_Tested and People_Hospitalized, the last two are always empty) are not read
+COUNTRY_DTYPES = {'Country_Region': str, 'Last_Update': str, 'Lat': 'float32', 'Long_': 'float32',
+                  'Confirmed': 'UInt32', 'Deaths': 'UInt32', 'Recovered': 'UInt32', 'Active': 'Int32',
+                  'Incident_Rate': 'float32', 'Mortality_Rate': 'float32', 'ISO3': str}
+COUNTRY_COUNTS = {'Confirmed': 'uint32', 'Deaths': 'uint32', 'Recovered': 'uint32', 'Active': 'int32'}
+
+# file names and upstream urls of the time series datasets
+TIME_SERIES_URL = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/'
+TIME_SERIES_SOURCES = {
+    'confirmed': ('time_series_covid19_confirmed_global.csv', TIME_SERIES_URL + 'time_series_covid19_confirmed_global.csv'),
+    'recovered': ('time_series_covid19_recovered_global.csv', TIME_SERIES_URL + 'time_series_covid19_recovered_global.csv'),
+    'deaths': ('time_series_covid19_deaths_global.csv', TIME_SERIES_URL + 'time_series_covid19_deaths_global.csv'),
+    }
+
+# number of the most recent dates of the previous cube which are cleaned again on every update as the upstream datasets may still revise them, the dates before are copied from the previous cube
+CUBE_REVISION_DAYS = int(os.environ.get('EPIDEMOS_CUBE_REVISION_DAYS', 14))
+
+# memory budget of the datasets held by a process in megabytes(default is 0, no budget), a refresh whose datasets exceed the budget fails and the previous version is kept - Refer 'Modelling.memory_report'
+MEMORY_BUDGET_MB = float(os.environ.get('EPIDEMOS_MEMORY_BUDGET_MB', 0))
+
+# the datasets used by the pages are fetched and cleaned in the background and the pages read the latest ready version - Refer 'data_refresher.py'
+global data_refresher
+data_refresher = Data_Refresher(lambda max_age: Modelling.load_datasets(max_age))
+
 class Modelling: 
 
     # function defined for sidebar menu animation
@@ -64,47 +126,84 @@ class Modelling:
 
     # function defined for cleaning the dataset - cases_country.csv
     # FIRST DATA FRAME(COUNTRY DATA)
+    # the cleaned dataset is taken from the latest version loaded by the background refresher - Refer 'Modelling.load_datasets'
+    # the returned frame shares the read-only arrays of the version used by every session(Refer 'shared_dataset.py')
     @staticmethod
     #@st.cache(show_spinner = False, ttl = 60)
     def country_clean():
-        url = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/web-data/data/cases_country.csv'
-        country_content = requests.get(url).content
-        country_data = pd.read_csv(io.StringIO(country_content.decode('utf-8')))
-        country_data = country_data.rename(columns={'Country_Region': 'Country', 'Long_': 'lon', 'Lat': 'lat'})
-        country_data = country_data[(country_data.Country != 'Diamond Princess') & (country_data.Country != 'MS Zaandam') & (country_data.Country != 'Summer Olympics 2020')]
-        country_data = country_data.drop('ISO3', axis=1)
-        country_data[['lon', 'lat']] = country_data[['lon', 'lat']].apply(pd.to_numeric)
-        country_data = country_data.fillna(0)
-        country_data['Country'] = country_data['Country'].replace('Taiwan*', 'Taiwan')
-        country_data['Country'] = country_data['Country'].replace('Korea, South', 'Korea (South)')
-        country_data['Country'] = country_data['Country'].replace('US', 'United States')
-        country_data['Country'] = country_data['Country'].apply(str)
-        country_data = country_data.sort_values(by = ['Country'])
-        country_data = country_data.reset_index(drop=True)
-        country_population_data = population_data.population_list()
-        country_data = pd.concat([country_data, country_population_data], axis=1)
-       
+        country_data = data_refresher.dataset().shared.frame('country')
+
         return country_data
 
+    # function defined to fetch and clean the dataset - cases_country.csv, 'max_age' is passed to the snapshot cache(Refer 'Snapshot_Cache.fetch') and the dataset is only fetched when 'country_snapshot' is not given
+    @staticmethod
+    def load_country_data(max_age = None, country_snapshot = None):
+        if country_snapshot is None:
+            country_snapshot = snapshot_cache.fetch(*COUNTRY_SOURCE, max_age = max_age)
+
+        # the cleaned dataset(including the population values) is taken from the shared store when another process has already cleaned this version of the dataset and of the population values
+        version = '{}-{}'.format(country_snapshot.version, population_data.population_version())
+        country_data = data_store.open_table('country', version)
+        metrics.count('store', country_data is not None)
+        if country_data is not None:
+            return country_data, country_snapshot
+
+        # the dataset is read with narrow types(32 bit counts and coordinates) instead of the 64 bit types pandas infers
+        with metrics.span('parse', 'cases_country.csv'):
+            country_data = pd.read_csv(io.BytesIO(country_snapshot.content), usecols = list(COUNTRY_DTYPES), dtype = COUNTRY_DTYPES)
+        with metrics.span('clean', 'cases_country.csv'):
+            country_data = country_data.rename(columns={'Country_Region': 'Country', 'Long_': 'lon', 'Lat': 'lat'})
+            # the cruise ships and the Summer Olympics are removed and the names are replaced by the names of the application - Refer 'country_registry.py'
+            country_data = country_registry.normalize(country_data, source = 'cases_country.csv')
+            country_data = country_data.fillna(0)
+            country_data = country_data.astype(COUNTRY_COUNTS)
+            country_data['Country'] = country_data['Country'].astype(str)
+            country_data = country_data.sort_values(by = ['Country'])
+            country_data = country_data.reset_index(drop=True)
+            # the population values are joined by the ISO3 code of the countries in the registry, countries without a population value receive 0
+            country_population_data = population_data.population_list()
+            country_data['Population'] = country_population_data.reindex(country_registry.iso3(country_data['Country'])).fillna(0).astype('uint32').values
+            country_data = country_data.drop('ISO3', axis=1)
+            # the names and the update times are kept as categorical columns, the text is stored once with a small integer code per row(the update time is the same for most countries)
+            country_data['Country'] = country_data['Country'].astype('category')
+            country_data['Last_Update'] = country_data['Last_Update'].astype(str).astype('category')
+        data_store.write_table('country', country_data, version)
+       
+        return country_data, country_snapshot
+
     ################# delete columns based on their index number between the columns (8/5/21) containing zero values and the columns related to the recent day's data 
     ################# and download the recent data using the file downloader
 
+    # function defined for cleaning the time series datasets, all three time series datasets share the same layout therefore the same cleaning steps are applied
+    # the coordinates are not read and the counts of the date columns are read as 32 bit integers(the same type as the time series cube), a dataset with empty counts is read again with the types pandas infers
+    @staticmethod
+    def clean_time_series(content, source = 'time series'):
+        columns = Modelling.time_series_header(content)
+        usecols = [column for column in columns if column not in ('Lat', 'Long')]
+        dtype = dict.fromkeys(columns[4:], Time_Series_Cube.DTYPE)
+        dtype.update({'Province/State': str, 'Country/Region': str})
+        with metrics.span('parse', source):
+            try:
+                time_series_data = pd.read_csv(io.BytesIO(content), usecols = usecols, dtype = dtype)
+            except ValueError:
+                time_series_data = pd.read_csv(io.BytesIO(content), usecols = usecols)
+        with metrics.span('clean', source):
+            time_series_data = time_series_data.rename(columns={'Country/Region': 'Country'})
+            # the cruise ships and the Summer Olympics are removed and the names are replaced by the names of the application - Refer 'country_registry.py'
+            time_series_data = country_registry.normalize(time_series_data, source = source)
+            time_series_data = time_series_data.reset_index(drop=True)
+            time_series_data = time_series_data.drop(['Province/State'], axis=1)
+            time_series_data = time_series_data.groupby(['Country']).sum().reset_index()
+
+        return time_series_data
+
     # function defined for cleaning the dataset - time_series_covid19_confirmed_global.csv
     # SECOND DATA FRAME(INFECTED POPULATION DATA)
+    # the cleaned dataset is taken from the time series cube which is updated incrementally - Refer 'Modelling.time_series_cube'
     @staticmethod
     #@st.cache(show_spinner = False)
     def infected_clean():
-        url = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_confirmed_global.csv'
-        infected_content = requests.get(url).content
-        infected_data = pd.read_csv(io.StringIO(infected_content.decode('utf-8')))
-        infected_data = infected_data.rename(columns={'Country/Region': 'Country'})
-        infected_data = infected_data[(infected_data.Country != 'Diamond Princess') & (infected_data.Country != 'MS Zaandam') & (infected_data.Country != 'Summer Olympics 2020')]
-        infected_data = infected_data.reset_index(drop=True)
-        infected_data = infected_data.drop(['Province/State','Lat', 'Long'], axis=1)
-        infected_data['Country'] = infected_data['Country'].replace('Taiwan*', 'Taiwan')
-        infected_data['Country'] = infected_data['Country'].replace('Korea, South', 'Korea (South)')
-        infected_data['Country'] = infected_data['Country'].replace('US', 'United States')
-        infected_data = infected_data.groupby(['Country']).sum().reset_index()
+        infected_data = Modelling.time_series_cube().frame('confirmed')
 
         return infected_data
 
@@ -113,17 +212,7 @@ class Modelling:
     @staticmethod
     #@st.cache(show_spinner = False)
     def recovered_clean():
-        url = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_recovered_global.csv'
-        recovered_content = requests.get(url).content
-        recovered_data = pd.read_csv(io.StringIO(recovered_content.decode('utf-8')))
-        recovered_data = recovered_data.rename(columns={'Country/Region': 'Country'})
-        recovered_data = recovered_data[(recovered_data.Country != 'Diamond Princess') & (recovered_data.Country != 'MS Zaandam') & (recovered_data.Country != 'Summer Olympics 2020')]
-        recovered_data = recovered_data.reset_index(drop=True)
-        recovered_data = recovered_data.drop(['Province/State','Lat', 'Long'], axis=1)
-        recovered_data['Country'] = recovered_data['Country'].replace('Taiwan*', 'Taiwan')
-        recovered_data['Country'] = recovered_data['Country'].replace('Korea, South', 'Korea (South)')
-        recovered_data['Country'] = recovered_data['Country'].replace('US', 'United States')
-        recovered_data = recovered_data.groupby(['Country']).sum().reset_index()
+        recovered_data = Modelling.time_series_cube().frame('recovered')
 
         return recovered_data
 
@@ -132,86 +221,315 @@ class Modelling:
     @staticmethod
     #@st.cache(show_spinner = False)
     def deceased_clean():
-        url = 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data/csse_covid_19_time_series/time_series_covid19_deaths_global.csv'
-        deceased_content = requests.get(url).content
-        deceased_data = pd.read_csv(io.StringIO(deceased_content.decode('utf-8')))
-        deceased_data = deceased_data.rename(columns={'Country/Region': 'Country'})
-        deceased_data = deceased_data[(deceased_data.Country != 'Diamond Princess') & (deceased_data.Country != 'MS Zaandam') & (deceased_data.Country != 'Summer Olympics 2020')]
-        deceased_data = deceased_data.reset_index(drop=True)
-        deceased_data = deceased_data.drop(['Province/State','Lat', 'Long'], axis=1)
-        deceased_data['Country'] = deceased_data['Country'].replace('Taiwan*', 'Taiwan')
-        deceased_data['Country'] = deceased_data['Country'].replace('Korea, South', 'Korea (South)')
-        deceased_data['Country'] = deceased_data['Country'].replace('US', 'United States')
-        deceased_data = deceased_data.groupby(['Country']).sum().reset_index()
+        deceased_data = Modelling.time_series_cube().frame('deaths')
 
         return deceased_data
 
+    # function defined to return the confirmed, recovered and deceased datasets as a single cube(countries x dates x metrics) - Refer 'time_series_cube.py'
+    # the cube is taken from the latest version loaded by the background refresher - Refer 'Modelling.load_datasets'
+    @staticmethod
+    def time_series_cube():
+        cube = data_refresher.dataset().cube
+
+        return cube
+
+    # function defined to return the read-only dataset of the latest version shared by every session, the pages take the countries, the population and the series of a country from it without copying - Refer 'shared_dataset.py'
+    @staticmethod
+    def shared_dataset():
+        return data_refresher.dataset().shared
+
+    # function defined to fetch the confirmed, recovered and deceased datasets and load them into the time series cube, 'max_age' is passed to the snapshot cache(Refer 'Snapshot_Cache.fetch') and the datasets are only fetched when 'snapshots' is not given
+    # the cube is built once per data version(the combined version of the three snapshots) and reused by every refresh until one of the datasets changes
+    # a new data version is built from the previous cube(of this process or the latest cube of the shared store) by cleaning only the revision window and the new dates, the whole datasets are only cleaned when there is no previous cube or the update cannot be appended(Refer 'Time_Series_Cube.extend')
+    @staticmethod
+    def load_time_series_cube(max_age = None, snapshots = None):
+        if snapshots is None:
+            fetched = snapshot_cache.fetch_all([TIME_SERIES_SOURCES[metric] for metric in Time_Series_Cube.METRICS], max_age)
+            snapshots = {metric: fetched[TIME_SERIES_SOURCES[metric][0]] for metric in Time_Series_Cube.METRICS}
+        version = hashlib.sha1(''.join(snapshots[metric].version for metric in Time_Series_Cube.METRICS).encode('utf-8')).hexdigest()
+
+        cube = cube_cache.get('cube')
+        metrics.count('cube', cube is not None and cube.version == version)
+        if cube is None or cube.version != version:
+            # a cube written to the shared store by another process is opened memory-mapped, otherwise the cube is updated or built and written to the store
+            previous = cube
+            cube = data_store.open_cube(version)
+            metrics.count('store', cube is not None)
+            if cube is None:
+                previous = previous if previous is not None else data_store.latest_cube()
+                if previous is not None:
+                    with metrics.span('build', 'time_series_cube(update)'):
+                        cube = Modelling.update_time_series_cube(previous, snapshots, version)
+                if cube is None:
+                    with metrics.span('build', 'time_series_cube(full)'):
+                        frames = {metric: Modelling.clean_time_series(snapshots[metric].content, TIME_SERIES_SOURCES[metric][0]) for metric in Time_Series_Cube.METRICS}
+                        cube = Time_Series_Cube.from_frames(frames, version)
+                # the digests checked by the next update
+                cube.history = Modelling.time_series_history(snapshots, len(cube.dates))
+                data_store.write_cube(cube)
+                # the written cube is opened memory-mapped so the process does not keep a private copy of the counts
+                stored = data_store.open_cube(version)
+                cube = stored if stored is not None else cube
+            cube_cache['cube'] = cube
+
+        return cube, snapshots
+
+    # function defined to fetch and clean all datasets used by the pages, it is called by the background refresher on its schedule - Refer 'data_refresher.py'
+    # all datasets are fetched at the same time over the pooled session of the snapshot cache(along with the population values when enabled) and cleaned once every download has finished, so the country dataset of this refresh already holds the refreshed population values
+    @staticmethod
+    def load_datasets(max_age = None):
+        sources = {}
+        refresh_population = POPULATION_REFRESH and max_age == 0
+        with ThreadPoolExecutor(max_workers = 1) if refresh_population else contextlib.nullcontext() as pool:
+            population = pool.submit(population_data.refresh, snapshot_cache.session) if refresh_population else None
+            fetched = snapshot_cache.fetch_all([COUNTRY_SOURCE] + [TIME_SERIES_SOURCES[metric] for metric in Time_Series_Cube.METRICS], max_age)
+            if population is not None:
+                sources['population'] = 'downloaded' if population.result() is not None else 'stale'
+
+        country_data, country_snapshot = Modelling.load_country_data(max_age, fetched[COUNTRY_SOURCE[0]])
+        cube, snapshots = Modelling.load_time_series_cube(max_age, {metric: fetched[TIME_SERIES_SOURCES[metric][0]] for metric in Time_Series_Cube.METRICS})
+
+        snapshots = [country_snapshot] + [snapshots[metric] for metric in Time_Series_Cube.METRICS]
+        sources.update((snapshot.name, snapshot.status) for snapshot in snapshots)
+        version = '{}-{}'.format(country_snapshot.version, cube.version)
+
+        dataset = Dataset(version = version, country = country_data, cube = cube,
+                          checked_at = min(snapshot.checked_at for snapshot in snapshots), sources = sources,
+                          shared = Shared_Dataset(version, country_data, cube))
+
+        # a version exceeding the memory budget is not swapped in, the refresher keeps the previous version and reports the error
+        if MEMORY_BUDGET_MB > 0:
+            report = Modelling.memory_report(dataset)
+            private = report.loc[~report['Mapped'], 'Bytes'].sum()
+            if private > MEMORY_BUDGET_MB * 1024 * 1024:
+                raise MemoryError('The datasets use {:.1f}MB, more than the memory budget of {:.1f}MB'.format(private / 1024 / 1024, MEMORY_BUDGET_MB))
+
+        return dataset
+
+    # function defined to return the memory used by every dataset of a version(default is the version used by the pages)
+    # 'Mapped' marks the datasets opened memory-mapped from the shared store, their memory is held once by the page cache of the operating system for all processes and does not count towards the memory budget of a process
+    @staticmethod
+    def memory_report(dataset = None):
+        dataset = dataset if dataset is not None else data_refresher.dataset()
+        cube_usage = dataset.cube.memory_usage()
+        population = population_data.population_table().data
+
+        rows = [('country', len(dataset.country), dataset.country.shape[1], int(dataset.country.memory_usage(index = True, deep = True).sum()), False),
+                ('time series cube', len(dataset.cube), len(dataset.cube.dates) * len(Time_Series_Cube.METRICS), cube_usage['data'], isinstance(dataset.cube.data, np.memmap)),
+                ('population', len(population), population.shape[1], int(population.memory_usage(index = True, deep = True).sum()), False)]
+
+        return pd.DataFrame(rows, columns = ['Dataset', 'Rows', 'Columns', 'Bytes', 'Mapped'])
+
+    # function defined to return the age of the datasets used by the pages and the outcome of the last refresh, the refresher is started when it is not running yet
+    @staticmethod
+    def data_status():
+        data_refresher.start()
+
+        return data_refresher.age(), data_refresher.status
+
+    # function defined to build a new version of the time series cube from the previous version, only the date columns of the revision window and the new dates are cleaned
+    # None is returned when the dates of the datasets do not continue the dates of the previous cube
+    # None is also returned when the values before the revision window were revised upstream, that is when the lines before the window do not match the digests of the previous cube(a previous cube without digests cannot be checked and is not updated)
+    @staticmethod
+    def update_time_series_cube(previous, snapshots, version):
+        # the dates before the revision window have to be the same as the dates of the previous cube, the upstream datasets add one date column per day therefore the first date and the last date before the window are compared
+        start = max(0, len(previous.dates) - CUBE_REVISION_DAYS)
+        if not previous.history or previous.history['start'] != start:
+            return None
+        frames = {}
+        for metric in Time_Series_Cube.METRICS:
+            content = snapshots[metric].content
+            columns = Modelling.time_series_header(content)[4:]
+            if len(columns) <= start or len(columns) < len(previous.dates):
+                return None
+            try:
+                anchors = pd.to_datetime([columns[0], columns[start - 1]] if start else [], format = '%m/%d/%y')
+            except ValueError:
+                return None
+            if start and not anchors.equals(previous.dates[[0, start - 1]]):
+                return None
+
+            history = hashlib.sha1()
+            tail = Modelling.time_series_tail(content, len(columns) - start, history)
+            # the history is counted as a hit when the lines before the window are unchanged and as a miss when they were revised upstream
+            unchanged = history.hexdigest() == previous.history['digests'][metric]
+            metrics.count('cube_history', unchanged)
+            if not unchanged:
+                return None
+
+            frames[metric] = Modelling.clean_time_series(tail, TIME_SERIES_SOURCES[metric][0])
+
+        return previous.extend(frames, version)
+
+    # function defined to return the history of a cube of 'dates' dates, the digests of the lines of every dataset before the revision window of the next update(the location columns and the dates before the window)
+    @staticmethod
+    def time_series_history(snapshots, dates):
+        start = max(0, dates - CUBE_REVISION_DAYS)
+        digests = {}
+        for metric in Time_Series_Cube.METRICS:
+            content = snapshots[metric].content
+            count = len(Modelling.time_series_header(content)) - 4 - start
+            history = hashlib.sha1()
+            for line in content.splitlines():
+                if line:
+                    history.update(line.rsplit(b',', count)[0] + b'\n')
+            digests[metric] = history.hexdigest()
+
+        return {'start': start, 'digests': digests}
+
+    # function defined to return the column names of a time series dataset
+    @staticmethod
+    def time_series_header(content):
+        return next(csv.reader([content.split(b'\n', 1)[0].decode('utf-8').rstrip('\r')]))
+
+    # function defined to cut a time series dataset down to the location columns(Province/State, Country/Region, Lat and Long) and the last 'count' date columns
+    # only the location columns can hold quoted commas, therefore the date columns are split off the end of every line and the cost does not depend on the number of dates before them
+    # 'history' is a hashlib digest updated with the part of every line before the last 'count' date columns(Refer 'Modelling.time_series_history')
+    @staticmethod
+    def time_series_tail(content, count, history = None):
+        lines = []
+        for line in content.splitlines():
+            if not line:
+                continue
+            # the end of the fourth column, commas inside quotes are skipped
+            if b'"' in line:
+                quoted = False
+                commas = 0
+                for end, character in enumerate(line):
+                    if character == 34: # '"'
+                        quoted = not quoted
+                    elif character == 44 and not quoted: # ','
+                        commas += 1
+                        if commas == 4:
+                            break
+            else:
+                end = len(b','.join(line.split(b',', 4)[:4]))
+            parts = line.rsplit(b',', count)
+            if history is not None:
+                history.update(parts[0] + b'\n')
+            lines.append(line[:end] + b',' + b','.join(parts[1:]))
+
+        return b'\n'.join(lines)
+
+    ###### INSTRUMENTATION ######
+
+    # function defined to time a block of code of the pages as a span of 'stage' - Refer 'instrumentation.py'
+    @staticmethod
+    def span(stage, name = ''):
+        return metrics.span(stage, name)
+
+    # function defined to record the duration of a rerun of a page and export the metrics
+    @staticmethod
+    def rerun_finished(page, seconds):
+        metrics.observe('rerun', seconds, page)
+        metrics.export()
+
+    # function defined to return the timings of the stages and the hit rates of the caches as tables along with the Prometheus text of the metrics
+    @staticmethod
+    def performance_report():
+        stages = pd.DataFrame(metrics.stages(), columns = ['stage', 'name', 'count', 'total_ms', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms'])
+        caches = pd.DataFrame(metrics.caches(), columns = ['cache', 'hits', 'misses', 'hit_rate'])
+
+        return stages, caches, metrics.prometheus()
+
+    # function defined to remove the timings and the counts recorded so far
+    @staticmethod
+    def clear_metrics():
+        metrics.clear()
+
+    # function defined to start profiling the rerun when the environment or the query parameters of the url ask for it - Refer 'profiler.py'
+    @staticmethod
+    def start_profile(query_params):
+        return rerun_profiler.start(query_params)
+
+    # function defined to write the profile of the rerun of 'page', returns the path of the profile(None when the rerun was not profiled)
+    @staticmethod
+    def finish_profile(page):
+        return rerun_profiler.finish(page)
+
     ###### MODEL FUNCTIONS ######
 
-    # the sir model function is referred from the given site and has been modified for this application and three additional models were designed by keeping the defined sir model function as a foundational model - Refer https://scipython.com/book/chapter-8-scipy/additional-examples/the-sir-epidemic-model/
+    # the differential equations of the models and their jacobians are defined in 'model_kernels.py' without @st.cache as odeint calls them hundreds of times during a single solve
+
+    # function defined for the SIR model differential equations and its jacobian
+    sir_model = staticmethod(Model_Kernels.sir_model)
+    sir_jacobian = staticmethod(Model_Kernels.sir_jacobian)
+
+    # function defined for the SIRD model differential equations and its jacobian
+    sird_model = staticmethod(Model_Kernels.sird_model)
+    sird_jacobian = staticmethod(Model_Kernels.sird_jacobian)
+
+    # function defined for the SEIR model differential equations and its jacobian
+    seir_model = staticmethod(Model_Kernels.seir_model)
+    seir_jacobian = staticmethod(Model_Kernels.seir_jacobian)
+
+    # function defined for the SEIR model(mitigation) differential equations and its jacobian
+    seirm_model = staticmethod(Model_Kernels.seirm_model)
+    seirm_jacobian = staticmethod(Model_Kernels.seirm_jacobian)
 
-    # function defined for the SIR model differential equations
+    # function defined to solve a model('sir', 'sird', 'seir' or 'seirm') over 'day_value' days
+    # solves of the default initial conditions are read from the precomputed trajectory tables - Refer 'trajectory_tables.py', all other solves are taken from the cache shared by all sessions whenever the same controls were used before - Refer 'solve_cache.py'
     @staticmethod
-    @st.cache
-    def sir_model(state, t, N, beta, gamma):
-        S, I, R = state # R is accessed during runtime
-        # change in S population over time
-        dSdt = -beta * S * I / N
-        # change in I population over time
-        dIdt = beta * S * I / N - gamma * I
-        # change in R population over time
-        dRdt = gamma * I
+    def solve(model, initial_state, day_value, args):
+        if rerun_profiler.profiling():
+            rerun_profiler.note(model = model, days = day_value, population = int(sum(initial_state)),
+                                args = '-'.join('{:g}'.format(arg) for arg in args))
+        trajectory = trajectory_tables.lookup(model, initial_state, day_value, args)
+        metrics.count('trajectory_tables', trajectory is not None)
+        if trajectory is not None:
+            return trajectory
+
+        return solve_cache.solve(model, initial_state, day_value, args)
+
+    # function defined to fit the parameters of the SIR or SIR-D model to the covid-19 data of a country - Refer 'calibration.py'
+    @staticmethod
+    def auto_fit(model, observed, N, initial_state, initial_guess):
+        with metrics.span('fit', model):
+            return Model_Calibration.fit(model, observed, N, initial_state, initial_guess)
 
-        return dSdt, dIdt, dRdt
+    # function defined to draw the plot of a model page to PNG bytes, plots that have been drawn before are taken from the renderer's cache - Refer 'plot_render.py'
+    # 'lines' holds one (values, colour, line width, line style, label) tuple per line
+    @staticmethod
+    def model_plot(title, t, value, lines, comparison = False):
+        return plot_renderer.render(title, t, value, lines, comparison)
 
-    # function defined for the SIRD model differential equations
+    # function defined to return the interactive plot of a model page, 'explore' is the name of the slider whose values are shown as the frames of the plot - Refer 'model_frames.py'
     @staticmethod
-    @st.cache
-    def sird_model(state, t, N, beta, gamma, sigma):
-        S, I, R, D = state # R and D are accessed during runtime
-        # change in S population over time
-        dSdt = -beta * S * I / N
-        # change in I population over time
-        dIdt = beta * S * I / N - (gamma + sigma) * I
-        # change in R population over time
-        dRdt = gamma * I
-        # change in D population over time
-        dDdt = sigma * I
+    def model_frames(model, title, initial_state, day_value, args, explore, value):
+        parameter = {label: name for name, label in FRAME_PARAMETERS[model].items()}[explore]
 
-        return dSdt, dIdt, dRdt, dDdt
+        with metrics.span('frames', model):
+            return Model_Frames.figure(model, title, initial_state, day_value, args, parameter, value)
 
-    # function defined for the SEIR model differential equations
+    # function defined to return the countries of the country dataset with known coordinates and population, the countries of the metapopulation SEIR model
     @staticmethod
-    @st.cache
-    def seir_model(state, t, N, alpha, beta, gamma):
-        S, E, I, R = state # R is accessed during runtime
-        # change in S population over time
-        dSdt = -beta * S * I / N
-        # change in E population over Time
-        dEdt = beta * S * I / N - alpha * E
-        # change in I population over time
-        dIdt = alpha * E - gamma * I
-        # change in R population over time
-        dRdt = gamma * I
+    def metapopulation_data():
+        country_data = Modelling.country_clean()
 
-        return dSdt, dEdt, dIdt, dRdt
+        return country_data[(country_data['Population'] > 0) & ((country_data['lat'] != 0) | (country_data['lon'] != 0))]
 
-    # function defined for the SEIR model(mitigation) differential equations
+    # function defined to solve the metapopulation SEIR model for every country of 'metapopulation_data' - Refer 'metapopulation.py'
     @staticmethod
-    @st.cache
-    def seirm_model(state, t, u, N, alpha, beta, gamma):
-        S, E, I, R = state # R is accessed during runtime
-        # a mitigation factor 'u' is introduced and has been discussed in the main python file
-        # change in S population over time
-        dSdt = -(1-u) * beta * S * I / N
-        # change in E population over Time
-        dEdt = (1-u) * beta * S * I / N - alpha * E
-        # change in I population over time
-        dIdt = alpha * E - gamma * I
-        # change in R population over time
-        dRdt = gamma * I
-
-        return dSdt, dEdt, dIdt, dRdt
+    def metapopulation(seed_country, seed_infected, day_value, alpha, beta, gamma, mobility):
+        country_data = Modelling.metapopulation_data()
+
+        return Metapopulation.solve(country_data['Country'], country_data['lat'], country_data['lon'], country_data['Population'],
+                                    {seed_country: seed_infected}, day_value, alpha, beta, gamma, mobility)
+
+    # function defined to solve the age-structured SEIR model, 'N' and 'infected' are split between the age bands and 'u' is the mitigation control of every contact, of every age band or of every setting(Refer 'age_structured.py')
+    @staticmethod
+    def age_seir(N, infected, day_value, alpha, beta, gamma, u = 0.0):
+        return Age_Structured_SEIR.solve(N, infected, day_value, alpha, beta, gamma, u)
+
+    # function defined to build a mitigation schedule, 'changes' holds (day, control) or (day, control, ramp days) tuples and 'triggers' holds (infected population, control) or (infected population, control, rising) tuples(Refer 'mitigation_schedule.py')
+    @staticmethod
+    def mitigation_schedule(u, changes = (), triggers = ()):
+        return Mitigation_Schedule(u, tuple(Change(*change) for change in changes), tuple(Trigger(*trigger) for trigger in triggers))
+
+    # function defined to solve the SEIR(MITIGATION) model for many mitigation schedules at once, 'args' are the arguments of 'Modelling.solve' without the mitigation control
+    @staticmethod
+    def mitigation_schedules(initial_state, day_value, args, schedules):
+        return Mitigation_Schedules.solve(initial_state, day_value, *args, schedules)
 
     # function defined to calculate the model generated plot's 'y' values based on the population values therfore the graph adjusts to the population values entered
     @staticmethod
@@ -0,0 +1,215 @@
+# this python file consists of the rendering of the model plots shown by the model pages
+
+# the model pages used to build every matplotlib figure under the class-level lock of the "Agg" backend(RendererAgg.lock) and to draw it with 'st.pyplot', therefore every session of the process waited for the lock whenever another session was plotting. The plots are now drawn to PNG(or SVG) bytes which are cached and shown with 'st.image':
+# a plot is identified by everything that is drawn(title, data of every line and the y limit), the bytes of a plot that has already been drawn are returned without drawing or locking anything, sessions asking for a plot which is being drawn wait for the same drawing
+# plots that are not cached yet are drawn in a pool of worker processes, every worker has its own matplotlib therefore no lock is shared between sessions - Refer https://matplotlib.org/stable/users/faq/howto_faq.html#work-with-threads
+# without worker processes the plots are drawn in the application process under RendererAgg.lock as before(only when a plot is not cached)
+
+# the renderer can be configured using the following environment variables:
+# EPIDEMOS_RENDER_WORKERS - number of worker processes drawing the plots(default is 2, 0 draws the plots in the application process)
+# EPIDEMOS_RENDER_CACHE_MB - memory limit of the drawn plots(default is 32)
+
+# a pool whose worker processes were killed(for example by the out-of-memory killer) is shut down and started again on the next plot, after RENDER_POOL_RESTARTS restarts the plots are drawn in the application process
+
+###### NECESSARY IMPORTS ######
+import io
+import os
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg, RendererAgg
+from instrumentation import metrics
+
+RENDER_WORKERS = int(os.environ.get('EPIDEMOS_RENDER_WORKERS', 2))
+RENDER_CACHE_MB = float(os.environ.get('EPIDEMOS_RENDER_CACHE_MB', 32))
+RENDER_POOL_RESTARTS = 3
+
+# the same resolution as 'st.pyplot'(twice the default dpi of matplotlib for high dpi displays)
+DPI = 200
+
+
+class Plot_Renderer:
+
+    def __init__(self, workers = RENDER_WORKERS, max_bytes = RENDER_CACHE_MB * 1024 * 1024):
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._pending = {}
+        self._pool = None
+        self._restarts = 0
+        self._lock = threading.Lock()
+
+    # function defined to build the figure of a model plot, the same figure the model pages used to build
+    # 'lines' holds one (values, colour, line width, line style, label) tuple per line, comparison plots(model against Covid-19 data) have no bottom spine instead of a black frame
+    @staticmethod
+    def figure(title, t, value, lines, comparison = False):
+        fig = Figure()
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot(1,1,1, facecolor='w', axisbelow=True)
+        for values, colour, width, style, label in lines:
+            ax.plot(t, values, colour, alpha=1, lw=width, ls=style, label=label)
+        ax.set_title(label=title, loc='center', pad=15.0, fontsize=25)
+        ax.set_xlabel('Time in days')
+        ax.set_ylabel('Population in 1000s')
+        ax.set_ylim(0,value)
+        ax.minorticks_on()
+        ax.tick_params(axis='x', which='minor')
+        ax.grid(True, which='major', c='k', lw=0.2, ls='-')
+        fig.patch.set_facecolor('w')
+        fig.patch.set_alpha(0.7)
+        if comparison:
+            ax.spines['bottom'].set_visible(False)
+        else:
+            ax.patch.set_edgecolor('black')
+            ax.patch.set_linewidth(0.7)
+        legend = ax.legend()
+        legend.get_frame().set_alpha(1.0)
+
+        return fig
+
+    # function defined to draw a model plot to bytes, runs in the worker processes
+    @staticmethod
+    def draw(title, t, value, lines, comparison = False, image_format = 'png'):
+        fig = Plot_Renderer.figure(title, t, value, lines, comparison)
+        image = io.BytesIO()
+        fig.savefig(image, format = image_format, dpi = DPI, bbox_inches = 'tight')
+
+        return image.getvalue()
+
+    # function defined to build the key of a plot from everything that is drawn
+    @staticmethod
+    def key(title, t, value, lines, comparison, image_format):
+        digest = hashlib.sha1()
+        digest.update(repr((title, float(value), bool(comparison), image_format)).encode('utf-8'))
+        digest.update(np.ascontiguousarray(t, dtype = float).tobytes())
+        for values, colour, width, style, label in lines:
+            digest.update(repr((colour, width, style, label)).encode('utf-8'))
+            digest.update(np.ascontiguousarray(values, dtype = float).tobytes())
+
+        return digest.hexdigest()
+
+    # function defined to return the bytes of a model plot(the same arguments as 'figure'), the plot is only drawn when it is not cached
+    def render(self, title, t, value, lines, comparison = False, image_format = 'png'):
+        key = self.key(title, t, value, lines, comparison, image_format)
+
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+
+            # a plot which is being drawn for another session is not drawn again
+            future = self._pending.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._pending[key] = future
+
+        if owner:
+            try:
+                image = self._draw(title, t, value, lines, comparison, image_format)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                self.put(key, image)
+                future.set_result(image)
+            finally:
+                with self._lock:
+                    # the entries are cleared when the pool breaks, a new drawing of the same plot may already be pending
+                    if self._pending.get(key) is future:
+                        del self._pending[key]
+
+        return future.result()
+
+    def _draw(self, title, t, value, lines, comparison, image_format):
+        # the values are converted to plain float arrays so lists, pandas series and read-only trajectories are sent to the worker processes the same way
+        t = np.asarray(t, dtype = float)
+        lines = [(np.asarray(values, dtype = float), colour, width, style, label) for values, colour, width, style, label in lines]
+
+        pool = self._worker_pool()
+        if pool is not None:
+            try:
+                with metrics.span('draw', 'worker'):
+                    return pool.submit(Plot_Renderer.draw, title, t, value, lines, comparison, image_format).result()
+            except BrokenProcessPool:
+                # the worker processes could not be started or were killed, this plot is drawn in the application process and the pool is started again for the next plots
+                self._reset_pool(pool)
+
+        # the time spent waiting for the lock is part of the span
+        with metrics.span('draw', 'lock'), RendererAgg.lock:
+            return self.draw(title, t, value, lines, comparison, image_format)
+
+    # function defined to start the worker processes on first use, the workers are started with 'spawn' as the application process runs many threads
+    def _worker_pool(self):
+        if self.workers <= 0:
+            return None
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers = self.workers, mp_context = multiprocessing.get_context('spawn'))
+
+            return self._pool
+
+    # function defined to shut down a broken pool and forget the plots pending on it, the sessions waiting for those plots are answered by the sessions drawing them in the application process
+    def _reset_pool(self, pool):
+        with self._lock:
+            # another session already reset the broken pool
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self._pending.clear()
+            self._restarts += 1
+            if self._restarts > RENDER_POOL_RESTARTS:
+                self.workers = 0
+
+        try:
+            pool.shutdown(wait = False, cancel_futures = True)
+        except TypeError:
+            # 'cancel_futures' was added in python 3.9
+            pool.shutdown(wait = False)
+
+    # function defined to store the bytes of a plot, the least recently used plots are evicted until the memory limit is respected
+    def put(self, key, image):
+        with self._lock:
+            if key in self._entries or len(image) > self.max_bytes:
+                return
+
+            self._entries[key] = image
+            self.size_bytes += len(image)
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last = False)
+                self.size_bytes -= len(evicted)
+
+    # function defined to remove all cached plots
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    # function defined to return the counters of the renderer
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {'entries': len(self._entries),
+                    'size_bytes': self.size_bytes,
+                    'max_bytes': self.max_bytes,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_rate': self.hits / requests if requests else 0.0,
+                    'workers': self.workers}
+
+
+# the renderer shared by every session in the process
+plot_renderer = Plot_Renderer()
+metrics.collect('plot', plot_renderer.stats)
@@ -1,105 +1,107 @@
-# population data is taken from the following site - Refer https://www.worldometers.info/world-population/population-by-country/ 
-    
+# population data is taken from the following site - Refer https://www.worldometers.info/world-population/population-by-country/
+
+# the population values are bundled with the application('data/population.csv') and keyed by the ISO 3166-1 alpha-3 code of every country, the same code as the 'ISO3' column of cases_country.csv, therefore the populations are joined to the countries by their code and a country can never receive the population of another country(Refer 'Modelling.country_clean')
+# the bundled table is versioned, the version is part of the data version of the cleaned country dataset so a new table cleans the dataset again
+# the worldometers page can still be scraped in the background to refresh the bundled values, the page is only downloaded when the following environment variable is set:
+# EPIDEMOS_POPULATION_REFRESH - 1 refreshes the populations from worldometers on every refresh of the datasets by the background refresher(default is 0, the bundled values are used) - Refer 'data_refresher.py'
+
 ###### NECESSARY IMPORTS ######
+import os
+import hashlib
+import threading
+from collections import namedtuple
 import requests
 import pandas as pd
-import streamlit as st
+from country_registry import country_registry
+from instrumentation import metrics
+
+POPULATION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'population.csv')
+POPULATION_REFRESH = os.environ.get('EPIDEMOS_POPULATION_REFRESH', '0') == '1'
+POPULATION_URL = 'https://www.worldometers.info/world-population/population-by-country/'
+
+# version - version of the table(the bundled version or the digest of a refreshed table)
+# data - 'Country' and 'Population' of every country indexed by 'ISO3'
+Population_Table = namedtuple('Population_Table', ['version', 'data'])
+
+# the table used by every session of the process, replaced as a whole when a refresh completes
+population_table = None
+refresh_lock = threading.Lock()
+
 
 class Population_Data:
 
+    # function defined to return the population of every country indexed by its ISO3 code
     @staticmethod
-    @st.cache(show_spinner = False)
     def population_list():
- 
-        url = 'https://www.worldometers.info/world-population/population-by-country/'
-        page = requests.get(url)
-        #s = page.status_code
-        tables = pd.read_html(page.text)
-        country_population_data = tables[0]
-        country_population_data.drop(['#'], axis = 1, inplace = True)
-        country_population_data.drop(country_population_data.loc[:, 'Yearly Change': 'World Share'].columns, axis = 1, inplace = True)
-        country_population_data = country_population_data.rename(columns={'Country (or dependency)': 'Country', 'Population (2020)': 'Population'})
-
-        # adding unnecessary countries
-        country_list = [
-            'American Samoa', 
-            'Anguilla', 
-            'Aruba', 
-            'Bermuda', 
-            'British Virgin Islands', 
-            'Caribbean Netherlands', 
-            'Cayman Islands', 
-            'Channel Islands', 
-            'Cook Islands', 
-            'Curaçao', 
-            'DR Congo', 
-            'Faeroe Islands', 
-            'Falkland Islands', 
-            'French Guiana', 
-            'French Polynesia', 
-            'Gibraltar', 
-            'Greenland', 
-            'Guadeloupe', 
-            'Guam', 
-            'Hong Kong', 
-            'Isle of Man', 
-            'Macao', 
-            'Martinique', 
-            'Mayotte', 
-            'Montserrat', 
-            'Myanmar', 
-            'Nauru', 
-            'New Caledonia', 
-            'Niue', 
-            'North Korea', 
-            'Northern Mariana Islands', 
-            'Puerto Rico', 
-            'Réunion', 
-            'Saint Barthelemy', 
-            'Saint Helena', 
-            'Saint Martin', 
-            'Saint Pierre & Miquelon', 
-            'Sint Maarten', 
-            'Tokelau', 
-            'Tonga', 
-            'Turkmenistan', 
-            'Turks and Caicos', 
-            'Tuvalu', 
-            'U.S. Virgin Islands', 
-            'Wallis & Futuna', 
-            'Western Sahara'
-            ]     
-
-        # loop to remove the above mentioned countries
-        i = 0
-        while i < len(country_list):
-            country_population_data = country_population_data[(country_population_data.Country != country_list[i])]
-            i += 1
-
-        # renaming countries
-        country_population_data["Country"] = country_population_data["Country"].replace(
-            {"Côte d'Ivoire" : "Cote d'Ivoire", 
-            "South Korea" : "Korea (South)", 
-            "State of Palestine" : "West Bank and Gaza",
-            "St. Vincent & Grenadines" : "Saint Vincent and the Grenadines",
-            "US" : "United States",
-            "Congo" : "Congo (Brazzaville)",
-            "Czech Republic (Czechia)" : "Czechia",
-            "Saint Kitts & Nevis" : "Saint Kitts and Nevis",
-            "Sao Tome & Principe" : "Sao Tome and Principe"}
-            )
-
-        # adding missing countries
-        dict = {'Country': ['Burma', 'Kosovo', 'Congo (Kinshasa)'],
-                'Population': [54409800, 1767881, 86790567]
-                }
-
-        new_countries = pd.DataFrame(dict)
-        country_population_data = pd.concat([country_population_data, new_countries], ignore_index = True)
-        country_population_data.sort_values(by = ['Country'], inplace=True)
-        country_population_data = country_population_data.reset_index(drop=True)
-
-        # selecting only population values
-        country_population_data = country_population_data['Population']
-
-        return country_population_data
+        return Population_Data.population_table().data['Population']
+
+    # function defined to return the version of the population values returned by 'population_list'
+    @staticmethod
+    def population_version():
+        return Population_Data.population_table().version
+
+    # function defined to return the population table, the bundled table is read on first use
+    @staticmethod
+    def population_table():
+        global population_table
+
+        with refresh_lock:
+            if population_table is None:
+                population_table = Population_Data.load_population_table()
+
+            return population_table
+
+    # function defined to read the bundled population table, the version is given by the '# version:' line of the file
+    @staticmethod
+    def load_population_table(path = POPULATION_FILE):
+        version = None
+        with open(path, 'r', encoding = 'utf-8') as f:
+            for line in f:
+                if not line.startswith('#'):
+                    break
+                if line.startswith('# version:'):
+                    version = line.split(':', 1)[1].strip()
+
+        with metrics.span('parse', 'population.csv'):
+            data = pd.read_csv(path, comment = '#', keep_default_na = False, dtype = {'ISO3': str, 'Country': str, 'Population': 'int64'})
+
+        return Population_Table(version = version, data = data.set_index('ISO3'))
+
+    # function defined to download the worldometers page and replace the population table by the refreshed values, the bundled values are kept when the download or the parsing fails
+    # 'session' is the pooled HTTP session of the snapshot cache when the page is downloaded along with the datasets(Refer 'snapshot_cache.py')
+    @staticmethod
+    def refresh(session = None):
+        global population_table
+
+        try:
+            with metrics.span('fetch', 'population'):
+                page = (session or requests).get(POPULATION_URL, timeout = 30)
+                page.raise_for_status()
+            with metrics.span('parse', 'population'):
+                scraped = Population_Data.parse_population_table(page.text)
+        except Exception:
+            return None
+
+        with refresh_lock:
+            if population_table is None:
+                population_table = Population_Data.load_population_table()
+            data = population_table.data.copy()
+            data.loc[scraped.index, 'Population'] = scraped.values
+            version = 'worldometers-' + hashlib.sha1(data['Population'].values.tobytes()).hexdigest()[:12]
+            population_table = Population_Table(version = version, data = data)
+
+            return population_table
+
+    # function defined to parse the population table of the worldometers page into the population of every country indexed by its ISO3 code
+    # the names of worldometers are matched to the countries by the registry, territories which are not countries of the JHU CSSE datasets are left out - Refer 'country_registry.py'
+    @staticmethod
+    def parse_population_table(page_text):
+        tables = pd.read_html(page_text)
+        country_population_data = tables[0].rename(columns={'Country (or dependency)': 'Country', 'Population (2020)': 'Population'})
+
+        codes = country_registry.iso3(country_population_data['Country'], source = 'worldometers')
+        matched = pd.notna(codes)
+        country_population_data = country_population_data[matched]
+
+        return pd.Series(country_population_data['Population'].values.astype('int64'),
+                         index = pd.Index(codes[matched], name = 'ISO3'), name = 'Population')
@@ -0,0 +1,116 @@
+# this python file consists of the opt-in profiler of a page rerun, a slow scenario reported by a user(for example a 730 day SEIR(MITIGATION) run at a large population) can be profiled by opening the page with '?profile=1' in the url
+# the rerun is run under cProfile and the profile is written to a file named after the time, the page and the parameters of the model solved in the rerun, the file can be read with pstats or a viewer such as snakeviz - Refer https://docs.python.org/3/library/profile.html
+# a summary of the functions taking the most cumulative time is written next to the profile so the slow path can be read without any viewer
+
+# cProfile only profiles the thread which enabled it, therefore every session profiles its own rerun and the background threads(the data refresher, the plot workers) are left out
+# when profiling is disabled no profiler is created and 'profiling' only checks a thread-local attribute, a rerun which is not profiled costs nothing more
+
+# the profiler can be configured using the following environment variables:
+# EPIDEMOS_PROFILE - 1 profiles every rerun of every page(default is 0, only the rerun opened with '?profile=1' is profiled, the parameter is then removed from the url - Refer 'epidemicModelling.py')
+# EPIDEMOS_PROFILE_DIR - directory the profiles are written to(default is '.profiles' next to this file)
+
+###### NECESSARY IMPORTS ######
+import os
+import re
+import io
+import time
+import pstats
+import cProfile
+import threading
+from collections import OrderedDict
+
+PROFILE_ALWAYS = os.environ.get('EPIDEMOS_PROFILE', '0') == '1'
+PROFILE_DIR = os.environ.get('EPIDEMOS_PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.profiles'))
+
+# number of functions listed in the summary written next to a profile
+SUMMARY_LINES = 40
+
+
+class Rerun_Profiler:
+
+    def __init__(self, directory = PROFILE_DIR, always = PROFILE_ALWAYS):
+        self.directory = directory
+        self.always = always
+        # the profile of the rerun running in the current thread and the parameters noted during the rerun
+        self._local = threading.local()
+
+    # function defined to return True when the rerun should be profiled, 'query_params' are the query parameters of the url of the page
+    def requested(self, query_params):
+        return self.always or query_params.get('profile', ['0'])[0] == '1'
+
+    # function defined to start profiling the rerun of the current thread, returns the profile or None when profiling is not requested
+    def start(self, query_params):
+        # a profile left running by a rerun which was stopped early is discarded
+        self.discard()
+        if not self.requested(query_params):
+            return None
+
+        profile = cProfile.Profile()
+        self._local.profile = profile
+        self._local.parameters = OrderedDict()
+        profile.enable()
+
+        return profile
+
+    # function defined to return True when the rerun of the current thread is being profiled
+    def profiling(self):
+        return getattr(self._local, 'profile', None) is not None
+
+    # function defined to note a parameter of the rerun being profiled(the model, the number of days, the population), the first value noted for a name is kept
+    def note(self, **parameters):
+        if not self.profiling():
+            return
+
+        for name, value in parameters.items():
+            self._local.parameters.setdefault(name, value)
+
+    # function defined to stop profiling the rerun and write the profile of 'page', returns the path of the profile(None when the rerun was not profiled)
+    def finish(self, page):
+        profile = getattr(self._local, 'profile', None)
+        if profile is None:
+            return None
+
+        profile.disable()
+        parameters = self._local.parameters
+        self._local.profile = None
+
+        os.makedirs(self.directory, exist_ok = True)
+        path = os.path.join(self.directory, Rerun_Profiler.file_name(page, parameters) + '.prof')
+        profile.dump_stats(path)
+
+        summary = io.StringIO()
+        summary.write('page: {}\n'.format(page))
+        for name, value in parameters.items():
+            summary.write('{}: {}\n'.format(name, value))
+        summary.write('\n')
+        pstats.Stats(profile, stream = summary).sort_stats('cumulative').print_stats(SUMMARY_LINES)
+        with open(path[:-len('.prof')] + '.txt', 'w') as f:
+            f.write(summary.getvalue())
+
+        return path
+
+    # function defined to stop profiling the rerun of the current thread without writing the profile
+    def discard(self):
+        profile = getattr(self._local, 'profile', None)
+        if profile is not None:
+            profile.disable()
+            self._local.profile = None
+
+    # function defined to return the name of a profile file, for example '20261018-101500-123_seir-model-mitigation_model-seirm_days-730_population-1000000'
+    @staticmethod
+    def file_name(page, parameters):
+        now = time.time()
+        parts = [time.strftime('%Y%m%d-%H%M%S', time.localtime(now)) + '-{:03d}'.format(int(now % 1 * 1000)), Rerun_Profiler.slug(page)]
+        for name, value in parameters.items():
+            parts.append(Rerun_Profiler.slug('{}-{}'.format(name, value)))
+
+        return '_'.join(part for part in parts if part)[:200]
+
+    # function defined to turn a page name or a parameter into a lower case file name part
+    @staticmethod
+    def slug(text):
+        return re.sub(r'[^a-z0-9.]+', '-', str(text).lower()).strip('-.')
+
+
+# the profiler shared by every session in the process
+rerun_profiler = Rerun_Profiler()
@@ -0,0 +1,176 @@
+# this python file consists of the command line scenario runner which solves many model scenarios without the streamlit application
+
+# using command prompt or terminal run "python scenario_runner.py scenarios.csv -o results.npz" from the same directory, "python scenario_runner.py --help" lists all options
+
+# every row of the scenario file(CSV, JSON or YAML) describes one scenario:
+# model - 'sir', 'sird', 'seir' or 'seirm'
+# parameters - the parameters of the model functions in 'modelling.py'(N, beta, gamma, sigma, alpha and u as required by the model)
+# initial conditions - the initial compartments(E, I, R and D as required by the model, missing compartments start at 0 and S defaults to N minus all other compartments)
+# days - number of days to solve(the same days as range(0, days) used by the application)
+# id - optional identifier of the scenario(the row number is used otherwise)
+
+# a JSON file holds a list of scenarios(or an object with the list under "scenarios"), a YAML file the same structure and requires PyYAML
+
+# the scenarios are grouped by model and number of days, split into chunks and every chunk is solved with the batch solver(Refer 'batch_solver.py') in a pool of worker processes
+# the trajectories are written in a columnar layout with one row per scenario and day: id, day and one column per compartment(compartments not used by a model are NaN)
+# the output format follows the file extension: '.npz'(one numpy array per column), '.parquet'(requires pyarrow) or '.csv'
+
+###### NECESSARY IMPORTS ######
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from batch_solver import Batch_Solver, MODELS
+
+# all compartments in the order of the output columns
+COMPARTMENTS = ('S', 'E', 'I', 'R', 'D')
+
+
+class Scenario_Runner:
+
+    # function defined to read a scenario file into a data frame with one row per scenario
+    @staticmethod
+    def read_scenarios(path):
+        extension = os.path.splitext(path)[1].lower()
+
+        if extension == '.csv':
+            scenarios = pd.read_csv(path)
+        elif extension in ('.json', '.yaml', '.yml'):
+            with open(path, 'r') as f:
+                if extension == '.json':
+                    rows = json.load(f)
+                else:
+                    try:
+                        import yaml
+                    except ImportError:
+                        raise ImportError('Reading YAML scenario files requires PyYAML(pip install pyyaml)')
+                    rows = yaml.safe_load(f)
+            if isinstance(rows, dict):
+                rows = rows.get('scenarios', [])
+            scenarios = pd.DataFrame(rows)
+        else:
+            raise ValueError('Unsupported scenario file {!r}, expected a .csv, .json, .yaml or .yml file'.format(path))
+
+        if 'id' not in scenarios.columns:
+            scenarios['id'] = np.arange(len(scenarios))
+
+        return scenarios
+
+    # function defined to check the scenarios and split them into chunks of the same model and number of days
+    # every chunk is a tuple (model, days, ids, initial states, parameters) which can be sent to a worker process
+    @staticmethod
+    def plan(scenarios, chunk_size):
+        for column in ('model', 'days', 'N'):
+            if column not in scenarios.columns:
+                raise ValueError('The scenario file has no {!r} column'.format(column))
+
+        unknown = sorted(set(scenarios['model']) - set(MODELS))
+        if unknown:
+            raise ValueError('Unknown models {}, expected one of {}'.format(', '.join(map(str, unknown)), ', '.join(MODELS)))
+
+        chunks = []
+        for (model, days), group in scenarios.groupby(['model', 'days'], sort = False):
+            compartments = MODELS[model]['compartments']
+            names = MODELS[model]['parameters']
+
+            missing = [name for name in names if name not in group.columns or group[name].isna().any()]
+            if missing:
+                raise ValueError('Scenarios of the {!r} model need the parameters {}'.format(model, ', '.join(missing)))
+
+            # compartments not given start at 0 and the susceptible population is the remaining population
+            initial = np.zeros((len(group), len(compartments)))
+            for i, compartment in enumerate(compartments[1:], start = 1):
+                if compartment in group.columns:
+                    initial[:, i] = group[compartment].fillna(0).to_numpy(dtype = float)
+            N = group['N'].to_numpy(dtype = float)
+            initial[:, 0] = N - initial[:, 1:].sum(axis = 1)
+            if 'S' in group.columns:
+                given = group['S'].to_numpy(dtype = float)
+                initial[:, 0] = np.where(np.isnan(given), initial[:, 0], given)
+
+            if (initial < 0).any():
+                raise ValueError('Scenarios of the {!r} model have initial compartments larger than N'.format(model))
+
+            ids = group['id'].to_numpy()
+            params = {name: group[name].to_numpy(dtype = float) for name in names}
+            for start in range(0, len(group), chunk_size):
+                stop = start + chunk_size
+                chunks.append((model, int(days), ids[start:stop], initial[start:stop], {name: values[start:stop] for name, values in params.items()}))
+
+        return chunks
+
+    # function defined to solve a chunk of scenarios and return its columns, runs in the worker processes
+    @staticmethod
+    def run_chunk(chunk, dtype = 'float32'):
+        model, days, ids, initial, params = chunk
+        result = Batch_Solver.solve(model, initial, np.arange(days), **params)
+        n = len(ids)
+
+        columns = {'id': np.repeat(ids, days),
+                   'day': np.tile(np.arange(days, dtype = np.int32), n)}
+        compartments = MODELS[model]['compartments']
+        for compartment in COMPARTMENTS:
+            if compartment in compartments:
+                columns[compartment] = result[:, :, compartments.index(compartment)].ravel().astype(dtype)
+            else:
+                columns[compartment] = np.full(n * days, np.nan, dtype = dtype)
+
+        return columns
+
+    # function defined to solve all scenarios of a scenario file and write the trajectories
+    @staticmethod
+    def run(scenario_path, output_path, workers = None, chunk_size = 256, dtype = 'float32'):
+        scenarios = Scenario_Runner.read_scenarios(scenario_path)
+        chunks = Scenario_Runner.plan(scenarios, chunk_size)
+
+        if workers == 1:
+            parts = [Scenario_Runner.run_chunk(chunk, dtype) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(max_workers = workers) as pool:
+                parts = list(pool.map(Scenario_Runner.run_chunk, chunks, [dtype] * len(chunks)))
+
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in ('id', 'day') + COMPARTMENTS} if parts else {}
+        Scenario_Runner.write(output_path, columns)
+
+        return len(scenarios)
+
+    # function defined to write the columns of the trajectories in the format given by the file extension
+    @staticmethod
+    def write(path, columns):
+        extension = os.path.splitext(path)[1].lower()
+
+        if extension == '.npz':
+            # text ids would be saved as an object array which 'np.load' only reads with 'allow_pickle = True', therefore they are saved as fixed-width unicode
+            columns = {name: values.astype(str) if values.dtype == object else values for name, values in columns.items()}
+            np.savez(path, **columns)
+        elif extension == '.parquet':
+            pd.DataFrame(columns).to_parquet(path, index = False)
+        elif extension == '.csv':
+            pd.DataFrame(columns).to_csv(path, index = False)
+        else:
+            raise ValueError('Unsupported output file {!r}, expected a .npz, .parquet or .csv file'.format(path))
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Solve the model scenarios of a CSV, JSON or YAML file without the streamlit application.')
+    parser.add_argument('scenarios', help = 'scenario file(.csv, .json, .yaml or .yml)')
+    parser.add_argument('-o', '--output', default = 'trajectories.npz', help = 'output file(.npz, .parquet or .csv), default is trajectories.npz')
+    parser.add_argument('-w', '--workers', type = int, default = None, help = 'number of worker processes, default is the number of CPUs')
+    parser.add_argument('--chunk-size', type = int, default = 256, help = 'number of scenarios solved together by a worker, default is 256')
+    parser.add_argument('--float64', action = 'store_true', help = 'write the compartments as 64-bit instead of 32-bit floats')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        count = Scenario_Runner.run(args.scenarios, args.output, args.workers, args.chunk_size, 'float64' if args.float64 else 'float32')
+    except (OSError, ValueError, ImportError) as e:
+        parser.error(str(e))
+
+    print('Solved {} scenarios in {:.1f}s, trajectories written to {}'.format(count, time.perf_counter() - start, args.output))
+
+
+if __name__ == '__main__':
+    main()
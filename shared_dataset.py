@@ -0,0 +1,83 @@
+# this python file consists of the read-only dataset shared by every session of the application process
+
+# a version of the datasets(the country dataset and the time series cube) is loaded once by the background refresher(Refer 'data_refresher.py') and used by every session until the next version is swapped in, therefore the pages must never change it
+# the shared dataset holds its values in numpy arrays marked read-only(a copy of the country dataset and the array of the cube), the series of a country and the columns of the country dataset are handed out as views of them and writing into a view raises a ValueError - Refer https://numpy.org/doc/stable/reference/generated/numpy.ndarray.setflags.html
+# the data frames are built for every call over the read-only arrays, depending on the pandas version a frame holds views of the arrays(changing a value raises a ValueError) or its own copy(pandas consolidating the columns of the same type), in both cases a session only ever changes its own frame and never the shared values - checked with pandas 1.2.2(the version of 'requirements.txt') and pandas 1.5.3
+# the shared dataset itself is frozen, setting or deleting an attribute raises an AttributeError
+
+###### NECESSARY IMPORTS ######
+from collections import OrderedDict
+from types import MappingProxyType
+import numpy as np
+import pandas as pd
+
+
+class Shared_Dataset:
+
+    # 'country' is the cleaned country dataset and 'cube' the time series cube of the same version, the values of the country dataset are copied into read-only arrays and the array of the cube is marked read-only in place
+    def __init__(self, version, country, cube):
+        cube.data.flags.writeable = False
+
+        names = tuple(str(name) for name in country['Country'])
+        arrays = OrderedDict((str(column), Shared_Dataset.freeze_column(country[column])) for column in country.columns)
+        columns = {str(column): Shared_Dataset.freeze(np.array(country[column].to_numpy())) for column in country.columns if column != 'Country'}
+
+        set_attribute = object.__setattr__
+        set_attribute(self, 'version', version)
+        set_attribute(self, 'cube', cube)
+        set_attribute(self, 'countries', names)
+        set_attribute(self, 'dates', cube.dates)
+        set_attribute(self, 'index', MappingProxyType({name: i for i, name in enumerate(names)}))
+        set_attribute(self, 'columns', MappingProxyType(columns))
+        set_attribute(self, '_arrays', MappingProxyType(arrays))
+
+    # function defined to mark an array read-only, the array is returned
+    @staticmethod
+    def freeze(values):
+        values = np.asarray(values)
+        values.flags.writeable = False
+
+        return values
+
+    # function defined to copy a column of a data frame into a read-only array, the values of a categorical column are held by its codes
+    @staticmethod
+    def freeze_column(column):
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return pd.Categorical.from_codes(Shared_Dataset.freeze(np.array(column.cat.codes)), dtype = column.dtype)
+
+        return Shared_Dataset.freeze(np.array(column.to_numpy()))
+
+    # function defined to return the series of a country(all metrics when no metric is given) as a read-only view of the time series cube
+    def series(self, country, metric = None):
+        return self.cube.series(country, metric)
+
+    # function defined to return a column of the country dataset as a read-only array
+    def column(self, name):
+        return self.columns[name]
+
+    # function defined to return a value of the country dataset
+    def value(self, country, column):
+        return self.columns[column][self.index[country]]
+
+    # function defined to return the population of a country
+    def population(self, country):
+        return int(self.value(country, 'Population'))
+
+    # function defined to return the country dataset('country') or a metric of the time series cube in the layout of the cleaned datasets, the frame is built over the read-only arrays of the shared dataset
+    def frame(self, name = 'country'):
+        if name == 'country':
+            return pd.DataFrame(dict(self._arrays))
+
+        return self.cube.frame(name)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('The shared dataset is read-only, {!r} cannot be set'.format(name))
+
+    def __delattr__(self, name):
+        raise AttributeError('The shared dataset is read-only, {!r} cannot be deleted'.format(name))
+
+    def __len__(self):
+        return len(self.countries)
+
+    def __contains__(self, country):
+        return country in self.index
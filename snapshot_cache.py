@@ -0,0 +1,216 @@
+# this python file consists of the on-disk snapshot cache used by the data cleaning functions in 'modelling.py'
+
+# every raw dataset taken from the web is stored on disk along with its ETag/Last-Modified headers. Once the ttl of a snapshot expires it is revalidated using a conditional request(the upstream site answers '304 Not Modified' when nothing has changed) and the last good snapshot is used whenever the upstream site cannot be reached - Refer https://developer.mozilla.org/en-US/docs/Web/HTTP/Conditional_requests
+
+# all datasets are fetched concurrently over a single pooled HTTP session(the connections to the upstream site are kept open and reused) therefore loading all datasets takes about as long as the slowest dataset - Refer https://requests.readthedocs.io/en/latest/user/advanced/#session-objects
+# simultaneous fetches of the same dataset are coalesced(single-flight), the first fetch reads or downloads the dataset and every fetch arriving while it runs waits for its snapshot, therefore many sessions hitting an expired snapshot download it once
+
+# the cache can be configured using the following environment variables:
+# EPIDEMOS_SNAPSHOT_DIR - directory holding the snapshots(default is '.snapshots' next to this file)
+# EPIDEMOS_SNAPSHOT_TTL - number of seconds a snapshot is used without revalidation(default is 600)
+# EPIDEMOS_SNAPSHOT_TIMEOUT - number of seconds to wait for the upstream site(default is 10)
+# EPIDEMOS_SNAPSHOT_MIRROR - base url of a local mirror or HTTP stand-in, when set every dataset is requested as '<mirror>/<name>' instead of its upstream url
+# EPIDEMOS_SNAPSHOT_WORKERS - number of datasets fetched at the same time(default is 8)
+
+###### NECESSARY IMPORTS ######
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, Future
+import requests
+from requests.adapters import HTTPAdapter
+from instrumentation import metrics
+
+SNAPSHOT_DIR = os.environ.get('EPIDEMOS_SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.snapshots'))
+SNAPSHOT_TTL = float(os.environ.get('EPIDEMOS_SNAPSHOT_TTL', 600))
+SNAPSHOT_TIMEOUT = float(os.environ.get('EPIDEMOS_SNAPSHOT_TIMEOUT', 10))
+SNAPSHOT_MIRROR = os.environ.get('EPIDEMOS_SNAPSHOT_MIRROR', '')
+SNAPSHOT_WORKERS = int(os.environ.get('EPIDEMOS_SNAPSHOT_WORKERS', 8))
+
+# a snapshot holds the raw content of a dataset and the information needed to revalidate it
+# status is one of 'cached'(ttl not expired), 'revalidated'(304 from upstream), 'downloaded'(new content) or 'stale'(upstream unreachable, last good snapshot used)
+# version is the sha1 digest of the content and changes only when the content changes
+Snapshot = namedtuple('Snapshot', ['name', 'content', 'etag', 'last_modified', 'checked_at', 'version', 'status'])
+
+
+class Snapshot_Cache:
+
+    def __init__(self, directory = SNAPSHOT_DIR, ttl = SNAPSHOT_TTL, timeout = SNAPSHOT_TIMEOUT, mirror = SNAPSHOT_MIRROR, workers = SNAPSHOT_WORKERS):
+        self.directory = directory
+        self.ttl = ttl
+        self.timeout = timeout
+        self.mirror = mirror
+        self.workers = max(1, workers)
+        # the session keeps a connection pool per host, the pool holds a connection for every worker
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections = self.workers, pool_maxsize = self.workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._pool = None
+        # fetches in progress, the name of the dataset is mapped to the 'max_age' and the future of the fetch
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    # function defined to return the snapshot of a dataset, 'name' is the file name used on disk(and on the mirror) and 'url' is the upstream location
+    # 'max_age' replaces the ttl of the cache for this call, 0 always revalidates and float('inf') only downloads datasets without a stored snapshot(Refer 'data_refresher.py')
+    # a fetch of a dataset which is already being fetched waits for that fetch instead of reading or downloading the dataset again, unless the running fetch accepts an older snapshot than this fetch
+    def fetch(self, name, url, max_age = None):
+        max_age = self.ttl if max_age is None else max_age
+
+        with self._lock:
+            flight = self._flights.get(name)
+            if flight is not None and flight[0] <= max_age:
+                future = flight[1]
+                leader = False
+            else:
+                future = Future()
+                self._flights[name] = (max_age, future)
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(self._fetch(name, url, max_age))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._flights.get(name, (None, None))[1] is future:
+                    del self._flights[name]
+
+        return future.result()
+
+    # function defined to fetch several datasets at the same time, 'sources' is a list of (name, url) pairs and the snapshots are returned by name
+    # the first error of a dataset is raised once every fetch has finished
+    def fetch_all(self, sources, max_age = None):
+        sources = list(sources)
+        if len(sources) <= 1 or self.workers == 1:
+            return {name: self.fetch(name, url, max_age) for name, url in sources}
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers = self.workers, thread_name_prefix = 'snapshot-fetch')
+            pool = self._pool
+
+        futures = [(name, pool.submit(self.fetch, name, url, max_age)) for name, url in sources]
+        errors = [future.exception() for _, future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+
+        return {name: future.result() for name, future in futures}
+
+    def _fetch(self, name, url, max_age):
+        stored = self._read(name)
+        now = time.time()
+
+        if stored is not None and now - stored.checked_at < max_age:
+            metrics.count('snapshot', True)
+            return stored
+        metrics.count('snapshot', False)
+
+        if self.mirror:
+            url = self.mirror.rstrip('/') + '/' + name
+
+        headers = {}
+        if stored is not None:
+            if stored.etag:
+                headers['If-None-Match'] = stored.etag
+            if stored.last_modified:
+                headers['If-Modified-Since'] = stored.last_modified
+
+        try:
+            with metrics.span('fetch', name):
+                response = self.session.get(url, headers = headers, timeout = self.timeout)
+        except requests.RequestException:
+            response = None
+
+        if response is not None and response.status_code == 304 and stored is not None:
+            snapshot = stored._replace(checked_at = now, status = 'revalidated')
+            self._write_meta(snapshot)
+            return snapshot
+
+        if response is not None and response.status_code == 200:
+            snapshot = Snapshot(name = name,
+                                content = response.content,
+                                etag = response.headers.get('ETag'),
+                                last_modified = response.headers.get('Last-Modified'),
+                                checked_at = now,
+                                version = hashlib.sha1(response.content).hexdigest(),
+                                status = 'downloaded')
+            self._write(snapshot)
+            return snapshot
+
+        # upstream is unreachable or answered with an error, therefore the last good snapshot is used until the ttl expires again
+        if stored is not None:
+            snapshot = stored._replace(checked_at = now, status = 'stale')
+            self._write_meta(snapshot)
+            return snapshot
+
+        if response is None:
+            raise ConnectionError('Unable to download {} and no snapshot is stored in {}'.format(name, self.directory))
+
+        response.raise_for_status()
+        raise ConnectionError('Unexpected response {} for {}'.format(response.status_code, name))
+
+    # function defined to remove the stored snapshot of a dataset(all snapshots when no name is given)
+    def clear(self, name = None):
+        if not os.path.isdir(self.directory):
+            return
+
+        for file_name in os.listdir(self.directory):
+            if name is None or file_name in (name, name + '.json'):
+                os.remove(os.path.join(self.directory, file_name))
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read(self, name):
+        try:
+            with open(self._path(name) + '.json', 'r') as f:
+                meta = json.load(f)
+            with open(self._path(name), 'rb') as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+
+        # a snapshot whose content does not match its recorded digest was not written completely and is discarded
+        if hashlib.sha1(content).hexdigest() != meta.get('version'):
+            return None
+
+        return Snapshot(name = name,
+                        content = content,
+                        etag = meta.get('etag'),
+                        last_modified = meta.get('last_modified'),
+                        checked_at = meta.get('checked_at', 0),
+                        version = meta['version'],
+                        status = 'cached')
+
+    def _write(self, snapshot):
+        self._atomic_write(self._path(snapshot.name), snapshot.content)
+        self._write_meta(snapshot)
+
+    def _write_meta(self, snapshot):
+        meta = {'etag': snapshot.etag,
+                'last_modified': snapshot.last_modified,
+                'checked_at': snapshot.checked_at,
+                'version': snapshot.version}
+        self._atomic_write(self._path(snapshot.name) + '.json', json.dumps(meta).encode('utf-8'))
+
+    # files are written to a temporary file first and then moved in place so concurrent readers never see a partial file
+    def _atomic_write(self, path, data):
+        os.makedirs(self.directory, exist_ok = True)
+        fd, tmp_path = tempfile.mkstemp(dir = self.directory, prefix = '.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
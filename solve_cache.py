@@ -0,0 +1,98 @@
+# this python file consists of the cache holding the results of model solves, shared by every session of the application in the process
+
+# all model controls are discrete(sliders with fixed steps) therefore users moving the sliders back and forth request the same solves again and again. A solve is identified by the model, its parameters, the initial state and the number of days, the floating point values are quantized so that values such as 0.05 * 3 and 0.15 are treated as the same parameter
+
+# the cache evicts the least recently used solves once its memory limit is reached and counts its hits and misses
+# the memory limit can be changed using the environment variable EPIDEMOS_SOLVE_CACHE_MB(default is 64)
+
+###### NECESSARY IMPORTS ######
+import os
+import threading
+from collections import OrderedDict
+from scipy.integrate import odeint
+from model_kernels import KERNELS
+from instrumentation import metrics
+
+SOLVE_CACHE_MB = float(os.environ.get('EPIDEMOS_SOLVE_CACHE_MB', 64))
+
+
+class Solve_Cache:
+
+    def __init__(self, max_bytes = SOLVE_CACHE_MB * 1024 * 1024, significant_digits = 10):
+        self.max_bytes = max_bytes
+        self.significant_digits = significant_digits
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # function defined to round a value to the given number of significant digits
+    def quantize(self, value):
+        return float('{:.{}g}'.format(float(value), self.significant_digits))
+
+    # function defined to build the key of a solve
+    def key(self, model, initial_state, day_value, args):
+        return (model,
+                tuple(self.quantize(v) for v in args),
+                tuple(self.quantize(v) for v in initial_state),
+                int(day_value))
+
+    # function defined to return the solve of a model over 'day_value' days(the same days as range(0, day_value) used by the pages), the model is only integrated when the solve is not cached
+    # the returned array is shared between sessions and therefore read-only
+    def solve(self, model, initial_state, day_value, args):
+        key = self.key(model, initial_state, day_value, args)
+
+        with self._lock:
+            trajectory = self._entries.get(key)
+            if trajectory is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return trajectory
+            self.misses += 1
+
+        model_function, jacobian_function = KERNELS[model]
+        with metrics.span('odeint', model):
+            trajectory = odeint(model_function, initial_state, range(0, int(day_value)), args = tuple(args), Dfun = jacobian_function)
+        trajectory.flags.writeable = False
+
+        self.put(key, trajectory)
+
+        return trajectory
+
+    # function defined to store a solve, the least recently used solves are evicted until the memory limit is respected
+    def put(self, key, trajectory):
+        with self._lock:
+            if key in self._entries or trajectory.nbytes > self.max_bytes:
+                return
+
+            self._entries[key] = trajectory
+            self.size_bytes += trajectory.nbytes
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last = False)
+                self.size_bytes -= evicted.nbytes
+                self.evictions += 1
+
+    # function defined to remove all cached solves
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    # function defined to return the counters of the cache
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses
+            return {'entries': len(self._entries),
+                    'size_bytes': self.size_bytes,
+                    'max_bytes': self.max_bytes,
+                    'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': self.hits / requests if requests else 0.0}
+
+
+# the cache shared by every session in the process
+solve_cache = Solve_Cache()
+metrics.collect('solve', solve_cache.stats)
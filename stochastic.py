@@ -0,0 +1,199 @@
+# this python file consists of the stochastic version of the models, used for small populations where chance decides whether an outbreak takes off or fades out
+
+# the models have the same compartments and parameters as the model functions in 'modelling.py'(Refer 'batch_solver.py'), every transition between compartments(for example S to I) happens to whole people at random. The realizations are simulated with tau-leaping, that is, every day is split into a few small steps and the number of people leaving a compartment during a step is drawn from a binomial distribution with the probability 1 - exp(-rate * step), therefore no compartment ever becomes negative - Refer https://en.wikipedia.org/wiki/Tau-leaping
+# people leaving a compartment with more than one exit(the infected compartment of the SIR-D model recovers or dies) are split between the exits in proportion to their rates
+
+# all realizations of an ensemble are simulated together as numpy arrays(one row per realization), the ensemble can also be split between a pool of worker processes
+# an ensemble provides the percentile bands of every compartment, the probability that the infection has died out by every day and the probability of fade-out, that is, the infection dies out before more than a small share of the population(default 5%) has been infected
+
+# using command prompt or terminal run "python stochastic.py sir --N 1000 --beta 0.2 --gamma 0.1" from the same directory, "python stochastic.py --help" lists all options
+
+###### NECESSARY IMPORTS ######
+import os
+import time
+import argparse
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from batch_solver import MODELS
+
+
+# functions defined for the rate(per person and day) at which susceptible people are infected
+def infection_rate(state, params):
+    return params['beta'] * state['I'] / params['N']
+
+
+def mitigated_infection_rate(state, params):
+    return (1 - params['u']) * params['beta'] * state['I'] / params['N']
+
+
+# exits of every compartment as (target compartment, rate per person and day) for every model
+TRANSITIONS = {
+    'sir': {'S': [('I', infection_rate)],
+            'I': [('R', lambda state, params: params['gamma'])]},
+    'sird': {'S': [('I', infection_rate)],
+            'I': [('R', lambda state, params: params['gamma']), ('D', lambda state, params: params['sigma'])]},
+    'seir': {'S': [('E', infection_rate)],
+            'E': [('I', lambda state, params: params['alpha'])],
+            'I': [('R', lambda state, params: params['gamma'])]},
+    'seirm': {'S': [('E', mitigated_infection_rate)],
+            'E': [('I', lambda state, params: params['alpha'])],
+            'I': [('R', lambda state, params: params['gamma'])]},
+    }
+
+# compartments holding people who still carry the infection
+CARRIERS = ('E', 'I')
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# days - the days of the trajectories(the same days as range(0, day_value) used by the pages)
+# percentiles - maps every percentile to its band (days x compartments)
+# mean - mean of all realizations (days x compartments)
+# extinction - share of realizations without any carriers of the infection by every day
+# fade_out_probability - share of realizations where the infection died out before the outbreak size was reached
+# throughput - realizations simulated per second
+Ensemble_Result = namedtuple('Ensemble_Result', ['days', 'percentiles', 'mean', 'extinction', 'fade_out_probability', 'realizations', 'seconds', 'throughput'])
+
+
+class Stochastic_Ensemble:
+
+    # function defined to simulate realizations of a model, 'initial_state' and 'args' are the same as 'Modelling.solve'
+    # the result has the shape (realizations x days x compartments) and holds whole people
+    @staticmethod
+    def simulate(model, initial_state, day_value, args, realizations, steps_per_day = 4, seed = None):
+        if model not in TRANSITIONS:
+            raise ValueError('Unknown model {!r}, expected one of {}'.format(model, ', '.join(TRANSITIONS)))
+
+        compartments = MODELS[model]['compartments']
+        params = dict(zip(MODELS[model]['parameters'], args))
+        rng = np.random.default_rng(seed)
+        tau = 1.0 / steps_per_day
+
+        initial_state = np.rint(np.asarray(initial_state, dtype = float)).astype(np.int64)
+        state = np.tile(initial_state, (realizations, 1))
+        columns = {compartment: state[:, i] for i, compartment in enumerate(compartments)}
+        carriers = [compartments.index(compartment) for compartment in CARRIERS if compartment in compartments]
+
+        result = np.empty((realizations, day_value, len(compartments)), dtype = np.int32)
+        for day in range(day_value):
+            result[:, day] = state
+
+            # the state does not change anymore once the infection has died out in every realization
+            if not state[:, carriers].any():
+                result[:, day + 1:] = state[:, None, :]
+                break
+
+            for _ in range(steps_per_day):
+                # all transitions of a step are drawn from the state at the beginning of the step
+                changes = np.zeros_like(state)
+                for source, exits in TRANSITIONS[model].items():
+                    s = compartments.index(source)
+                    rates = [np.broadcast_to(rate(columns, params), (realizations,)) for _, rate in exits]
+                    total = np.sum(rates, axis = 0)
+                    leaving = rng.binomial(state[:, s], -np.expm1(-total * tau))
+                    changes[:, s] -= leaving
+
+                    # people leaving through more than one exit are split in proportion to the rates of the exits, the last exit takes everybody left
+                    remaining = total
+                    for j, ((target, _), rate) in enumerate(zip(exits, rates)):
+                        if j < len(exits) - 1:
+                            share = np.divide(rate, remaining, out = np.zeros(realizations), where = remaining > 0)
+                            moving = rng.binomial(leaving, np.clip(share, 0.0, 1.0))
+                            remaining = remaining - rate
+                        else:
+                            moving = leaving
+                        changes[:, compartments.index(target)] += moving
+                        leaving = leaving - moving
+
+                state += changes
+
+        return result
+
+    # function defined to simulate an ensemble of realizations and summarize it, the realizations are split between 'workers' processes when more than one worker is given
+    # 'outbreak_size' is the share of the population which has to be infected for an outbreak not to count as faded out
+    @staticmethod
+    def run(model, initial_state, day_value, args, realizations = 1000, steps_per_day = 4, workers = 1, seed = None,
+            percentiles = DEFAULT_PERCENTILES, outbreak_size = 0.05):
+        start = time.perf_counter()
+
+        if workers is None or workers > 1:
+            # every worker draws from its own independent stream of random numbers
+            seeds = np.random.SeedSequence(seed).spawn(workers or os.cpu_count() or 1)
+            counts = [len(part) for part in np.array_split(np.arange(realizations), len(seeds))]
+            with ProcessPoolExecutor(max_workers = workers) as pool:
+                parts = list(pool.map(Stochastic_Ensemble.simulate,
+                                      *zip(*[(model, initial_state, day_value, args, count, steps_per_day, part_seed)
+                                             for count, part_seed in zip(counts, seeds) if count])))
+            trajectories = np.concatenate(parts)
+        else:
+            trajectories = Stochastic_Ensemble.simulate(model, initial_state, day_value, args, realizations, steps_per_day, seed)
+
+        seconds = time.perf_counter() - start
+
+        compartments = MODELS[model]['compartments']
+        carriers = [compartments.index(compartment) for compartment in CARRIERS if compartment in compartments]
+        N = dict(zip(MODELS[model]['parameters'], args))['N']
+
+        extinct = trajectories[:, :, carriers].sum(axis = 2) == 0
+        # everybody who has left the susceptible compartment has been infected
+        infected = N - trajectories[:, -1, 0]
+        faded_out = extinct[:, -1] & (infected < outbreak_size * N)
+
+        bands = np.percentile(trajectories, percentiles, axis = 0)
+
+        return Ensemble_Result(days = np.arange(day_value),
+                               percentiles = dict(zip(percentiles, bands)),
+                               mean = trajectories.mean(axis = 0),
+                               extinction = extinct.mean(axis = 0),
+                               fade_out_probability = float(faded_out.mean()),
+                               realizations = realizations,
+                               seconds = seconds,
+                               throughput = realizations / seconds if seconds else float('inf'))
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Simulate an ensemble of stochastic realizations of a model and report the percentile bands, the probability of fade-out and the throughput.')
+    parser.add_argument('model', choices = list(TRANSITIONS), help = 'model to simulate')
+    parser.add_argument('--N', type = float, default = 1000, help = 'total population, default is 1000')
+    for name in ('beta', 'gamma', 'sigma', 'alpha', 'u'):
+        parser.add_argument('--' + name, type = float, help = 'parameter {} of the model'.format(name))
+    for compartment in ('E', 'I', 'R', 'D'):
+        parser.add_argument('--' + compartment, type = int, default = None, help = 'initial {} compartment, default is 1 for the first carrier compartment and 0 otherwise'.format(compartment))
+    parser.add_argument('--days', type = int, default = 150, help = 'number of days, default is 150')
+    parser.add_argument('-n', '--realizations', type = int, default = 1000, help = 'number of realizations, default is 1000')
+    parser.add_argument('-w', '--workers', type = int, default = 1, help = 'number of worker processes, default is 1')
+    parser.add_argument('--steps-per-day', type = int, default = 4, help = 'tau-leaping steps per day, default is 4')
+    parser.add_argument('--seed', type = int, default = None, help = 'seed of the random numbers')
+    parser.add_argument('-o', '--output', help = 'write the days, the percentile bands, the mean and the extinction curve to a .npz file')
+    args = parser.parse_args(argv)
+
+    compartments = MODELS[args.model]['compartments']
+    names = MODELS[args.model]['parameters']
+    values = {name: getattr(args, name) for name in names}
+    missing = [name for name, value in values.items() if value is None]
+    if missing:
+        parser.error('The {} model needs the parameters {}'.format(args.model, ', '.join('--' + name for name in missing)))
+
+    initial = {compartment: getattr(args, compartment) for compartment in compartments[1:]}
+    first_carrier = compartments[1]
+    if initial[first_carrier] is None:
+        initial[first_carrier] = 1
+    initial = [initial[compartment] or 0 for compartment in compartments[1:]]
+    initial_state = [args.N - sum(initial)] + initial
+
+    result = Stochastic_Ensemble.run(args.model, initial_state, args.days, tuple(values[name] for name in names),
+                                     args.realizations, args.steps_per_day, args.workers, args.seed)
+
+    infected = compartments.index('I')
+    print('{} realizations of the {} model over {} days in {:.2f}s({:.0f} realizations/s)'.format(result.realizations, args.model, args.days, result.seconds, result.throughput))
+    print('Probability of fade-out: {:.3f}'.format(result.fade_out_probability))
+    print('Infection died out by the last day: {:.3f}'.format(result.extinction[-1]))
+    print('Peak of the median infected: {:.0f} on day {}'.format(result.percentiles[50][:, infected].max(), int(result.percentiles[50][:, infected].argmax())))
+
+    if args.output:
+        np.savez(args.output, days = result.days, mean = result.mean, extinction = result.extinction,
+                 percentiles = np.array(list(result.percentiles)), bands = np.stack(list(result.percentiles.values())))
+
+
+if __name__ == '__main__':
+    main()
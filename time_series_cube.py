@@ -0,0 +1,105 @@
+# this python file consists of the time series cube which holds the confirmed, recovered and deceased datasets in a single numpy array
+
+# the cube has the shape (countries x dates x metrics) and is built once per data version in 'modelling.py', therefore the series of a country is accessed using an index lookup instead of scanning the cleaned datasets
+# the datasets grow by one date every day, therefore a new version of the cube is built from the previous version by cleaning only the new dates and the most recent dates which the upstream datasets may still revise(the revision window), the dates before the window are copied from the previous version - Refer 'Modelling.time_series_cube'
+# the cube keeps a digest of the raw lines of every dataset before the revision window of the next update(its history), an update whose datasets changed a value before the window does not match the digest and the cube is built again from the whole datasets
+
+###### NECESSARY IMPORTS ######
+import numpy as np
+import pandas as pd
+
+
+class Time_Series_Cube:
+
+    # order of the metrics along the last axis of the cube
+    METRICS = ('confirmed', 'recovered', 'deaths')
+
+    # type of the counts, the largest cumulative count of a country is far below 2^31 and a signed type keeps the differences of two series(for example confirmed - recovered) from wrapping around
+    DTYPE = np.int32
+
+    # 'update' describes how the version was built, {'mode': 'full'} or an incremental update(Refer 'extend')
+    # 'history' holds the number of dates covered by the digests('start') and the digest of every metric('digests') - Refer 'Modelling.time_series_history'
+    def __init__(self, countries, dates, data, version = None, update = None, history = None):
+        self.countries = list(countries)
+        self.index = {country: i for i, country in enumerate(self.countries)}
+        self.dates = pd.DatetimeIndex(dates)
+        self.data = data
+        self.version = version
+        self.update = update or {'mode': 'full'}
+        self.history = history
+        self._columns = None
+
+    # function defined to build the cube from the cleaned datasets(as returned by the cleaning functions in 'modelling.py'), 'frames' maps every metric to its dataset
+    @staticmethod
+    def from_frames(frames, version = None):
+        # the dates of the confirmed dataset are used as the date axis of the cube
+        date_columns = [column for column in frames['confirmed'].columns if column != 'Country']
+        countries = sorted(set().union(*(frames[metric]['Country'] for metric in Time_Series_Cube.METRICS)))
+
+        data = np.zeros((len(countries), len(date_columns), len(Time_Series_Cube.METRICS)), dtype = Time_Series_Cube.DTYPE)
+        for m, metric in enumerate(Time_Series_Cube.METRICS):
+            frame = frames[metric].set_index('Country')
+            data[:, :, m] = frame.reindex(index = countries, columns = date_columns, fill_value = 0).to_numpy()
+
+        dates = pd.to_datetime(date_columns, format = '%m/%d/%y')
+
+        return Time_Series_Cube(countries, dates, data, version)
+
+    # function defined to build the next version of the cube from the cleaned datasets of the most recent dates only(the revision window and the new dates), None is returned when the datasets cannot be appended(the countries changed or the dates do not continue the cube) and the cube has to be built using 'from_frames'
+    def extend(self, frames, version = None):
+        date_columns = [column for column in frames['confirmed'].columns if column != 'Country']
+        dates = pd.to_datetime(date_columns, format = '%m/%d/%y')
+        if not len(dates) or set().union(*(frames[metric]['Country'] for metric in self.METRICS)) != set(self.countries):
+            return None
+
+        start = int(self.dates.get_indexer(dates[:1])[0])
+        if start < 0 or len(dates) < len(self.dates) - start or not dates[:len(self.dates) - start].equals(self.dates[start:]):
+            return None
+
+        data = np.empty((len(self.countries), start + len(dates), len(self.METRICS)), dtype = self.DTYPE)
+        data[:, :start] = self.data[:, :start]
+        for m, metric in enumerate(self.METRICS):
+            frame = frames[metric].set_index('Country')
+            data[:, start:, m] = frame.reindex(index = self.countries, columns = date_columns, fill_value = 0).to_numpy()
+
+        # cells of the revision window which the upstream datasets have changed since the previous version
+        overlap = len(self.dates) - start
+        patched = int(np.count_nonzero(data[:, start:start + overlap] != self.data[:, start:]))
+
+        update = {'mode': 'incremental',
+                  'previous_version': self.version,
+                  'revision_window': overlap,
+                  'appended_dates': len(dates) - overlap,
+                  'patched_cells': patched,
+                  'history_checked': True}
+
+        return Time_Series_Cube(self.countries, self.dates[:start].append(dates), data, version, update)
+
+    # function defined to return the series of a country(all metrics when no metric is given), the returned array is a view of the cube
+    def series(self, country, metric = None):
+        row = self.data[self.index[country]]
+        if metric is None:
+            return row
+
+        return row[:, self.METRICS.index(metric)]
+
+    # function defined to return a metric in the same layout as the cleaned datasets(one row per country and one column per date)
+    # a new frame is built for every call over a view of the cube, the view is read-only once the cube is shared(Refer 'shared_dataset.py') so a frame never changes the cube
+    def frame(self, metric):
+        if self._columns is None:
+            self._columns = ['{}/{}/{}'.format(d.month, d.day, d.strftime('%y')) for d in self.dates]
+
+        frame = pd.DataFrame(self.data[:, :, self.METRICS.index(metric)], columns = self._columns, copy = False)
+        frame.insert(0, 'Country', self.countries)
+
+        return frame
+
+    # function defined to return the memory used by the cube in bytes, 'data' is the array of the cube(memory-mapped when the cube is opened from the store), the frames hold views of the array and use no memory of their own
+    def memory_usage(self):
+        return {'data': int(self.data.nbytes)}
+
+    def __len__(self):
+        return len(self.countries)
+
+    def __contains__(self, country):
+        return country in self.index
@@ -0,0 +1,134 @@
+# this python file consists of the precomputed trajectory tables of the model pages
+
+# every model page starts with the default initial conditions(a total population of 1000 with a single infected or exposed person) and all of its sliders have fixed steps, therefore every trajectory that can be shown for the default initial conditions is solved once offline and stored in a table which is read memory-mapped by the application. The pages only integrate the model when the population values are changed
+
+# the tables are built using command prompt or terminal by running "python trajectory_tables.py" from the same directory(optionally followed by the models to build, for example "python trajectory_tables.py sir seir")
+
+# every table holds the solves of all slider combinations over the maximum number of days(730), a page showing fewer days uses the first days of the trajectory. To keep the tables compact the compartments are stored as 16-bit fractions of the total population and the last compartment is not stored at all(it is the total population minus all other compartments), which is about five times smaller than storing the solves as they are while keeping the error around 0.02 people for the default population. The tables are not compressed with zlib as compressed files cannot be memory-mapped
+
+# the directory of the tables can be changed using the environment variable EPIDEMOS_TABLE_DIR(default is 'trajectory_tables' next to this file)
+
+###### NECESSARY IMPORTS ######
+import os
+import sys
+import json
+import time
+import itertools
+import numpy as np
+from batch_solver import Batch_Solver, MODELS
+
+TABLE_DIR = os.environ.get('EPIDEMOS_TABLE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trajectory_tables'))
+
+# default initial conditions and slider grids of every model page, the grids are given as parameter values in the same order as the 'args' of the model functions(without N)
+DEFAULT_POPULATION = 1000
+MAX_DAYS = 730
+QUANTIZATION = 65535
+
+contact_rates = [0.05 * eff_con for eff_con in range(1, 21)]
+
+TABLES = {
+    'sir': {'initial_state': [999, 1, 0],
+            'grid': {'beta': contact_rates, 'gamma': [1 / rec for rec in range(1, 21)]}},
+    'sird': {'initial_state': [999, 1, 0, 0],
+            'grid': {'beta': contact_rates, 'gamma': [1 / rec for rec in range(1, 21)], 'sigma': [1 / dec for dec in range(1, 21)]}},
+    'seir': {'initial_state': [999, 1, 0, 0],
+            'grid': {'alpha': [1 / exp_incu for exp_incu in range(1, 11)], 'beta': contact_rates, 'gamma': [1 / rec_infect for rec_infect in range(1, 11)]}},
+    'seirm': {'initial_state': [999, 1, 0, 0],
+            'grid': {'u': [m_control / 10 for m_control in range(0, 11)], 'alpha': [1 / exp_incu for exp_incu in range(1, 11)], 'beta': contact_rates, 'gamma': [1 / rec_infect for rec_infect in range(1, 11)]}},
+    }
+
+
+class Trajectory_Tables:
+
+    def __init__(self, directory = TABLE_DIR):
+        self.directory = directory
+        self._tables = {}
+
+    # function defined to solve every slider combination of a model and write its table
+    def build(self, model, chunk_size = 2000):
+        settings = TABLES[model]
+        names = list(settings['grid'])
+        axes = [settings['grid'][name] for name in names]
+        combinations = np.array(list(itertools.product(*axes)))
+
+        params = {name: combinations[:, i] for i, name in enumerate(names)}
+        params['N'] = DEFAULT_POPULATION
+        result = Batch_Solver.solve(model, settings['initial_state'], np.arange(MAX_DAYS), chunk_size = chunk_size, **params)
+
+        fractions = np.clip(result[:, :, :-1] / DEFAULT_POPULATION, 0.0, 1.0)
+        table = np.rint(fractions * QUANTIZATION).astype(np.uint16)
+        table = table.reshape([len(axis) for axis in axes] + [MAX_DAYS, table.shape[-1]])
+
+        os.makedirs(self.directory, exist_ok = True)
+        meta = {'model': model,
+                'population': DEFAULT_POPULATION,
+                'initial_state': settings['initial_state'],
+                'grid': {name: list(axis) for name, axis in zip(names, axes)},
+                'days': MAX_DAYS,
+                'quantization': QUANTIZATION}
+
+        # the table is written under a temporary name and then moved in place so running applications never open a partial table
+        path = os.path.join(self.directory, model)
+        np.save(path + '.tmp.npy', table)
+        with open(path + '.tmp.json', 'w') as f:
+            json.dump(meta, f)
+        os.replace(path + '.tmp.npy', path + '.npy')
+        os.replace(path + '.tmp.json', path + '.json')
+
+        return table
+
+    # function defined to open the table of a model memory-mapped, None is returned when the table has not been built
+    def open(self, model):
+        if model not in self._tables:
+            path = os.path.join(self.directory, model)
+            try:
+                with open(path + '.json', 'r') as f:
+                    meta = json.load(f)
+                table = np.load(path + '.npy', mmap_mode = 'r')
+            except (OSError, ValueError):
+                return None
+            self._tables[model] = (meta, table)
+
+        return self._tables[model]
+
+    # function defined to return the trajectory of a solve from the table of its model(the same arguments as 'Modelling.solve'), None is returned when the solve is not part of the table
+    def lookup(self, model, initial_state, day_value, args):
+        if model not in TABLES or day_value > MAX_DAYS:
+            return None
+
+        opened = self.open(model)
+        if opened is None:
+            return None
+        meta, table = opened
+
+        names = MODELS[model]['parameters']
+        params = dict(zip(names, args))
+        if params['N'] != meta['population'] or list(initial_state) != meta['initial_state']:
+            return None
+
+        index = []
+        for name, axis in meta['grid'].items():
+            matches = np.flatnonzero(np.isclose(axis, params[name], rtol = 1e-9, atol = 0.0))
+            if len(matches) == 0:
+                return None
+            index.append(int(matches[0]))
+
+        stored = table[tuple(index)][:day_value] * (meta['population'] / meta['quantization'])
+        last = np.maximum(meta['population'] - stored.sum(axis = 1, keepdims = True), 0.0)
+
+        return np.concatenate((stored, last), axis = 1)
+
+
+# the tables shared by every session in the process
+trajectory_tables = Trajectory_Tables()
+
+
+def main(models):
+    for model in models or TABLES:
+        start = time.perf_counter()
+        table = Trajectory_Tables().build(model)
+        print('{}: {} solves, {:.1f} MB in {:.1f}s'.format(model, int(np.prod(table.shape[:-2])), table.nbytes / 1024 / 1024, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])